@@ -0,0 +1,47 @@
+import { NextResponse } from 'next/server';
+import { API_BASE_URL } from '@/lib/config';
+
+// GET /api/commissioning-bootstrap - Everything the commissioning status page loads on open, in one response
+export async function GET(request: Request) {
+  try {
+    const { searchParams } = new URL(request.url);
+    const fiscalYear = searchParams.get('fiscalYear') || 'FY_25-26';
+
+    // Forward revalidation so unchanged data comes back as a 304 from the backend cache
+    const ifNoneMatch = request.headers.get('if-none-match');
+    const response = await fetch(`${API_BASE_URL}/commissioning-bootstrap?fiscalYear=${encodeURIComponent(fiscalYear)}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+        ...(ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {}),
+      },
+    });
+
+    const etag = response.headers.get('etag');
+    const cacheHeaders: Record<string, string> = etag ? { ETag: etag, 'Cache-Control': 'no-cache' } : {};
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers: cacheHeaders });
+    }
+
+    if (response.ok) {
+      // Pass the body through untouched so the strong ETag still matches it
+      const body = await response.arrayBuffer();
+      return new NextResponse(body, {
+        status: 200,
+        headers: { 'Content-Type': 'application/json', ...cacheHeaders },
+      });
+    } else {
+      const data = await response.json();
+      return NextResponse.json(
+        { error: data.detail || 'Failed to get commissioning bootstrap' },
+        { status: response.status }
+      );
+    }
+  } catch (error: any) {
+    console.error('Error getting commissioning bootstrap:', error);
+    return NextResponse.json(
+      { error: error.message || 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
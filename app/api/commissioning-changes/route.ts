@@ -0,0 +1,33 @@
+import { NextResponse } from 'next/server';
+import { API_BASE_URL } from '@/lib/config';
+
+// GET /api/commissioning-changes - Project rows changed since a sync token
+export async function GET(request: Request) {
+  try {
+    const { searchParams } = new URL(request.url);
+
+    const response = await fetch(`${API_BASE_URL}/commissioning-changes?${searchParams.toString()}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    const data = await response.json();
+
+    if (response.ok) {
+      return NextResponse.json(data, { status: 200 });
+    } else {
+      return NextResponse.json(
+        { error: data.detail || 'Failed to get commissioning changes' },
+        { status: response.status }
+      );
+    }
+  } catch (error: any) {
+    console.error('Error getting commissioning changes:', error);
+    return NextResponse.json(
+      { error: error.message || 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,33 @@
+import { NextResponse } from 'next/server';
+import { API_BASE_URL } from '@/lib/config';
+
+// GET /api/commissioning-comparison - Year-over-year figures for several fiscal years
+export async function GET(request: Request) {
+  try {
+    const { searchParams } = new URL(request.url);
+
+    const response = await fetch(`${API_BASE_URL}/commissioning-comparison?${searchParams.toString()}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    const data = await response.json();
+
+    if (response.ok) {
+      return NextResponse.json(data, { status: 200 });
+    } else {
+      return NextResponse.json(
+        { error: data.detail || 'Failed to get fiscal year comparison' },
+        { status: response.status }
+      );
+    }
+  } catch (error: any) {
+    console.error('Error getting fiscal year comparison:', error);
+    return NextResponse.json(
+      { error: error.message || 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,36 @@
+import { NextResponse } from 'next/server';
+import { API_BASE_URL } from '@/lib/config';
+
+// GET /api/commissioning-dashboard - Get precomputed dashboard aggregates for a fiscal year
+export async function GET(request: Request) {
+  try {
+    const { searchParams } = new URL(request.url);
+    if (!searchParams.get('fiscalYear')) {
+      searchParams.set('fiscalYear', 'FY_25-26');
+    }
+
+    const response = await fetch(`${API_BASE_URL}/commissioning-dashboard?${searchParams.toString()}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    const data = await response.json();
+
+    if (response.ok) {
+      return NextResponse.json(data, { status: 200 });
+    } else {
+      return NextResponse.json(
+        { error: data.detail || 'Failed to get dashboard aggregates' },
+        { status: response.status }
+      );
+    }
+  } catch (error: any) {
+    console.error('Error getting dashboard aggregates:', error);
+    return NextResponse.json(
+      { error: error.message || 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
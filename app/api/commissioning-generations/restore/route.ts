@@ -0,0 +1,34 @@
+import { NextResponse } from 'next/server';
+import { API_BASE_URL } from '@/lib/config';
+
+// POST /api/commissioning-generations/restore - Make an earlier generation current again
+export async function POST(request: Request) {
+  try {
+    const body = await request.json();
+
+    const response = await fetch(`${API_BASE_URL}/commissioning-generations/restore`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(body),
+    });
+
+    const data = await response.json();
+
+    if (response.ok) {
+      return NextResponse.json(data, { status: 200 });
+    } else {
+      return NextResponse.json(
+        { error: data.detail || 'Failed to restore commissioning generation' },
+        { status: response.status }
+      );
+    }
+  } catch (error: any) {
+    console.error('Error restoring commissioning generation:', error);
+    return NextResponse.json(
+      { error: error.message || 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
@@ -5,20 +5,45 @@ import { API_BASE_URL } from '@/lib/config';
 export async function GET(request: Request) {
   try {
     const { searchParams } = new URL(request.url);
-    const fiscalYear = searchParams.get('fiscalYear') || 'FY_25-26';
+    // Forward every query parameter (filters, fields, limit/cursor, format)
+    const params = new URLSearchParams(searchParams);
+    if (!params.has('fiscalYear')) params.set('fiscalYear', 'FY_25-26');
     
-    const response = await fetch(`${API_BASE_URL}/commissioning-projects?fiscalYear=${encodeURIComponent(fiscalYear)}`, {
+    // Forward revalidation so unchanged data comes back as a 304 from the backend cache
+    const ifNoneMatch = request.headers.get('if-none-match');
+    const response = await fetch(`${API_BASE_URL}/commissioning-projects?${params.toString()}`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json',
+        ...(ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {}),
       },
     });
 
-    const data = await response.json();
+    const etag = response.headers.get('etag');
+    const dataVersion = response.headers.get('x-data-version');
+    const cacheHeaders: Record<string, string> = {
+      ...(etag ? { ETag: etag, 'Cache-Control': 'no-cache' } : {}),
+      ...(dataVersion !== null ? { 'X-Data-Version': dataVersion } : {}),
+    };
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers: cacheHeaders });
+    }
 
     if (response.ok) {
-      return NextResponse.json(data, { status: 200 });
+      // Pass the body through untouched so the strong ETag still matches it (binary for format=arrow)
+      const contentType = response.headers.get('content-type') || 'application/json';
+      const nextCursor = response.headers.get('x-next-cursor');
+      const body = await response.arrayBuffer();
+      return new NextResponse(body, {
+        status: 200,
+        headers: {
+          'Content-Type': contentType,
+          ...(nextCursor !== null ? { 'X-Next-Cursor': nextCursor } : {}),
+          ...cacheHeaders,
+        },
+      });
     } else {
+      const data = await response.json();
       return NextResponse.json(
         { error: data.detail || 'Failed to get commissioning projects' },
         { status: response.status }
@@ -37,10 +62,12 @@ export async function GET(request: Request) {
 export async function POST(request: Request) {
   try {
     const { searchParams } = new URL(request.url);
-    const fiscalYear = searchParams.get('fiscalYear') || 'FY_25-26';
+    // Forward fiscalYear and baseVersion (optimistic concurrency)
+    const params = new URLSearchParams(searchParams);
+    if (!params.has('fiscalYear')) params.set('fiscalYear', 'FY_25-26');
     const projects = await request.json();
     
-    const response = await fetch(`${API_BASE_URL}/commissioning-projects?fiscalYear=${encodeURIComponent(fiscalYear)}`, {
+    const response = await fetch(`${API_BASE_URL}/commissioning-projects?${params.toString()}`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -49,13 +76,15 @@ export async function POST(request: Request) {
     });
 
     const result = await response.json();
+    const dataVersion = response.headers.get('x-data-version');
+    const headers: Record<string, string> = dataVersion !== null ? { 'X-Data-Version': dataVersion } : {};
 
     if (response.ok) {
-      return NextResponse.json(result, { status: 200 });
+      return NextResponse.json(result, { status: 200, headers });
     } else {
       return NextResponse.json(
         { error: result.detail || 'Failed to save commissioning projects' },
-        { status: response.status }
+        { status: response.status, headers }
       );
     }
   } catch (error: any) {
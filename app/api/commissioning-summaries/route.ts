@@ -7,18 +7,28 @@ export async function GET(request: Request) {
     const { searchParams } = new URL(request.url);
     const fiscalYear = searchParams.get('fiscalYear') || 'FY_25-26';
     
+    // Forward revalidation so unchanged data comes back as a 304 from the backend cache
+    const ifNoneMatch = request.headers.get('if-none-match');
     const response = await fetch(`${API_BASE_URL}/commissioning-summaries?fiscalYear=${encodeURIComponent(fiscalYear)}`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json',
+        ...(ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {}),
       },
     });
 
-    const data = await response.json();
+    const etag = response.headers.get('etag');
+    const cacheHeaders: Record<string, string> = etag ? { ETag: etag, 'Cache-Control': 'no-cache' } : {};
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers: cacheHeaders });
+    }
 
     if (response.ok) {
-      return NextResponse.json(data, { status: 200 });
+      // Pass the body through untouched so the strong ETag still matches it
+      const body = await response.text();
+      return new NextResponse(body, { status: 200, headers: { 'Content-Type': 'application/json', ...cacheHeaders } });
     } else {
+      const data = await response.json();
       return NextResponse.json(
         { error: data.detail || 'Failed to get commissioning summaries' },
         { status: response.status }
@@ -6,13 +6,31 @@ export async function GET(request: Request) {
         const { searchParams } = new URL(request.url);
         const fiscalYear = searchParams.get('fiscalYear') || 'FY_25-26';
 
+        // Forward revalidation so unchanged data comes back as a 304 from the backend cache
+        const ifNoneMatch = request.headers.get('if-none-match');
         const response = await fetch(`${API_BASE_URL}/dropdown-options?fiscalYear=${encodeURIComponent(fiscalYear)}`, {
             method: 'GET',
-            headers: { 'Content-Type': 'application/json' },
+            headers: {
+                'Content-Type': 'application/json',
+                ...(ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {}),
+            },
         });
 
-        const data = await response.json();
-        return NextResponse.json(data, { status: response.status });
+        const etag = response.headers.get('etag');
+        const dataVersion = response.headers.get('x-data-version');
+        const cacheHeaders: Record<string, string> = {
+            ...(etag ? { ETag: etag, 'Cache-Control': 'no-cache' } : {}),
+            ...(dataVersion !== null ? { 'X-Data-Version': dataVersion } : {}),
+        };
+        if (response.status === 304) {
+            return new NextResponse(null, { status: 304, headers: cacheHeaders });
+        }
+
+        const body = await response.text();
+        return new NextResponse(body, {
+            status: response.status,
+            headers: { 'Content-Type': 'application/json', ...cacheHeaders },
+        });
     } catch (error: any) {
         return NextResponse.json({ error: error.message }, { status: 500 });
     }
@@ -21,17 +39,23 @@ export async function GET(request: Request) {
 export async function POST(request: Request) {
     try {
         const { searchParams } = new URL(request.url);
-        const fiscalYear = searchParams.get('fiscalYear') || 'FY_25-26';
+        // Forward fiscalYear and baseVersion (optimistic concurrency)
+        const params = new URLSearchParams(searchParams);
+        if (!params.has('fiscalYear')) params.set('fiscalYear', 'FY_25-26');
         const body = await request.json();
 
-        const response = await fetch(`${API_BASE_URL}/dropdown-options?fiscalYear=${encodeURIComponent(fiscalYear)}`, {
+        const response = await fetch(`${API_BASE_URL}/dropdown-options?${params.toString()}`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(body),
         });
 
         const data = await response.json();
-        return NextResponse.json(data, { status: response.status });
+        const dataVersion = response.headers.get('x-data-version');
+        return NextResponse.json(data, {
+            status: response.status,
+            headers: dataVersion !== null ? { 'X-Data-Version': dataVersion } : {},
+        });
     } catch (error: any) {
         return NextResponse.json({ error: error.message }, { status: 500 });
     }
@@ -0,0 +1,35 @@
+import { API_BASE_URL } from '@/lib/config';
+
+// Long-lived stream - never cache or prerender
+export const dynamic = 'force-dynamic';
+
+// GET /api/events - Relay the backend change-event stream (Server-Sent Events)
+export async function GET(request: Request) {
+  try {
+    const { searchParams } = new URL(request.url);
+
+    const response = await fetch(`${API_BASE_URL}/events?${searchParams.toString()}`, {
+      method: 'GET',
+      headers: { Accept: 'text/event-stream' },
+      // Closing the browser connection closes the upstream stream too
+      signal: request.signal,
+      cache: 'no-store',
+    });
+
+    if (!response.ok || !response.body) {
+      return new Response('Failed to open change events', { status: response.status || 502 });
+    }
+
+    return new Response(response.body, {
+      status: 200,
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache, no-transform',
+        Connection: 'keep-alive',
+      },
+    });
+  } catch (error: any) {
+    console.error('Error relaying change events:', error);
+    return new Response(error.message || 'Internal server error', { status: 500 });
+  }
+}
@@ -12,7 +12,11 @@ export async function GET(request: Request) {
         });
 
         const data = await response.json();
-        return NextResponse.json(data, { status: response.status });
+        const dataVersion = response.headers.get('x-data-version');
+        return NextResponse.json(data, {
+            status: response.status,
+            headers: dataVersion !== null ? { 'X-Data-Version': dataVersion } : {},
+        });
     } catch (error: any) {
         return NextResponse.json({ error: error.message }, { status: 500 });
     }
@@ -21,17 +25,23 @@ export async function GET(request: Request) {
 export async function POST(request: Request) {
     try {
         const { searchParams } = new URL(request.url);
-        const fiscalYear = searchParams.get('fiscalYear') || 'FY_25-26';
+        // Forward fiscalYear and baseVersion (optimistic concurrency)
+        const params = new URLSearchParams(searchParams);
+        if (!params.has('fiscalYear')) params.set('fiscalYear', 'FY_25-26');
         const body = await request.json();
 
-        const response = await fetch(`${API_BASE_URL}/location-relationships?fiscalYear=${encodeURIComponent(fiscalYear)}`, {
+        const response = await fetch(`${API_BASE_URL}/location-relationships?${params.toString()}`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(body),
         });
 
         const data = await response.json();
-        return NextResponse.json(data, { status: response.status });
+        const dataVersion = response.headers.get('x-data-version');
+        return NextResponse.json(data, {
+            status: response.status,
+            headers: dataVersion !== null ? { 'X-Data-Version': dataVersion } : {},
+        });
     } catch (error: any) {
         return NextResponse.json({ error: error.message }, { status: 500 });
     }
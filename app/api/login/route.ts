@@ -49,12 +49,15 @@ export async function POST(request: Request) {
         },
       });
     } else {
+      // 503 while the backend's password-check pool is saturated: pass Retry-After on
+      const retryAfter = response.headers.get('retry-after');
       return NextResponse.json(
         { error: data.detail || 'Login failed' },
         { 
           status: response.status,
           headers: {
             'Access-Control-Allow-Origin': '*',
+            ...(retryAfter ? { 'Retry-After': retryAfter } : {}),
           },
         }
       );
@@ -0,0 +1,38 @@
+import { NextResponse } from 'next/server';
+import { API_BASE_URL } from '@/lib/config';
+
+// POST /api/logout - Revoke the session of a refresh token
+export async function POST(request: Request) {
+  try {
+    const { refresh_token } = await request.json();
+
+    if (!refresh_token) {
+      return NextResponse.json({ success: true }, { status: 200 });
+    }
+
+    const response = await fetch(`${API_BASE_URL}/logout`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ refresh_token }),
+    });
+
+    const data = await response.json();
+
+    if (response.ok) {
+      return NextResponse.json(data, { status: 200 });
+    } else {
+      return NextResponse.json(
+        { error: data.detail || 'Logout failed' },
+        { status: response.status }
+      );
+    }
+  } catch (error: any) {
+    console.error('Error during logout:', error);
+    return NextResponse.json(
+      { error: error.message || 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
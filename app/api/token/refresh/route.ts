@@ -0,0 +1,38 @@
+import { NextResponse } from 'next/server';
+import { API_BASE_URL } from '@/lib/config';
+
+// POST /api/token/refresh - Exchange a refresh token for a new access token (the refresh token is rotated)
+export async function POST(request: Request) {
+  try {
+    const { refresh_token } = await request.json();
+
+    if (!refresh_token) {
+      return NextResponse.json({ error: 'Refresh token is required' }, { status: 400 });
+    }
+
+    const response = await fetch(`${API_BASE_URL}/token/refresh`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ refresh_token }),
+    });
+
+    const data = await response.json();
+
+    if (response.ok) {
+      return NextResponse.json(data, { status: 200 });
+    } else {
+      return NextResponse.json(
+        { error: data.detail || 'Failed to refresh session' },
+        { status: response.status }
+      );
+    }
+  } catch (error: any) {
+    console.error('Error refreshing token:', error);
+    return NextResponse.json(
+      { error: error.message || 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
@@ -2,6 +2,9 @@
 
 import React, { useState, useEffect, useMemo, useRef } from 'react';
 import { useAuth } from '@/lib/hooks/useAuth';
+import {
+  VersionConflictError, baseVersionFor, checkSaveResponse, getCommissioningBootstrap, rememberDataVersion
+} from '@/lib/hooks/useApi';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import * as XLSX from 'xlsx';
 
@@ -167,6 +170,21 @@ export default function CommissioningStatusPage() {
     sheet_count?: number;
   } | null>(null);
 
+  // One request on open for projects, summaries and master data, read from one snapshot.
+  // It primes the queries below, which only fetch on their own for refetches.
+  const { isFetched: bootstrapped } = useQuery({
+    queryKey: ['commissioning-bootstrap', fiscalYear],
+    queryFn: async () => {
+      const payload = await getCommissioningBootstrap(fiscalYear);
+      queryClient.setQueryData(['commissioning-projects', fiscalYear, filters.planActual], payload.projects);
+      queryClient.setQueryData(['commissioning-summaries', fiscalYear, filters.planActual], payload.summaries);
+      queryClient.setQueryData(['masterData', fiscalYear], payload.dropdownOptions);
+      return payload;
+    },
+    staleTime: Infinity,
+    retry: false,
+  });
+
   // Fetch projects
   const { data: projects = [], isLoading: projectsLoading } = useQuery({
     queryKey: ['commissioning-projects', fiscalYear, filters.planActual],
@@ -178,9 +196,11 @@ export default function CommissioningStatusPage() {
       }
       const response = await fetch(`/api/commissioning-projects?${params}`);
       if (!response.ok) throw new Error('Failed to fetch projects');
+      rememberDataVersion(`projects:${fiscalYear}`, response);
       return response.json();
     },
     staleTime: 5 * 60 * 1000,
+    enabled: bootstrapped,
   });
 
   // Fetch summaries
@@ -197,6 +217,7 @@ export default function CommissioningStatusPage() {
       return response.json();
     },
     staleTime: 5 * 60 * 1000,
+    enabled: bootstrapped,
   });
 
   // Fetch Master Data for dynamic categories
@@ -205,8 +226,11 @@ export default function CommissioningStatusPage() {
     queryFn: async () => {
       const response = await fetch(`/api/dropdown-options?fiscalYear=${fiscalYear}`);
       if (!response.ok) throw new Error('Failed to fetch master data');
+      rememberDataVersion('dropdowns', response);
       return response.json();
-    }
+    },
+    staleTime: 5 * 60 * 1000,
+    enabled: bootstrapped,
   });
 
   const categories = masterData?.categories || ['Solar', 'Wind'];
@@ -214,17 +238,27 @@ export default function CommissioningStatusPage() {
   // Save projects mutation
   const saveProjectsMutation = useMutation({
     mutationFn: async (updatedProjects: CommissioningProject[]) => {
-      const response = await fetch(`/api/commissioning-projects?fiscalYear=${fiscalYear}`, {
+      const key = `projects:${fiscalYear}`;
+      const baseVersion = baseVersionFor(key);
+      const params = new URLSearchParams({ fiscalYear });
+      if (baseVersion !== undefined) params.set('baseVersion', String(baseVersion));
+      const response = await fetch(`/api/commissioning-projects?${params}`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(updatedProjects),
       });
-      if (!response.ok) throw new Error('Failed to save projects');
-      return response.json();
+      return checkSaveResponse(key, response, 'Failed to save projects');
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['commissioning-projects', fiscalYear] });
     },
+    onError: (error) => {
+      if (error instanceof VersionConflictError) {
+        // Someone else saved first: show their data instead of overwriting it
+        alert(error.message);
+        queryClient.invalidateQueries({ queryKey: ['commissioning-projects', fiscalYear] });
+      }
+    },
   });
 
   const [expandedSections, setExpandedSections] = useState<Record<string, boolean>>({});
@@ -2,6 +2,13 @@
 
 import { QueryClient, QueryClientProvider } from '@tanstack/react-query';
 import { useState } from 'react';
+import { useChangeEvents } from '@/lib/hooks/useApi';
+
+// Keeps cached queries fresh from backend change events instead of time-based refetching
+function ChangeEventsListener() {
+  useChangeEvents();
+  return null;
+}
 
 export function ReactQueryProvider({
   children,
@@ -16,8 +23,8 @@ export function ReactQueryProvider({
             // Disable automatic refetching on window focus and mount
             refetchOnWindowFocus: false,
             refetchOnMount: false,
-            // Set shorter stale time for more responsive UI updates (1 minute)
-            staleTime: 1 * 60 * 1000,
+            // Change events invalidate queries when data changes, so a long stale time is safe
+            staleTime: 30 * 60 * 1000,
             // Set garbage collection time (10 minutes)
             gcTime: 10 * 60 * 1000,
             // Retry failed queries 2 times
@@ -29,6 +36,7 @@ export function ReactQueryProvider({
 
   return (
     <QueryClientProvider client={queryClient}>
+      <ChangeEventsListener />
       {children}
     </QueryClientProvider>
   );
@@ -0,0 +1,267 @@
+"""
+Access-token verification for protected routes.
+
+Verifying a bearer token means an HMAC check and JSON decode of the JWT,
+then a users-table lookup for the current role. Doing both on every request
+would put a database round trip on the hot path, so both are cached:
+
+- TokenCache: a bounded LRU of verified tokens keyed by the SHA-256 of the
+  token. A hit skips the JWT decode, but the token's `exp` is still checked
+  on every hit, so a cached token stops working exactly when it expires.
+- UserCache: user records by id for AUTH_USER_TTL_SECONDS. A role change or
+  deleted user takes effect within that window, or at once through
+  invalidate_user().
+
+A warm request costs one SHA-256 and two dict lookups, a few microseconds.
+
+get_current_user / require_admin are FastAPI dependencies for individual
+routes. With AUTH_REQUIRED=1, AuthMiddleware also demands a valid token on
+every route outside PUBLIC_PATHS. It sits outside the response cache, so
+cached responses are protected too. Enforcement is off by default; the
+Next.js proxy routes must forward the Authorization header before it is
+switched on.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from database import get_db_connection
+
+# JWT configuration
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-production")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "0").lower() in ("1", "true", "yes")
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+AUTH_USER_TTL_SECONDS = float(os.getenv("AUTH_USER_TTL_SECONDS", "30"))
+
+# Reachable without a token when AUTH_REQUIRED is on. The event stream only
+# carries change notifications, and EventSource cannot send headers. /metrics
+# is scraped by Prometheus, which is kept off the public network instead.
+PUBLIC_PATHS = {
+    '/', '/health', '/api/health', '/debug-ping',
+    '/login', '/api/login', '/token/refresh', '/api/token/refresh', '/logout', '/api/logout',
+    '/events', '/api/events', '/metrics', '/api/metrics',
+    '/docs', '/openapi.json',
+}
+
+
+class AuthError(Exception):
+    """Missing, invalid or expired token, or a token for a user that no longer exists."""
+
+
+class TokenCache:
+    """Bounded LRU of verified token claims keyed by token hash."""
+
+    def __init__(self, max_entries: int = AUTH_TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Tuple[int, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str) -> int:
+        """User id of a valid token; raises AuthError."""
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] <= now:
+                    del self._entries[key]
+                    raise AuthError("Token has expired")
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "sub"]})
+            user_id = int(claims["sub"])
+        except jwt.ExpiredSignatureError:
+            raise AuthError("Token has expired")
+        except (jwt.InvalidTokenError, ValueError) as e:
+            raise AuthError(f"Invalid token: {e}")
+
+        with self._lock:
+            self._entries[key] = (user_id, float(claims["exp"]))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return user_id
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class UserCache:
+    """User records by id, reloaded after ttl_seconds."""
+
+    def __init__(self, ttl_seconds: float = AUTH_USER_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[Optional[Dict[str, Any]], float]] = {}
+        self.hits = 0
+        self.loads = 0
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self.hits += 1
+                return entry[0]
+
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, username, email, role, created_at FROM users WHERE id = ?", (user_id,))
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        user = None
+        if row is not None:
+            user = {
+                "id": row[0],
+                "username": row[1],
+                "email": row[2],
+                "role": row[3] or "viewer",
+                "created_at": str(row[4]) if row[4] is not None else None,
+            }
+        with self._lock:
+            self.loads += 1
+            # Unknown ids are cached too, so a token of a deleted user cannot force a lookup per request
+            self._entries[user_id] = (user, now)
+        return user
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'ttlSeconds': self.ttl_seconds,
+                'hits': self.hits,
+                'loads': self.loads,
+            }
+
+
+token_cache = TokenCache()
+user_cache = UserCache()
+
+
+def invalidate_user(user_id: Optional[int] = None) -> None:
+    """Drop cached user records (all when user_id is None) after a role change or delete."""
+    user_cache.invalidate(user_id)
+
+
+def authenticate(token: str) -> Dict[str, Any]:
+    """User record for a bearer token; raises AuthError."""
+    user = user_cache.get(token_cache.verify(token))
+    if user is None:
+        raise AuthError("User no longer exists")
+    return user
+
+
+def auth_stats() -> Dict[str, Any]:
+    return {'required': AUTH_REQUIRED, 'tokens': token_cache.stats(), 'users': user_cache.stats()}
+
+
+bearer = HTTPBearer(auto_error=False)
+
+
+def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> Dict[str, Any]:
+    """Dependency: the authenticated user, or 401."""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        return authenticate(credentials.credentials)
+    except AuthError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def require_admin(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+    """Dependency: the authenticated user if they are an admin, or 403."""
+    if user["role"] != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return user
+
+
+class AuthMiddleware:
+    """
+    ASGI middleware requiring a valid bearer token on every route outside
+    PUBLIC_PATHS while AUTH_REQUIRED is on. The user is left in
+    scope['state']['user'].
+    """
+
+    def __init__(self, app, required: Optional[bool] = None):
+        self.app = app
+        self.required = required
+
+    async def __call__(self, scope, receive, send):
+        required = AUTH_REQUIRED if self.required is None else self.required
+        if (
+            not required or scope['type'] != 'http' or scope['method'] == 'OPTIONS'
+            or scope['path'] in PUBLIC_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        token = None
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                scheme, _, credentials = value.decode('latin-1').partition(' ')
+                if scheme.lower() == 'bearer' and credentials:
+                    token = credentials.strip()
+                break
+        try:
+            if token is None:
+                raise AuthError("Not authenticated")
+            scope.setdefault('state', {})['user'] = authenticate(token)
+        except AuthError as e:
+            body = json.dumps({"detail": str(e)}).encode('utf-8')
+            await send({
+                'type': 'http.response.start',
+                'status': 401,
+                'headers': [
+                    (b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode('latin-1')),
+                    (b'www-authenticate', b'Bearer'),
+                ],
+            })
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,79 @@
+"""
+Benchmark login password checks under a burst of concurrent logins.
+
+Runs the same burst twice on one event loop: bcrypt.checkpw called inline
+(the previous login path) and through PasswordPool. For each it reports
+login throughput and the worst delay seen by a 10 ms ticker coroutine that
+stands in for the other requests on the worker.
+
+Usage: python bench_login.py [--logins 24] [--rounds 12] [--workers N] [--queue-limit N]
+"""
+
+import argparse
+import asyncio
+import time
+
+import bcrypt
+
+from password_pool import PASSWORD_QUEUE_LIMIT, PASSWORD_WORKERS, PasswordPool, PoolSaturated
+
+PASSWORD = 'adani123456'
+TICK_SECONDS = 0.01
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(time.perf_counter() - start - TICK_SECONDS)
+
+
+async def inline_check(hashed: str) -> bool:
+    return bcrypt.checkpw(PASSWORD.encode('utf-8'), hashed.encode('utf-8'))
+
+
+async def burst(name: str, check, hashed: str, logins: int):
+    stop = asyncio.Event()
+    lags = []
+    tick = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(0)
+
+    async def login():
+        try:
+            return await check(hashed)
+        except PoolSaturated:
+            return None
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+
+    ok = sum(1 for r in results if r)
+    rejected = sum(1 for r in results if r is None)
+    worst = max(lags, default=elapsed) * 1000
+    print(f"{name:<10} {ok / elapsed:7.1f} logins/s  {elapsed * 1000:8.0f} ms total  "
+          f"worst loop stall {worst:7.1f} ms  rejected {rejected}")
+
+
+async def run(args):
+    hashed = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=args.rounds)).decode('utf-8')
+    pool = PasswordPool(workers=args.workers, queue_limit=args.queue_limit)
+    print(f"{args.logins} concurrent logins, bcrypt rounds {args.rounds}, "
+          f"{args.workers} workers, queue limit {args.queue_limit}")
+    await burst('inline', inline_check, hashed, args.logins)
+    await burst('pool', lambda h: pool.verify(PASSWORD, h), hashed, args.logins)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=24)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=PASSWORD_WORKERS)
+    parser.add_argument('--queue-limit', type=int, default=PASSWORD_QUEUE_LIMIT)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
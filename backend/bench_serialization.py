@@ -0,0 +1,108 @@
+"""
+Benchmark the /commissioning-projects serialization path.
+
+Compares the previous path (sqlite3.Row -> dict -> jsonable_encoder ->
+JSONResponse) with the tuple formatter + FastJSONResponse on the live DB, or
+on a synthetic portfolio when the DB has too few rows.
+
+Usage: python bench_serialization.py [--rows 20000] [--repeat 5] [--db path]
+"""
+
+import argparse
+import sqlite3
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from fiscal import MONTH_KEYS
+from project_rows import fetch_projects
+from serialization import JSON_BACKEND, FastJSONResponse
+
+
+def build_db(rows: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute(f'''
+        CREATE TABLE commissioning_projects (
+            id INTEGER PRIMARY KEY, fiscal_year TEXT, sno INTEGER, project_name TEXT, spv TEXT,
+            project_type TEXT, plot_location TEXT, capacity REAL, plan_actual TEXT,
+            {", ".join(f"{m} REAL" for m in MONTH_KEYS)},
+            total_capacity REAL, cumm_till_oct REAL, q1 REAL, q2 REAL, q3 REAL, q4 REAL,
+            category TEXT, section TEXT, included_in_total INTEGER, is_deleted INTEGER DEFAULT 0
+        )
+    ''')
+    kinds = ('Plan', 'Rephase', 'Actual')
+    conn.executemany(
+        f'''INSERT INTO commissioning_projects
+            (fiscal_year, sno, project_name, spv, project_type, plot_location, capacity, plan_actual,
+             {", ".join(MONTH_KEYS)}, category, section, included_in_total)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" for _ in MONTH_KEYS)}, ?, ?, ?)''',
+        [
+            ('FY_25-26', i // 3, f'Project {i // 3}', f'SPV-{i % 40}', 'PPA', f'Plot-{i % 300}', 100.0,
+             kinds[i % 3], *[float((i + m) % 25) for m in range(12)],
+             'Khavda Solar' if i % 2 else 'Rajasthan Wind', 'A', 1)
+            for i in range(rows)
+        ]
+    )
+    return conn
+
+
+def baseline(conn) -> bytes:
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM commissioning_projects WHERE fiscal_year = ? AND is_deleted = 0 '
+                   'ORDER BY category, sno, id', ('FY_25-26',))
+    projects = []
+    for row in cursor.fetchall():
+        row = dict(row)
+        total = row['capacity'] if row['plan_actual'] in ('Plan', 'Rephase') else sum(row[m] or 0 for m in MONTH_KEYS)
+        projects.append({
+            'id': row['id'], 'sno': row['sno'], 'projectName': row['project_name'], 'spv': row['spv'],
+            'projectType': row['project_type'], 'plotLocation': row['plot_location'],
+            'capacity': row['capacity'], 'planActual': row['plan_actual'],
+            **{m: row[m] for m in MONTH_KEYS}, 'totalCapacity': total,
+            'cummTillOct': sum(row[m] or 0 for m in MONTH_KEYS[:8]),
+            'q1': row['apr'] + row['may'] + row['jun'], 'q2': row['jul'] + row['aug'] + row['sep'],
+            'q3': row['oct'] + row['nov'] + row['dec'], 'q4': row['jan'] + row['feb'] + row['mar'],
+            'category': row['category'], 'section': row['section'], 'includedInTotal': bool(row['included_in_total']),
+        })
+    return JSONResponse(jsonable_encoder(projects)).body
+
+
+def fast(conn) -> bytes:
+    projects, _ = fetch_projects(conn.cursor(), 'FY_25-26')
+    return FastJSONResponse(projects).body
+
+
+def measure(name, fn, conn, repeat):
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn(conn))
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<32} {best * 1000:8.1f} ms  {size / best / 1e6:8.1f} MB/s  ({size} bytes)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--db', help='Benchmark against an existing SQLite DB instead of synthetic rows')
+    args = parser.parse_args()
+
+    if args.db:
+        conn = sqlite3.connect(args.db)
+        conn.row_factory = sqlite3.Row
+    else:
+        conn = build_db(args.rows)
+
+    print(f"JSON backend: {JSON_BACKEND}")
+    slow = measure('jsonable_encoder + JSONResponse', baseline, conn, args.repeat)
+    quick = measure('tuple rows + FastJSONResponse', fast, conn, args.repeat)
+    print(f"speedup: {slow / quick:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Single-request bootstrap for the commissioning status and dashboard pages.
+
+On open the pages loaded projects, summaries, dropdown options, location
+relationships and upload status separately. Each request went through its
+own Next.js route and opened its own backend connection. A save landing
+between them could also show projects of one save next to the summaries of
+another. /commissioning-bootstrap returns all of them from one connection
+inside one read transaction, so every section comes from the same snapshot.
+
+Each section is serialized once per fiscal year and stored with the
+data_versions stamp it was built at:
+
+    projects, uploadStatus   projects version
+    summaries                projects + summaries versions (rollup rows are
+                             derived from the projects)
+    dropdownOptions,         master_data_cache entries, confirmed against
+    locationRelationships    the same snapshot with get_at()
+
+The stamps are read inside the transaction. A section whose stamp matches
+is spliced into the response as stored bytes. Any other section is rebuilt
+from the same snapshot, so its stamp and data always agree.
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from data_versions import GLOBAL_SCOPE, data_version
+from database import USE_POSTGRES
+from master_data import load_dropdown_options, load_location_relationships
+from master_data_cache import master_data_cache
+from project_rows import fetch_projects
+from serialization import dumps
+
+SECTIONS = ('projects', 'summaries', 'uploadStatus', 'dropdownOptions', 'locationRelationships')
+
+
+def load_summaries(cursor, fiscal_year: str) -> List[Dict[str, Any]]:
+    """Live summary rows of a fiscal year, entered and rollup, as the API returns them."""
+    cursor.execute('''
+        SELECT * FROM commissioning_summaries
+        WHERE fiscal_year = ? AND is_deleted = 0
+        ORDER BY level, summary_type, section, category
+    ''', (fiscal_year,))
+    return [
+        {
+            'id': row['id'],
+            'category': row['category'],
+            'summaryType': row['summary_type'],
+            'apr': row['apr'],
+            'may': row['may'],
+            'jun': row['jun'],
+            'jul': row['jul'],
+            'aug': row['aug'],
+            'sep': row['sep'],
+            'oct': row['oct'],
+            'nov': row['nov'],
+            'dec': row['dec'],
+            'jan': row['jan'],
+            'feb': row['feb'],
+            'mar': row['mar'],
+            'total': row['total'],
+            'cummTillOct': row['cumm_till_oct'],
+            'q1': row['q1'],
+            'q2': row['q2'],
+            'q3': row['q3'],
+            'q4': row['q4'],
+            'level': row['level'],
+            'section': row['section']
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+def load_upload_status(cursor, fiscal_year: str) -> Dict[str, Any]:
+    """Project counts per plan/actual and the last update time of a fiscal year."""
+    cursor.execute('''
+        SELECT COUNT(*) as total,
+               SUM(CASE WHEN plan_actual = 'Plan' THEN 1 ELSE 0 END) as plan_count,
+               SUM(CASE WHEN plan_actual = 'Rephase' THEN 1 ELSE 0 END) as rephase_count,
+               SUM(CASE WHEN plan_actual = 'Actual' THEN 1 ELSE 0 END) as actual_count
+        FROM commissioning_projects
+        WHERE fiscal_year = ? AND is_deleted = 0
+    ''', (fiscal_year,))
+    row = cursor.fetchone()
+
+    cursor.execute('''
+        SELECT MAX(updated_at) as last_update
+        FROM commissioning_projects
+        WHERE fiscal_year = ?
+    ''', (fiscal_year,))
+    last_update = cursor.fetchone()
+
+    return {
+        "fiscal_year": fiscal_year,
+        "total_projects": row[0] if row else 0,
+        "plan_count": row[1] if row else 0,
+        "rephase_count": row[2] if row else 0,
+        "actual_count": row[3] if row else 0,
+        "last_update": last_update[0] if last_update else None
+    }
+
+
+def begin_snapshot(conn) -> None:
+    """Start a read transaction so every following query sees the same data."""
+    cursor = conn.cursor()
+    if USE_POSTGRES:
+        cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+    else:
+        # Deferred: the snapshot is taken by the first read
+        cursor.execute('BEGIN')
+
+
+class SectionCache:
+    """Serialized project-derived sections keyed by (fiscal year, section), stamped with data versions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple[int, ...], bytes]] = {}
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, fiscal_year: str, section: str, stamp: Tuple[int, ...], build: Callable[[], Any]) -> bytes:
+        key = (fiscal_year, section)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                return entry[1]
+        body = dumps(build())
+        with self._lock:
+            self.builds += 1
+            current = self._entries.get(key)
+            # A reader holding an older snapshot must not replace a newer entry
+            if current is None or current[0] <= stamp:
+                self._entries[key] = (stamp, body)
+        return body
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(len(body) for _, body in self._entries.values()),
+                'hits': self.hits,
+                'builds': self.builds,
+            }
+
+
+section_cache = SectionCache()
+
+
+def build_bootstrap(conn, fiscal_year: str) -> List[bytes]:
+    """
+    JSON fragments of {fiscalYear, versions, projects, summaries, uploadStatus,
+    dropdownOptions, locationRelationships}, all read from one snapshot.
+    """
+    begin_snapshot(conn)
+    try:
+        cursor = conn.cursor()
+        projects_version = data_version(cursor, 'projects', fiscal_year)
+        summaries_version = data_version(cursor, 'summaries', fiscal_year)
+
+        # A cursor per section: the project query switches its cursor to plain tuples
+        sections = {
+            'projects': section_cache.get(
+                fiscal_year, 'projects', (projects_version,),
+                lambda: fetch_projects(conn.cursor(), fiscal_year, {})[0]
+            ),
+            'summaries': section_cache.get(
+                fiscal_year, 'summaries', (projects_version, summaries_version),
+                lambda: load_summaries(conn.cursor(), fiscal_year)
+            ),
+            'uploadStatus': section_cache.get(
+                fiscal_year, 'uploadStatus', (projects_version,),
+                lambda: load_upload_status(conn.cursor(), fiscal_year)
+            ),
+        }
+        dropdowns_version, sections['dropdownOptions'] = master_data_cache.get_at(
+            cursor, 'dropdowns', GLOBAL_SCOPE, load_dropdown_options
+        )
+        relationships_version, sections['locationRelationships'] = master_data_cache.get_at(
+            cursor, 'relationships', fiscal_year, lambda c: load_location_relationships(c, fiscal_year)
+        )
+    finally:
+        # Read-only: ending the transaction releases the snapshot
+        conn.rollback()
+
+    versions = {
+        'projects': projects_version,
+        'summaries': summaries_version,
+        'dropdowns': dropdowns_version,
+        'relationships': relationships_version,
+    }
+    parts = [b'{"fiscalYear":', dumps(fiscal_year), b',"versions":', dumps(versions)]
+    for name in SECTIONS:
+        parts += [b',"', name.encode('ascii'), b'":', sections[name]]
+    parts.append(b'}')
+    return parts
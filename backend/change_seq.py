@@ -0,0 +1,115 @@
+"""
+Change sequence for commissioning_projects and the delta-sync query.
+
+Every write stamps the rows it inserts, updates or soft-deletes with a value
+from a monotonically increasing sequence (change_sequence table). Clients keep
+the last token they saw and ask only for rows with change_seq > token; soft
+deletes come back with isDeleted=true so they can be dropped locally.
+
+SQLite serializes writers and the sequence row is updated inside the writing
+transaction, so tokens become visible in commit order.
+
+When soft-deleted rows are compacted away (maintenance.py), the sync floor
+is raised to the highest change_seq removed. A token below the floor could
+miss those deletions, so fetch_changes raises SyncTokenExpired and the client
+has to resync from 0.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from project_rows import columns_for, compile_formatter, parse_fields
+
+SEQUENCE_NAME = 'commissioning_projects'
+FLOOR_NAME = 'commissioning_projects_floor'
+
+
+class SyncTokenExpired(Exception):
+    """The token predates compacted deletions; the client must resync from 0."""
+
+    def __init__(self, floor: int):
+        super().__init__(f"Sync token is older than {floor}; resync from 0")
+        self.floor = floor
+
+
+def next_change_seq(cursor) -> int:
+    """Allocate the next sequence value inside the caller's write transaction."""
+    cursor.execute('UPDATE change_sequence SET value = value + 1 WHERE name = ?', (SEQUENCE_NAME,))
+    if cursor.rowcount == 0:
+        cursor.execute('INSERT INTO change_sequence (name, value) VALUES (?, 1)', (SEQUENCE_NAME,))
+    return current_change_seq(cursor)
+
+
+def current_change_seq(cursor) -> int:
+    cursor.execute('SELECT value FROM change_sequence WHERE name = ?', (SEQUENCE_NAME,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def sync_floor(cursor) -> int:
+    cursor.execute('SELECT value FROM change_sequence WHERE name = ?', (FLOOR_NAME,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def raise_sync_floor(cursor, value: int) -> None:
+    """Tokens below `value` can no longer be served incrementally."""
+    cursor.execute('UPDATE change_sequence SET value = MAX(value, ?) WHERE name = ?', (value, FLOOR_NAME))
+    if cursor.rowcount == 0:
+        cursor.execute('INSERT INTO change_sequence (name, value) VALUES (?, ?)', (FLOOR_NAME, value))
+
+
+def backfill_change_seq(cursor) -> int:
+    """Stamp rows written before change tracking (or by scripts that bypass it)."""
+    cursor.execute('SELECT COUNT(*) FROM commissioning_projects WHERE change_seq IS NULL')
+    if not cursor.fetchone()[0]:
+        return 0
+    seq = next_change_seq(cursor)
+    cursor.execute('UPDATE commissioning_projects SET change_seq = ? WHERE change_seq IS NULL', (seq,))
+    return cursor.rowcount
+
+
+def fetch_changes(
+    cursor,
+    fiscal_year: str,
+    since: int,
+    fields: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Rows of a fiscal year changed after `since` (including soft-deleted ones),
+    in change order, and the token to send next time. Raises SyncTokenExpired
+    when deletions after `since` have been compacted away.
+    """
+    if since < 0:
+        raise ValueError("since must be >= 0")
+    selected_fields = parse_fields(fields)
+    if 'id' not in selected_fields:
+        selected_fields = ['id'] + selected_fields
+    columns = columns_for(selected_fields) + ['is_deleted', 'change_seq']
+    format_row = compile_formatter(selected_fields, columns)
+    deleted_i, seq_i = len(columns) - 2, len(columns) - 1
+
+    # Token and rows from one snapshot so nothing committed in between is skipped
+    cursor.execute('BEGIN')
+    try:
+        floor = sync_floor(cursor)
+        if 0 < since < floor:
+            raise SyncTokenExpired(floor)
+        token = current_change_seq(cursor)
+        if hasattr(cursor, 'row_factory'):
+            cursor.row_factory = None
+        cursor.execute(f'''
+            SELECT {", ".join(columns)} FROM commissioning_projects
+            WHERE fiscal_year = ? AND change_seq > ? AND change_seq <= ?
+            ORDER BY change_seq, id
+        ''', (fiscal_year, since, token))
+        rows = cursor.fetchall()
+    finally:
+        cursor.execute('COMMIT')
+
+    changes = []
+    for row in rows:
+        item = format_row(row)
+        item['isDeleted'] = bool(row[deleted_i])
+        item['changeSeq'] = row[seq_i]
+        changes.append(item)
+    return changes, token
@@ -0,0 +1,196 @@
+"""
+Response compression (brotli when installed, otherwise gzip).
+
+Bodies below a size threshold, streaming responses (Server-Sent Events,
+chunked bodies) and responses that already carry a Content-Encoding pass
+through unchanged. Responses with a strong ETag - everything served by the
+response cache - keep their compressed variants in a small LRU keyed by
+(ETag, encoding), so a cached payload is compressed once, not per request.
+"""
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+VARIANT_CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", "256"))
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/vnd.apache.arrow')
+SKIP_TYPES = ('text/event-stream',)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick 'br' or 'gzip' from an Accept-Encoding header (q=0 means refused)."""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        parts = item.strip().split(';')
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            param = param.strip()
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 keeps the output deterministic for identical bodies
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressedVariants:
+    """LRU of compressed bodies keyed by (strong ETag, encoding)."""
+
+    def __init__(self, max_entries: int = VARIANT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str, encoding: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get((etag, encoding))
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((etag, encoding))
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, encoding: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[(etag, encoding)] = body
+            self._entries.move_to_end((etag, encoding))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(len(b) for b in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+compressed_variants = CompressedVariants()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses above `min_size` bytes."""
+
+    def __init__(self, app, min_size: int = MIN_SIZE, gzip_level: int = GZIP_LEVEL,
+                 brotli_quality: int = BROTLI_QUALITY, variants: CompressedVariants = compressed_variants):
+        self.app = app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.variants = variants
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = None
+        for name, value in scope.get('headers', []):
+            if name == b'accept-encoding':
+                encoding = choose_encoding(value.decode('latin-1'))
+                break
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {'start': None, 'passthrough': False}
+
+        async def wrapped_send(message):
+            if state['passthrough']:
+                await send(message)
+                return
+
+            if message['type'] == 'http.response.start':
+                state['start'] = message
+                return
+
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            start = state['start']
+            body = message.get('body', b'')
+            headers = start.get('headers', [])
+            if message.get('more_body', False) or not self._should_compress(start['status'], headers, body):
+                # Streaming or not worth compressing: forward as-is from here on
+                state['passthrough'] = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self._compressed_body(body, headers, encoding)
+            # The compressed bytes differ from the identity body, so the validator becomes weak
+            new_headers = [
+                (n, b'W/' + v if n == b'etag' and not v.startswith(b'W/') else v)
+                for n, v in headers if n not in (b'content-length', b'vary')
+            ]
+            vary = [v for n, v in headers if n == b'vary']
+            new_headers += [
+                (b'content-encoding', encoding.encode('latin-1')),
+                (b'content-length', str(len(compressed)).encode('latin-1')),
+                (b'vary', b', '.join(vary + [b'Accept-Encoding'])),
+            ]
+            await send({**start, 'headers': new_headers})
+            await send({'type': 'http.response.body', 'body': compressed})
+
+        await self.app(scope, receive, wrapped_send)
+
+    def _should_compress(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> bool:
+        if status != 200 or len(body) < self.min_size:
+            return False
+        content_type = ''
+        for name, value in headers:
+            if name == b'content-encoding':
+                return False
+            if name == b'content-type':
+                content_type = value.decode('latin-1').lower()
+        if content_type.startswith(SKIP_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _compressed_body(self, body: bytes, headers: List[Tuple[bytes, bytes]], encoding: str) -> bytes:
+        etag = None
+        for name, value in headers:
+            if name == b'etag':
+                etag = value.decode('latin-1')
+        # Only strong ETags identify the exact bytes
+        if etag is None or etag.startswith('W/'):
+            return compress(body, encoding, self.gzip_level, self.brotli_quality)
+
+        compressed = self.variants.get(etag, encoding)
+        if compressed is None:
+            compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            self.variants.put(etag, encoding, compressed)
+        return compressed
@@ -0,0 +1,460 @@
+"""
+Server-side aggregation for the executive dashboard.
+
+Computes the KPI cards, gauge, half-yearly / quarterly / monthly series and
+the slicer option lists with GROUP BY queries so the browser no longer has
+to download every project row and filter/reduce it per filter change.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fiscal import MONTH_KEYS, QUARTER_MONTHS, HALF_MONTHS, months_through, period_months, period_label, validate_month
+
+VALID_SCOPES = ('Overall', 'Solar', 'Wind')
+
+# Capacity types are never mixed: every figure is computed from exactly one of these
+PLAN_ACTUAL_TYPES = ('Plan', 'Rephase', 'Actual')
+
+
+def _build_filters(
+    fiscal_year: str,
+    scope: str = 'Overall',
+    category: Optional[str] = None,
+    project_name: Optional[str] = None,
+    spv: Optional[str] = None,
+    project_type: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    """WHERE clause shared by the dashboard queries. Only rows included in totals count."""
+    clauses = ["fiscal_year = ?", "is_deleted = 0", "included_in_total = 1"]
+    params: List[Any] = [fiscal_year]
+
+    if scope == 'Solar':
+        clauses.append("LOWER(category) LIKE '%solar%'")
+    elif scope == 'Wind':
+        clauses.append("LOWER(category) LIKE '%wind%'")
+
+    if category:
+        clauses.append("category = ?")
+        params.append(category)
+    if project_name:
+        clauses.append("project_name = ?")
+        params.append(project_name)
+    if spv:
+        clauses.append("spv = ?")
+        params.append(spv)
+    if project_type:
+        clauses.append("project_type = ?")
+        params.append(project_type)
+
+    return " AND ".join(clauses), params
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {'rows': 0, 'projects': 0, 'capacity': 0.0, 'months': {m: 0.0 for m in MONTH_KEYS}}
+
+
+def aggregate_by_plan_actual(cursor, fiscal_year: str, **filters) -> Dict[str, Dict[str, Any]]:
+    """
+    One grouped query returning, per plan_actual type, the row count, distinct
+    project count, capacity sum and the 12 monthly sums.
+    """
+    where, params = _build_filters(fiscal_year, **filters)
+    month_sums = ", ".join(f"SUM(COALESCE({m}, 0))" for m in MONTH_KEYS)
+    cursor.execute(f'''
+        SELECT plan_actual, COUNT(*), COUNT(DISTINCT project_name), SUM(COALESCE(capacity, 0)), {month_sums}
+        FROM commissioning_projects
+        WHERE {where}
+        GROUP BY plan_actual
+    ''', params)
+
+    totals = {pa: _empty_totals() for pa in PLAN_ACTUAL_TYPES}
+    for row in cursor.fetchall():
+        plan_actual = row[0]
+        if plan_actual not in totals:
+            continue
+        totals[plan_actual] = {
+            'rows': row[1],
+            'projects': row[2],
+            'capacity': row[3] or 0.0,
+            'months': {m: (row[4 + i] or 0.0) for i, m in enumerate(MONTH_KEYS)},
+        }
+    return totals
+
+
+def _sum_months(totals: Dict[str, Any], months: List[str]) -> float:
+    return sum(totals['months'][m] for m in months)
+
+
+def _achievement(plan: float, actual: float) -> float:
+    return (actual / plan) * 100 if plan > 0 else 0
+
+
+def build_kpi(totals: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    KPI card figures.
+    PLAN/REPHASE use Capacity, ACTUAL uses sum(Apr..Mar) - same rule as totalCapacity.
+    """
+    plan = totals['Plan']['capacity']
+    rephase = totals['Rephase']['capacity']
+    actual = _sum_months(totals['Actual'], MONTH_KEYS)
+    return {
+        'plan': plan,
+        'rephase': rephase,
+        'actual': actual,
+        'projectsCount': totals['Plan']['projects'],
+        'achievement': _achievement(plan, actual),
+    }
+
+
+def build_gauge(totals: Dict[str, Dict[str, Any]], period: str) -> Dict[str, Any]:
+    """Achievement gauge for a period. The full year compares against planned capacity."""
+    if (period or 'yearly').lower() == 'yearly':
+        plan = totals['Plan']['capacity']
+        actual = _sum_months(totals['Actual'], MONTH_KEYS)
+    else:
+        months = period_months(period)
+        plan = _sum_months(totals['Plan'], months)
+        actual = _sum_months(totals['Actual'], months)
+    return {
+        'period': (period or 'yearly').lower(),
+        'periodName': period_label(period),
+        'plan': plan,
+        'actual': actual,
+        'remaining': max(0, plan - actual),
+        'achievement': _achievement(plan, actual),
+    }
+
+
+def build_as_of(totals: Dict[str, Dict[str, Any]], as_of: str) -> Dict[str, Any]:
+    """Cumulative-to-date (Apr..as_of) Plan / Rephase / Actual and the plan still remaining after it."""
+    months = months_through(as_of)
+    plan = _sum_months(totals['Plan'], months)
+    actual = _sum_months(totals['Actual'], months)
+    return {
+        'asOf': validate_month(as_of),
+        'plan': plan,
+        'rephase': _sum_months(totals['Rephase'], months),
+        'actual': actual,
+        'remainingPlan': _sum_months(totals['Plan'], MONTH_KEYS) - plan,
+        'deviation': actual - plan,
+        'achievement': _achievement(plan, actual),
+    }
+
+
+def build_series(totals: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Half-yearly, quarterly and monthly Plan / Actual / Rephase series."""
+    def point(name: str, months: List[str]) -> Dict[str, Any]:
+        plan = _sum_months(totals['Plan'], months)
+        actual = _sum_months(totals['Actual'], months)
+        return {
+            'name': name,
+            'plan': plan,
+            'actual': actual,
+            'rephase': _sum_months(totals['Rephase'], months),
+            'deviation': actual - plan,
+        }
+
+    return {
+        'halfYearly': [point(key.upper(), months) for key, months in HALF_MONTHS.items()],
+        'quarterly': [point(key.upper(), months) for key, months in QUARTER_MONTHS.items()],
+        'monthly': [point(m, [m]) for m in MONTH_KEYS],
+    }
+
+
+def aggregate_from_store(store, **filters) -> Dict[str, Dict[str, Any]]:
+    """Same result as aggregate_by_plan_actual, computed with vectorized masks over a FiscalYearStore."""
+    mask = store.mask(**filters)
+    return {pa: store.totals(mask, pa) for pa in PLAN_ACTUAL_TYPES}
+
+
+def option_lists_from_store(store) -> Dict[str, List[str]]:
+    mask = store.included
+    return {
+        'categories': store.distinct('category', mask),
+        'projects': store.distinct('project_name', mask),
+        'spvs': store.distinct('spv', mask),
+    }
+
+
+def get_option_lists(cursor, fiscal_year: str) -> Dict[str, List[str]]:
+    """Slicer options (categories, projects, SPVs) from rows included in totals."""
+    cursor.execute('''
+        SELECT category, project_name, spv
+        FROM commissioning_projects
+        WHERE fiscal_year = ? AND is_deleted = 0 AND included_in_total = 1
+        GROUP BY category, project_name, spv
+    ''', (fiscal_year,))
+    categories, projects, spvs = set(), set(), set()
+    for category, project_name, spv in cursor.fetchall():
+        if category:
+            categories.add(category)
+        if project_name:
+            projects.add(project_name)
+        if spv:
+            spvs.add(spv)
+    return {
+        'categories': sorted(categories),
+        'projects': sorted(projects),
+        'spvs': sorted(spvs),
+    }
+
+
+def build_dashboard(
+    cursor,
+    fiscal_year: str,
+    scope: str = 'Overall',
+    category: Optional[str] = None,
+    project_name: Optional[str] = None,
+    spv: Optional[str] = None,
+    project_type: Optional[str] = None,
+    period: str = 'yearly',
+    store=None,
+    as_of: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Assemble the full dashboard payload for one scope / filter / period combination.
+    With a FiscalYearStore the figures come from memory; otherwise from SQL.
+    """
+    if scope not in VALID_SCOPES:
+        raise ValueError(f"Invalid scope '{scope}'. Valid scopes: {list(VALID_SCOPES)}")
+    period_months(period)  # validate early
+    if as_of:
+        validate_month(as_of)
+
+    filters = {
+        'scope': scope,
+        'category': category,
+        'project_name': project_name,
+        'spv': spv,
+        'project_type': project_type,
+    }
+    if store is not None:
+        totals = aggregate_from_store(store, **filters)
+        options = option_lists_from_store(store)
+    else:
+        totals = aggregate_by_plan_actual(cursor, fiscal_year, **filters)
+        options = get_option_lists(cursor, fiscal_year)
+
+    result = {
+        'fiscalYear': fiscal_year,
+        'scope': scope,
+        'filters': {
+            'category': category,
+            'projectName': project_name,
+            'spv': spv,
+            'projectType': project_type,
+        },
+        'kpi': build_kpi(totals),
+        'gauge': build_gauge(totals, period),
+        'options': options,
+    }
+    result.update(build_series(totals))
+    if as_of:
+        result['asOf'] = build_as_of(totals, as_of)
+    return result
+
+
+# --- Cross-fiscal-year comparison ---
+
+# Grouping name -> column
+COMPARISON_GROUPS = {
+    'category': 'category',
+    'section': 'section',
+    'spv': 'spv',
+    'project': 'project_name',
+}
+
+MAX_COMPARISON_YEARS = 10
+
+
+class YearAggregateCache:
+    """
+    Bounded LRU of per-year comparison aggregates keyed by (fiscal year, group_by,
+    scope), each stored with the data version it was read at. Fiscal years come
+    from the client, so the number of entries is capped.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str, str], version: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Tuple[str, str, str], version: Any, aggregates: Dict[str, Any]) -> None:
+        with self._lock:
+            current = self._entries.get(key)
+            # A reader that started before a write must not replace a newer entry
+            if current is not None and current[0] > version:
+                return
+            self._entries[key] = (version, aggregates)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+year_aggregates = YearAggregateCache(max_entries=int(os.getenv("COMPARISON_CACHE_MAX_ENTRIES", "256")))
+
+
+def parse_fiscal_years(fiscal_years: str) -> List[str]:
+    years = []
+    for fy in fiscal_years.split(','):
+        fy = fy.strip()
+        if fy and fy not in years:
+            years.append(fy)
+    if not years:
+        raise ValueError("At least one fiscal year is required")
+    if len(years) > MAX_COMPARISON_YEARS:
+        raise ValueError(f"At most {MAX_COMPARISON_YEARS} fiscal years can be compared")
+    return years
+
+
+def aggregate_years(cursor, fiscal_years: List[str], group_by: str, scope: str = 'Overall') -> Dict[str, Dict[str, Any]]:
+    """
+    One grouped query over several fiscal years:
+    {fiscal_year: {group key: {plan_actual: totals}}} for every requested year.
+    """
+    column = COMPARISON_GROUPS[group_by]
+    placeholders = ", ".join("?" for _ in fiscal_years)
+    clauses = [f"fiscal_year IN ({placeholders})", "is_deleted = 0", "included_in_total = 1"]
+    if scope == 'Solar':
+        clauses.append("LOWER(category) LIKE '%solar%'")
+    elif scope == 'Wind':
+        clauses.append("LOWER(category) LIKE '%wind%'")
+
+    month_sums = ", ".join(f"SUM(COALESCE({m}, 0))" for m in MONTH_KEYS)
+    cursor.execute(f'''
+        SELECT fiscal_year, COALESCE({column}, ''), plan_actual, COUNT(*), COUNT(DISTINCT project_name),
+               SUM(COALESCE(capacity, 0)), {month_sums}
+        FROM commissioning_projects
+        WHERE {" AND ".join(clauses)}
+        GROUP BY fiscal_year, COALESCE({column}, ''), plan_actual
+    ''', list(fiscal_years))
+
+    result: Dict[str, Dict[str, Any]] = {fy: {} for fy in fiscal_years}
+    for row in cursor.fetchall():
+        fiscal_year, key, plan_actual = row[0], row[1], row[2]
+        if plan_actual not in PLAN_ACTUAL_TYPES:
+            continue
+        group = result[fiscal_year].setdefault(key, {pa: _empty_totals() for pa in PLAN_ACTUAL_TYPES})
+        group[plan_actual] = {
+            'rows': row[3],
+            'projects': row[4],
+            'capacity': row[5] or 0.0,
+            'months': {m: (row[6 + i] or 0.0) for i, m in enumerate(MONTH_KEYS)},
+        }
+    return result
+
+
+def _figures(totals: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Monthly, quarterly and total figures per type; totals follow the totalCapacity rule."""
+    figures = {}
+    for plan_actual in PLAN_ACTUAL_TYPES:
+        t = totals[plan_actual]
+        figures[plan_actual.lower()] = {
+            'months': dict(t['months']),
+            'quarters': {q: _sum_months(t, months) for q, months in QUARTER_MONTHS.items()},
+            'total': _sum_months(t, MONTH_KEYS) if plan_actual == 'Actual' else t['capacity'],
+        }
+    return figures
+
+
+def _merge_totals(groups: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    merged = {pa: _empty_totals() for pa in PLAN_ACTUAL_TYPES}
+    for group in groups:
+        for plan_actual, t in group.items():
+            m = merged[plan_actual]
+            m['rows'] += t['rows']
+            m['capacity'] += t['capacity']
+            for month in MONTH_KEYS:
+                m['months'][month] += t['months'][month]
+    return merged
+
+
+def build_comparison(
+    cursor,
+    fiscal_years: List[str],
+    group_by: str = 'category',
+    scope: str = 'Overall',
+    version_of: Optional[Callable[[str], Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Year-over-year comparison per group. Per-year aggregates are cached under the
+    year's data version (`version_of(fy)`); only years missing from the cache are
+    queried, all of them in the same grouped query. Versions are read before the
+    query, so a write landing during it leaves the entry stale, never mislabeled.
+    """
+    if group_by not in COMPARISON_GROUPS:
+        raise ValueError(f"Invalid groupBy '{group_by}'. Valid values: {list(COMPARISON_GROUPS)}")
+    if scope not in VALID_SCOPES:
+        raise ValueError(f"Invalid scope '{scope}'. Valid scopes: {list(VALID_SCOPES)}")
+
+    per_year: Dict[str, Dict[str, Any]] = {}
+    versions: Dict[str, Any] = {}
+    missing = []
+    for fy in fiscal_years:
+        cached = None
+        if version_of:
+            versions[fy] = version_of(fy)
+            cached = year_aggregates.get((fy, group_by, scope), versions[fy])
+        if cached is not None:
+            per_year[fy] = cached
+        else:
+            missing.append(fy)
+
+    if missing:
+        fresh = aggregate_years(cursor, missing, group_by, scope)
+        for fy in missing:
+            per_year[fy] = fresh[fy]
+            if version_of:
+                year_aggregates.put((fy, group_by, scope), versions[fy], fresh[fy])
+
+    group_keys = sorted({key for fy in fiscal_years for key in per_year[fy]})
+    empty = {pa: _empty_totals() for pa in PLAN_ACTUAL_TYPES}
+
+    def changes(figures_by_year: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Change of each year's totals against the previous requested year."""
+        result = {}
+        for previous, current in zip(fiscal_years, fiscal_years[1:]):
+            result[current] = {}
+            for name in ('plan', 'rephase', 'actual'):
+                before = figures_by_year[previous][name]['total']
+                after = figures_by_year[current][name]['total']
+                result[current][name] = {
+                    'delta': after - before,
+                    'pct': ((after - before) / before) * 100 if before else None,
+                }
+        return result
+
+    groups = []
+    for key in group_keys:
+        years = {fy: _figures(per_year[fy].get(key, empty)) for fy in fiscal_years}
+        groups.append({'key': key, 'years': years, 'change': changes(years)})
+
+    totals = {fy: _figures(_merge_totals(list(per_year[fy].values()))) for fy in fiscal_years}
+
+    return {
+        'fiscalYears': fiscal_years,
+        'groupBy': group_by,
+        'scope': scope,
+        'groups': groups,
+        'totals': totals,
+        'totalsChange': changes(totals),
+    }
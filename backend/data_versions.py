@@ -0,0 +1,110 @@
+"""
+Optimistic concurrency for the save endpoints.
+
+Each dataset a save endpoint overwrites has a version number:
+
+    projects       commissioning projects of a fiscal year
+    dropdowns      dropdown options (global, the table has no fiscal year)
+    relationships  location relationships of a fiscal year
+    summaries      entered commissioning summaries of a fiscal year
+    tableData      the master table; reuses the table_data header version,
+                   which every master-table write already bumps
+
+GET responses carry the version in the X-Data-Version header. A save sends
+it back as baseVersion. claim_version() compares and bumps in one
+`UPDATE ... WHERE version = ?` on the data_versions primary key, so check and
+write cannot interleave with a concurrent save. A save based on a stale
+version updates no row and raises VersionConflict, which the endpoints turn
+into a 409 carrying the current version. Saves without baseVersion (older
+clients) keep last-writer-wins behaviour but still bump the version.
+
+Writes that are not full saves (single deletes, uploads, imports) call
+bump_version() so that clients holding an older version get a conflict.
+"""
+
+from typing import Optional
+
+from table_rows import current_version as table_version
+
+VERSION_HEADER = 'X-Data-Version'
+ENTITIES = ('projects', 'dropdowns', 'relationships', 'summaries', 'tableData')
+GLOBAL_SCOPE = ''
+
+
+class VersionConflict(Exception):
+    """A save was based on an older version than the stored one."""
+
+    def __init__(self, entity: str, current: int):
+        super().__init__(
+            f"Conflicting save: {entity} changed since it was loaded (now at version {current}); "
+            "reload and reapply your edits"
+        )
+        self.entity = entity
+        self.current = current
+
+
+def data_version(cursor, entity: str, scope: str = GLOBAL_SCOPE) -> int:
+    """Current version of a dataset (0 before its first write)."""
+    if entity == 'tableData':
+        return table_version(cursor, scope)
+    cursor.execute('SELECT version FROM data_versions WHERE entity = ? AND scope = ?', (entity, scope))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def bump_version(cursor, entity: str, scope: str = GLOBAL_SCOPE) -> int:
+    """Unconditionally advance a dataset's version; returns the new one."""
+    cursor.execute('''
+        UPDATE data_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE entity = ? AND scope = ?
+    ''', (entity, scope))
+    if cursor.rowcount == 0:
+        cursor.execute('INSERT INTO data_versions (entity, scope, version) VALUES (?, ?, 1)', (entity, scope))
+        return 1
+    return data_version(cursor, entity, scope)
+
+
+def claim_version(cursor, entity: str, scope: str, base_version: Optional[int]) -> int:
+    """
+    Compare-and-bump for a save based on `base_version`; returns the new
+    version or raises VersionConflict. Run it before the save's other writes.
+    """
+    if base_version is None:
+        return bump_version(cursor, entity, scope)
+    cursor.execute('''
+        UPDATE data_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE entity = ? AND scope = ? AND version = ?
+    ''', (entity, scope, base_version))
+    if cursor.rowcount == 1:
+        return base_version + 1
+    if base_version == 0:
+        # First save of a dataset that has never been versioned; a concurrent
+        # first save makes this insert fail on the primary key
+        try:
+            cursor.execute('INSERT INTO data_versions (entity, scope, version) VALUES (?, ?, 1)', (entity, scope))
+            return 1
+        except Exception:
+            pass
+    raise VersionConflict(entity, data_version(cursor, entity, scope))
+
+
+def claim_table_version(cursor, fiscal_year: str, base_version: Optional[int]) -> None:
+    """
+    Compare step for a master-table save. The UPDATE takes the header's row
+    lock, so a concurrent save with the same base waits and then fails. The
+    save itself bumps the version.
+    """
+    if base_version is None:
+        return
+    cursor.execute('''
+        UPDATE table_data SET updated_at = CURRENT_TIMESTAMP WHERE fiscal_year = ? AND version = ?
+    ''', (fiscal_year, base_version))
+    if cursor.rowcount == 1:
+        return
+    current = table_version(cursor, fiscal_year)
+    if current != base_version:
+        raise VersionConflict('tableData', current)
+
+
+def version_headers(version: int) -> dict:
+    return {VERSION_HEADER: str(version)}
@@ -3,6 +3,8 @@ import bcrypt
 from typing import List, Any, Dict, Optional
 from dotenv import load_dotenv
 
+from fiscal import PREFIX_COLUMNS
+
 load_dotenv()
 
 # Configuration
@@ -120,6 +122,8 @@ def init_db():
                     q2 REAL,
                     q3 REAL,
                     q4 REAL,
+                    level TEXT,
+                    section TEXT DEFAULT '',
                     is_deleted BOOLEAN DEFAULT FALSE,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -129,6 +133,145 @@ def init_db():
             # Indexes
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_cp_fiscal_year ON commissioning_projects(fiscal_year)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_cs_fiscal_year ON commissioning_summaries(fiscal_year)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cp_dashboard ON commissioning_projects(fiscal_year, is_deleted, included_in_total, plan_actual)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cp_keyset ON commissioning_projects(fiscal_year, is_deleted, category, sno, id)')
+            for column in ('plan_actual', 'section', 'spv', 'project_type'):
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_cp_{column} ON commissioning_projects(fiscal_year, is_deleted, {column})')
+            # Per-row prefix sums over the fiscal months (cumm_<m> = apr + ... + m)
+            for column in PREFIX_COLUMNS.values():
+                cursor.execute(f"ALTER TABLE commissioning_projects ADD COLUMN IF NOT EXISTS {column} REAL")
+            # Change sequence stamped on every insert / update / soft delete (delta sync)
+            cursor.execute("ALTER TABLE commissioning_projects ADD COLUMN IF NOT EXISTS change_seq INTEGER")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_sequence (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cp_change_seq ON commissioning_projects(fiscal_year, change_seq)')
+            # Generations: each bulk save is a generation, the pointer table names the current one
+            cursor.execute("ALTER TABLE commissioning_projects ADD COLUMN IF NOT EXISTS generation INTEGER")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS commissioning_generations (
+                    fiscal_year TEXT NOT NULL,
+                    generation INTEGER NOT NULL,
+                    source TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    superseded_seq INTEGER,
+                    pruned BOOLEAN DEFAULT FALSE,
+                    PRIMARY KEY (fiscal_year, generation)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS commissioning_current_generation (
+                    fiscal_year TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cp_generation ON commissioning_projects(fiscal_year, generation)')
+            # Master data (dropdown options are global, relationships per fiscal year)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dropdown_options (
+                    id SERIAL PRIMARY KEY,
+                    option_type TEXT NOT NULL,
+                    option_value TEXT NOT NULL,
+                    version INTEGER DEFAULT 1,
+                    is_deleted BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS location_relationships (
+                    id SERIAL PRIMARY KEY,
+                    fiscal_year TEXT NOT NULL DEFAULT 'FY_25',
+                    location TEXT NOT NULL,
+                    location_code TEXT NOT NULL,
+                    version INTEGER DEFAULT 1,
+                    is_deleted BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_dropdown_options_type_deleted ON dropdown_options(option_type, is_deleted)')
+            # One live row per value (master_data.py inserts / deletes single values through it);
+            # drop live duplicates left by older full-table rewrites first
+            cursor.execute('''
+                DELETE FROM dropdown_options WHERE is_deleted = 0 AND id NOT IN (
+                    SELECT MIN(id) FROM dropdown_options WHERE is_deleted = 0 GROUP BY option_type, option_value
+                )
+            ''')
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_dropdown_options_live_value
+                ON dropdown_options(option_type, option_value) WHERE is_deleted = 0
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_location_relationships_fiscal_year_deleted ON location_relationships(fiscal_year, is_deleted)')
+            # Optimistic concurrency: one version per saved dataset (see data_versions.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    entity TEXT NOT NULL,
+                    scope TEXT NOT NULL DEFAULT '',
+                    version INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (entity, scope)
+                )
+            ''')
+            # Refresh tokens, stored as SHA-256 hashes (see refresh_tokens.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS refresh_tokens (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users(id),
+                    token_hash TEXT NOT NULL UNIQUE,
+                    family_id TEXT NOT NULL,
+                    expires_at TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    used_at TIMESTAMP,
+                    revoked_at TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens(family_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_expires ON refresh_tokens(user_id, expires_at)')
+            # Master table: table_data is the per-year header, rows are versioned in table_data_rows
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS table_data (
+                    id SERIAL PRIMARY KEY,
+                    fiscal_year TEXT NOT NULL UNIQUE,
+                    data TEXT NOT NULL,
+                    version INTEGER DEFAULT 1,
+                    is_deleted BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute("ALTER TABLE table_data ADD COLUMN IF NOT EXISTS row_storage BOOLEAN DEFAULT FALSE")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS table_data_rows (
+                    id SERIAL PRIMARY KEY,
+                    fiscal_year TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    position DOUBLE PRECISION NOT NULL,
+                    data TEXT NOT NULL,
+                    valid_from INTEGER NOT NULL,
+                    valid_to INTEGER
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS table_data_versions (
+                    fiscal_year TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    changed_rows INTEGER NOT NULL,
+                    removed_rows INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (fiscal_year, version)
+                )
+            ''')
+            cursor.execute("ALTER TABLE table_data_versions ADD COLUMN IF NOT EXISTS size_bytes INTEGER")
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tdr_current ON table_data_rows(fiscal_year, valid_to, position)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tdr_history ON table_data_rows(fiscal_year, valid_from)')
+            cursor.execute("ALTER TABLE commissioning_summaries ADD COLUMN IF NOT EXISTS level TEXT")
+            cursor.execute("ALTER TABLE commissioning_summaries ADD COLUMN IF NOT EXISTS section TEXT DEFAULT ''")
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_cs_rollup ON commissioning_summaries(fiscal_year, level, summary_type, section, category) WHERE level IS NOT NULL')
             
             # Admin user
             cursor.execute("SELECT id FROM users WHERE email = %s", ("admin@adani.com",))
@@ -207,6 +350,23 @@ def init_db():
                 cursor.execute("ALTER TABLE commissioning_projects ADD COLUMN included_in_total BOOLEAN DEFAULT TRUE")
             except:
                 pass
+            # Per-row prefix sums over the fiscal months (cumm_<m> = apr + ... + m)
+            for column in PREFIX_COLUMNS.values():
+                try:
+                    cursor.execute(f"ALTER TABLE commissioning_projects ADD COLUMN {column} REAL")
+                except:
+                    pass
+            # Change sequence stamped on every insert / update / soft delete (delta sync)
+            try:
+                cursor.execute("ALTER TABLE commissioning_projects ADD COLUMN change_seq INTEGER")
+            except:
+                pass
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_sequence (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
             
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS commissioning_summaries (
@@ -232,6 +392,8 @@ def init_db():
                     q2 REAL,
                     q3 REAL,
                     q4 REAL,
+                    level TEXT,
+                    section TEXT DEFAULT '',
                     is_deleted BOOLEAN DEFAULT FALSE,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
@@ -240,6 +402,156 @@ def init_db():
             
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_commissioning_projects_fiscal_year ON commissioning_projects(fiscal_year)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_commissioning_summaries_fiscal_year ON commissioning_summaries(fiscal_year)')
+            # Covers the dashboard GROUP BY plan_actual aggregates
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_commissioning_projects_dashboard ON commissioning_projects(fiscal_year, is_deleted, included_in_total, plan_actual)')
+            # Keyset pagination order and the /commissioning-projects equality filters
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_commissioning_projects_keyset ON commissioning_projects(fiscal_year, is_deleted, category, sno, id)')
+            for column in ('plan_actual', 'section', 'spv', 'project_type'):
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_commissioning_projects_{column} ON commissioning_projects(fiscal_year, is_deleted, {column})')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_commissioning_projects_change_seq ON commissioning_projects(fiscal_year, change_seq)')
+            # Generations: each bulk save is a generation, the pointer table names the current one
+            try:
+                cursor.execute("ALTER TABLE commissioning_projects ADD COLUMN generation INTEGER")
+            except:
+                pass
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS commissioning_generations (
+                    fiscal_year TEXT NOT NULL,
+                    generation INTEGER NOT NULL,
+                    source TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    superseded_seq INTEGER,
+                    pruned BOOLEAN DEFAULT 0,
+                    PRIMARY KEY (fiscal_year, generation)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS commissioning_current_generation (
+                    fiscal_year TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_commissioning_projects_generation ON commissioning_projects(fiscal_year, generation)')
+            # Master data (dropdown options are global, relationships per fiscal year)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dropdown_options (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    option_type TEXT NOT NULL,
+                    option_value TEXT NOT NULL,
+                    version INTEGER DEFAULT 1,
+                    is_deleted BOOLEAN DEFAULT FALSE,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS location_relationships (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fiscal_year TEXT NOT NULL DEFAULT 'FY_25',
+                    location TEXT NOT NULL,
+                    location_code TEXT NOT NULL,
+                    version INTEGER DEFAULT 1,
+                    is_deleted BOOLEAN DEFAULT FALSE,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_dropdown_options_type_deleted ON dropdown_options(option_type, is_deleted)')
+            # One live row per value (master_data.py inserts / deletes single values through it);
+            # drop live duplicates left by older full-table rewrites first
+            cursor.execute('''
+                DELETE FROM dropdown_options WHERE is_deleted = 0 AND id NOT IN (
+                    SELECT MIN(id) FROM dropdown_options WHERE is_deleted = 0 GROUP BY option_type, option_value
+                )
+            ''')
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_dropdown_options_live_value
+                ON dropdown_options(option_type, option_value) WHERE is_deleted = 0
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_location_relationships_fiscal_year_deleted ON location_relationships(fiscal_year, is_deleted)')
+            # Optimistic concurrency: one version per saved dataset (see data_versions.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    entity TEXT NOT NULL,
+                    scope TEXT NOT NULL DEFAULT '',
+                    version INTEGER NOT NULL DEFAULT 0,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (entity, scope)
+                )
+            ''')
+            # Refresh tokens, stored as SHA-256 hashes (see refresh_tokens.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS refresh_tokens (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL REFERENCES users(id),
+                    token_hash TEXT NOT NULL UNIQUE,
+                    family_id TEXT NOT NULL,
+                    expires_at DATETIME NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    used_at DATETIME,
+                    revoked_at DATETIME
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens(family_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_expires ON refresh_tokens(user_id, expires_at)')
+
+            # Master table: table_data is the per-year header, rows are versioned in table_data_rows
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS table_data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fiscal_year TEXT NOT NULL UNIQUE,
+                    data TEXT NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    version INTEGER DEFAULT 1,
+                    is_deleted BOOLEAN DEFAULT FALSE
+                )
+            ''')
+            try:
+                cursor.execute("ALTER TABLE table_data ADD COLUMN row_storage BOOLEAN DEFAULT FALSE")
+            except:
+                pass
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS table_data_rows (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fiscal_year TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    position REAL NOT NULL,
+                    data TEXT NOT NULL,
+                    valid_from INTEGER NOT NULL,
+                    valid_to INTEGER
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS table_data_versions (
+                    fiscal_year TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    changed_rows INTEGER NOT NULL,
+                    removed_rows INTEGER NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (fiscal_year, version)
+                )
+            ''')
+            # Encoded size of each version, shown in the backup listing
+            try:
+                cursor.execute("ALTER TABLE table_data_versions ADD COLUMN size_bytes INTEGER")
+            except:
+                pass
+            # Current rows in table order / rows written by a given version
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_table_data_rows_current ON table_data_rows(fiscal_year, valid_to, position)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_table_data_rows_history ON table_data_rows(fiscal_year, valid_from)')
+            
+            # Rollup rows (level IS NOT NULL) are maintained by rollups.py
+            try:
+                cursor.execute("ALTER TABLE commissioning_summaries ADD COLUMN level TEXT")
+            except:
+                pass
+            try:
+                cursor.execute("ALTER TABLE commissioning_summaries ADD COLUMN section TEXT DEFAULT ''")
+            except:
+                pass
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_commissioning_summaries_rollup ON commissioning_summaries(fiscal_year, level, summary_type, section, category) WHERE level IS NOT NULL')
             
             # Admin user
             cursor.execute("SELECT id FROM users WHERE email = ?", ("admin@adani.com",))
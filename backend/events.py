@@ -0,0 +1,111 @@
+"""
+Server-Sent Events for data changes.
+
+Every cache bump or notification is published as a small event
+  {"fiscalYear": ..., "entity": ..., "version": ..., "epoch": ...}
+to the connected dashboards, so they refetch only when something changed
+instead of polling. Writes run in the threadpool, so publishing hands the
+event to each subscriber's event loop with call_soon_threadsafe.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+QUEUE_SIZE = 100
+
+# Entities carried in change events
+ENTITIES = ('projects', 'summaries', 'dropdowns', 'relationships', 'tableData')
+
+
+def format_sse(data: Dict[str, Any], event: str = 'change', event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class ChangeBroadcaster:
+    """Fan-out of change events to every open /events stream."""
+
+    def __init__(self, queue_size: int = QUEUE_SIZE, heartbeat: float = HEARTBEAT_SECONDS):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._lock = threading.Lock()
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, fiscal_year: Optional[str], entity: Optional[str], version: Tuple[int, int]) -> None:
+        """Queue an event for every subscriber. Safe to call from any thread."""
+        event = {
+            'id': next(self._ids),
+            'fiscalYear': fiscal_year,
+            'entity': entity,
+            'epoch': version[0],
+            'version': version[1],
+        }
+        self.published += 1
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # Loop already closed - the stream is gone
+                self._discard(loop, queue)
+
+    def on_bump(self, fiscal_year: Optional[str], entity: Optional[str], version: Tuple[int, int]) -> None:
+        """ResponseCache listener."""
+        self.publish(fiscal_year, entity, version)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        # A slow client drops its oldest event rather than blocking publishers
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def _discard(self, loop, queue) -> None:
+        with self._lock:
+            self._subscribers.discard((loop, queue))
+
+    async def stream(self, fiscal_year: Optional[str] = None, is_disconnected=None) -> AsyncIterator[str]:
+        """
+        SSE text for one client. Only events for `fiscal_year` (or global events)
+        are sent when a year is given; a comment heartbeat keeps proxies from
+        closing an idle connection.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add((loop, queue))
+        try:
+            yield f'retry: 5000\n{format_sse({"fiscalYear": fiscal_year}, event="ready")}'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    if is_disconnected is not None and await is_disconnected():
+                        break
+                    yield ': ping\n\n'
+                    continue
+                if fiscal_year and event['fiscalYear'] not in (None, fiscal_year):
+                    continue
+                payload = {k: v for k, v in event.items() if k != 'id'}
+                yield format_sse(payload, event_id=event['id'])
+        finally:
+            self._discard(loop, queue)
+
+
+change_broadcaster = ChangeBroadcaster()
@@ -342,13 +342,19 @@ def parse_data_sheet(df: pd.DataFrame, sheet_name: str) -> tuple:
 def import_projects_to_db(projects: List[Dict], summaries: List[Dict] = None, fiscal_year: str = "FY_25-26"):
     """Import parsed projects into the database."""
     from database import get_db_connection
+    from rollups import rebuild_rollups
+    from change_seq import next_change_seq
+    from generations import begin_generation
+    from data_versions import bump_version
     
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # Clear existing data
-        cursor.execute("DELETE FROM commissioning_projects WHERE fiscal_year = ?", (fiscal_year,))
+        # Clear existing data. The current generation is soft-deleted (superseded) so delta
+        # sync can report the removals and the previous import can be restored.
+        change_seq = next_change_seq(cursor)
+        generation = begin_generation(cursor, fiscal_year, 'import', change_seq)
         cursor.execute("DELETE FROM commissioning_summaries WHERE fiscal_year = ?", (fiscal_year,))
         
         # Deduplicate
@@ -373,8 +379,8 @@ def import_projects_to_db(projects: List[Dict], summaries: List[Dict] = None, fi
                     fiscal_year, sno, project_name, spv, project_type, plot_location,
                     capacity, plan_actual, category, section, included_in_total,
                     apr, may, jun, jul, aug, sep, oct, nov, dec, jan, feb, mar,
-                    total_capacity, cumm_till_oct, q1, q2, q3, q4
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    total_capacity, cumm_till_oct, q1, q2, q3, q4, change_seq, generation
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 fiscal_year, p.get('sno'), p.get('project_name'), p.get('spv'),
                 p.get('project_type'), p.get('plot_location'), p.get('capacity'),
@@ -384,12 +390,16 @@ def import_projects_to_db(projects: List[Dict], summaries: List[Dict] = None, fi
                 p.get('aug'), p.get('sep'), p.get('oct'), p.get('nov'),
                 p.get('dec'), p.get('jan'), p.get('feb'), p.get('mar'),
                 p.get('total_capacity'), p.get('cumm_till_oct'),
-                p.get('q1'), p.get('q2'), p.get('q3'), p.get('q4')
+                p.get('q1'), p.get('q2'), p.get('q3'), p.get('q4'), change_seq, generation
             ))
             inserted += 1
         
+        # Materialize Section -> Category -> Solar/Wind -> Overall rollups
+        rebuild_rollups(cursor, fiscal_year)
+        bump_version(cursor, 'projects', fiscal_year)
+        
         conn.commit()
-        return {'success': True, 'inserted_projects': inserted, 'inserted_summaries': 0}
+        return {'success': True, 'inserted_projects': inserted, 'inserted_summaries': 0, 'generation': generation}
         
     except Exception as e:
         import traceback
@@ -0,0 +1,71 @@
+"""
+Fiscal calendar helpers shared by the commissioning endpoints.
+AGEL fiscal years run April -> March.
+"""
+
+from typing import List
+
+# Fiscal month order (Apr..Mar) - matches the month columns in commissioning_projects
+MONTH_KEYS = ['apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec', 'jan', 'feb', 'mar']
+
+QUARTER_MONTHS = {
+    'q1': ['apr', 'may', 'jun'],
+    'q2': ['jul', 'aug', 'sep'],
+    'q3': ['oct', 'nov', 'dec'],
+    'q4': ['jan', 'feb', 'mar'],
+}
+
+HALF_MONTHS = {
+    'h1': ['apr', 'may', 'jun', 'jul', 'aug', 'sep'],
+    'h2': ['oct', 'nov', 'dec', 'jan', 'feb', 'mar'],
+}
+
+# Month up to which cummTillOct / cumm_till_oct is reported (status as of
+# 31-Dec-25 covers Apr-Nov, although the column name still says Oct)
+CUMM_TILL_MONTH = 'nov'
+CUMM_MONTHS = MONTH_KEYS[:MONTH_KEYS.index(CUMM_TILL_MONTH) + 1]
+
+# Stored per-row prefix sums: cumm_<m> = apr + ... + m
+PREFIX_COLUMNS = {m: f'cumm_{m}' for m in MONTH_KEYS}
+
+PERIOD_LABELS = {
+    'yearly': 'Full FY',
+    'h1': 'H1 (Apr-Sep)',
+    'h2': 'H2 (Oct-Mar)',
+    'q1': 'Q1 (Apr-Jun)',
+    'q2': 'Q2 (Jul-Sep)',
+    'q3': 'Q3 (Oct-Dec)',
+    'q4': 'Q4 (Jan-Mar)',
+}
+
+
+def period_months(period: str) -> List[str]:
+    """Return the month keys covered by a period ('yearly', 'h1', 'q3', 'oct', ...)."""
+    period = (period or 'yearly').lower()
+    if period == 'yearly':
+        return list(MONTH_KEYS)
+    if period in HALF_MONTHS:
+        return list(HALF_MONTHS[period])
+    if period in QUARTER_MONTHS:
+        return list(QUARTER_MONTHS[period])
+    if period in MONTH_KEYS:
+        return [period]
+    raise ValueError(f"Invalid period '{period}'. Use yearly, h1/h2, q1-q4 or a month key (apr..mar)")
+
+
+def period_label(period: str) -> str:
+    period = (period or 'yearly').lower()
+    return PERIOD_LABELS.get(period, period.capitalize())
+
+
+def validate_month(month: str) -> str:
+    """Normalise a month key ('Nov' -> 'nov'); raises ValueError for anything else."""
+    key = (month or '').strip().lower()
+    if key not in MONTH_KEYS:
+        raise ValueError(f"Invalid month '{month}'. Use a month key (apr..mar)")
+    return key
+
+
+def months_through(month: str) -> List[str]:
+    """Fiscal months from April up to and including `month`."""
+    return MONTH_KEYS[:MONTH_KEYS.index(validate_month(month)) + 1]
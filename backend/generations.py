@@ -0,0 +1,228 @@
+"""
+Generations of a fiscal year's commissioning projects.
+
+Every bulk save or Excel import of a fiscal year starts a new generation:
+its rows carry generation = N, and commissioning_current_generation points
+the fiscal year at N. The previous generation's rows are not copied or
+deleted. They are soft-deleted in one UPDATE stamped with a single
+change_seq, which is kept as that generation's superseded_seq. That value
+tells its rows apart from rows deleted one at a time while it was current.
+
+Reads keep filtering on is_deleted = 0. Live rows are exactly the rows of
+the pointed-to generation (minus individual deletes), so the project
+store, rollups and delta sync need no changes. Restoring generation G moves
+the pointer and re-flags rows in place: the current generation's live rows
+become superseded and G's superseded rows become live. Both steps use one
+fresh change_seq, so delta-sync clients see the switch. Nothing is copied.
+
+Edits that rewrite a whole year in place (reset, monthly upload) fork first:
+fork_generation begins a new generation holding copies of the live rows, and
+the edit changes the copies, so the previous generation stays restorable.
+
+Generations beyond the newest KEEP_GENERATIONS are marked pruned by the
+soft-delete compaction job (maintenance.py). That job then reclaims their
+rows.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from change_seq import next_change_seq
+
+KEEP_GENERATIONS = int(os.getenv("COMMISSIONING_KEEP_GENERATIONS", "10"))
+
+# A soft-deleted project row that a kept generation still needs for restore
+PROTECTED_ROW = '''EXISTS (
+    SELECT 1 FROM commissioning_generations g
+    WHERE g.fiscal_year = commissioning_projects.fiscal_year
+      AND g.generation = commissioning_projects.generation
+      AND g.pruned = 0
+      AND g.superseded_seq = commissioning_projects.change_seq
+)'''
+
+
+class GenerationError(ValueError):
+    """Restore target that can no longer be (or need not be) restored."""
+
+
+class GenerationNotFound(GenerationError):
+    """Restore target that does not exist."""
+
+
+def current_generation(cursor, fiscal_year: str) -> Optional[int]:
+    cursor.execute(
+        'SELECT generation FROM commissioning_current_generation WHERE fiscal_year = ?', (fiscal_year,)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _set_current(cursor, fiscal_year: str, generation: int) -> None:
+    cursor.execute(
+        'UPDATE commissioning_current_generation SET generation = ? WHERE fiscal_year = ?',
+        (generation, fiscal_year)
+    )
+    if cursor.rowcount == 0:
+        cursor.execute(
+            'INSERT INTO commissioning_current_generation (fiscal_year, generation) VALUES (?, ?)',
+            (fiscal_year, generation)
+        )
+
+
+def _supersede_live_rows(cursor, fiscal_year: str, change_seq: int) -> None:
+    cursor.execute('''
+        UPDATE commissioning_projects
+        SET is_deleted = 1, change_seq = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE fiscal_year = ? AND is_deleted = 0
+    ''', (change_seq, fiscal_year))
+    current = current_generation(cursor, fiscal_year)
+    if current is not None:
+        cursor.execute('''
+            UPDATE commissioning_generations SET superseded_seq = ?
+            WHERE fiscal_year = ? AND generation = ?
+        ''', (change_seq, fiscal_year, current))
+
+
+def begin_generation(cursor, fiscal_year: str, source: str, change_seq: int) -> int:
+    """
+    Supersede the fiscal year's live rows (stamped with `change_seq`) and make
+    a new, empty generation current. The caller inserts its rows with the
+    returned generation number.
+    """
+    _supersede_live_rows(cursor, fiscal_year, change_seq)
+    cursor.execute(
+        'SELECT COALESCE(MAX(generation), 0) + 1 FROM commissioning_generations WHERE fiscal_year = ?',
+        (fiscal_year,)
+    )
+    generation = cursor.fetchone()[0]
+    cursor.execute('''
+        INSERT INTO commissioning_generations (fiscal_year, generation, source)
+        VALUES (?, ?, ?)
+    ''', (fiscal_year, generation, source))
+    _set_current(cursor, fiscal_year, generation)
+    return generation
+
+
+def fork_generation(cursor, fiscal_year: str, source: str) -> int:
+    """
+    Begin a new generation holding copies of the fiscal year's live rows, for
+    an edit that then updates them in place. Returns the new generation.
+    """
+    cursor.execute('SELECT * FROM commissioning_projects WHERE 1 = 0')
+    columns = ', '.join(
+        d[0] for d in cursor.description
+        if d[0] not in ('id', 'generation', 'is_deleted', 'change_seq', 'created_at', 'updated_at')
+    )
+    change_seq = next_change_seq(cursor)
+    generation = begin_generation(cursor, fiscal_year, source, change_seq)
+    # The rows just superseded are exactly the previously live ones
+    cursor.execute(f'''
+        INSERT INTO commissioning_projects ({columns}, generation, is_deleted, change_seq)
+        SELECT {columns}, ?, 0, ? FROM commissioning_projects
+        WHERE fiscal_year = ? AND is_deleted = 1 AND change_seq = ?
+    ''', (generation, change_seq, fiscal_year, change_seq))
+    return generation
+
+
+def restore_generation(cursor, fiscal_year: str, generation: int) -> int:
+    """
+    Make `generation` current again by moving the pointer and re-flagging
+    rows in place. Returns the change_seq stamped on the switched rows.
+    The caller rebuilds rollups.
+    """
+    cursor.execute('''
+        SELECT superseded_seq, pruned FROM commissioning_generations
+        WHERE fiscal_year = ? AND generation = ?
+    ''', (fiscal_year, generation))
+    target = cursor.fetchone()
+    if target is None:
+        raise GenerationNotFound(f"Generation {generation} not found for {fiscal_year}")
+    superseded_seq, pruned = target[0], target[1]
+    if pruned:
+        raise GenerationError(f"Generation {generation} has been pruned")
+    if generation == current_generation(cursor, fiscal_year):
+        raise GenerationError(f"Generation {generation} is already current")
+
+    change_seq = next_change_seq(cursor)
+    _supersede_live_rows(cursor, fiscal_year, change_seq)
+    cursor.execute('''
+        UPDATE commissioning_projects
+        SET is_deleted = 0, change_seq = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE fiscal_year = ? AND generation = ? AND is_deleted = 1 AND change_seq = ?
+    ''', (change_seq, fiscal_year, generation, superseded_seq))
+    cursor.execute('''
+        UPDATE commissioning_generations SET superseded_seq = NULL
+        WHERE fiscal_year = ? AND generation = ?
+    ''', (fiscal_year, generation))
+    _set_current(cursor, fiscal_year, generation)
+    return change_seq
+
+
+def list_generations(cursor, fiscal_year: str) -> List[Dict[str, Any]]:
+    """Generations of a fiscal year, newest first, with their row counts."""
+    current = current_generation(cursor, fiscal_year)
+    cursor.execute('''
+        SELECT g.generation, g.source, g.created_at, g.pruned, (
+            SELECT COUNT(*) FROM commissioning_projects p
+            WHERE p.fiscal_year = g.fiscal_year AND p.generation = g.generation
+              AND (p.is_deleted = 0 OR p.change_seq = g.superseded_seq)
+        )
+        FROM commissioning_generations g
+        WHERE g.fiscal_year = ?
+        ORDER BY g.generation DESC
+    ''', (fiscal_year,))
+    return [
+        {
+            'generation': r[0],
+            'source': r[1],
+            'createdAt': r[2],
+            'pruned': bool(r[3]),
+            'rowCount': r[4],
+            'isCurrent': r[0] == current,
+        }
+        for r in cursor.fetchall()
+    ]
+
+
+def prune_generations(cursor, keep: Optional[int] = None) -> int:
+    """Mark all but the newest `keep` (KEEP_GENERATIONS) non-current generations of each fiscal year as pruned."""
+    keep = KEEP_GENERATIONS if keep is None else keep
+    cursor.execute('''
+        SELECT g.fiscal_year, g.generation FROM commissioning_generations g
+        LEFT JOIN commissioning_current_generation c ON c.fiscal_year = g.fiscal_year
+        WHERE g.pruned = 0 AND (c.generation IS NULL OR g.generation != c.generation)
+        ORDER BY g.fiscal_year, g.generation DESC
+    ''')
+    seen: Dict[str, int] = {}
+    expired = []
+    for fiscal_year, generation in cursor.fetchall():
+        seen[fiscal_year] = seen.get(fiscal_year, 0) + 1
+        if seen[fiscal_year] > keep:
+            expired.append((fiscal_year, generation))
+    cursor.executemany(
+        'UPDATE commissioning_generations SET pruned = 1 WHERE fiscal_year = ? AND generation = ?', expired
+    )
+    return len(expired)
+
+
+def adopt_legacy_rows(cursor) -> int:
+    """
+    Give fiscal years saved before generations existed a first generation
+    holding their live rows. Returns the number of fiscal years adopted.
+    """
+    cursor.execute('''
+        SELECT DISTINCT fiscal_year FROM commissioning_projects
+        WHERE is_deleted = 0 AND generation IS NULL
+          AND fiscal_year NOT IN (SELECT fiscal_year FROM commissioning_current_generation)
+    ''')
+    fiscal_years = [r[0] for r in cursor.fetchall()]
+    for fiscal_year in fiscal_years:
+        cursor.execute('''
+            INSERT INTO commissioning_generations (fiscal_year, generation, source) VALUES (?, 1, 'legacy')
+        ''', (fiscal_year,))
+        _set_current(cursor, fiscal_year, 1)
+        cursor.execute('''
+            UPDATE commissioning_projects SET generation = 1
+            WHERE fiscal_year = ? AND is_deleted = 0 AND generation IS NULL
+        ''', (fiscal_year,))
+    return len(fiscal_years)
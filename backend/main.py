@@ -1,7 +1,8 @@
 ﻿from fastapi import FastAPI, HTTPException, Query, Body, Depends, Request, status, File, UploadFile, Form
 from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 import pandas as pd
 import io
 from fastapi.staticfiles import StaticFiles
@@ -14,31 +15,103 @@ from pathlib import Path
 import os
 import subprocess
 import sys
-import bcrypt
 import jwt
 # import openai - REMOVED FOR DATA SENSITIVITY
 from dotenv import load_dotenv
 
 load_dotenv()
 
+import database
 from database import get_db_connection, init_db
+from dashboard import build_comparison, build_dashboard, parse_fiscal_years
+from response_cache import ResponseCacheMiddleware, response_cache
+from compression import CompressionMiddleware, compressed_variants
+from project_store import ProjectStore
+from change_seq import SyncTokenExpired, backfill_change_seq, fetch_changes, next_change_seq
+from maintenance import MODES as COMPACTION_MODES, soft_delete_compactor
+from master_data import (
+    add_option, db_option_type, load_dropdown_options, load_location_relationships, remove_option, replace_options
+)
+from master_data_cache import master_data_cache
+from bootstrap import build_bootstrap, load_summaries, load_upload_status, section_cache
+from password_pool import RETRY_AFTER_SECONDS, PoolSaturated, password_pool
+from auth import (
+    ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY, AuthMiddleware, auth_stats, get_current_user
+)
+from refresh_tokens import (
+    InvalidRefreshToken, RefreshTokenReused, issue_refresh_token, purge_expired_tokens, revoke_refresh_token,
+    rotate_refresh_token
+)
+from events import change_broadcaster
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, request_metrics, sqlite_file_stats
+from data_versions import (
+    GLOBAL_SCOPE, VERSION_HEADER, VersionConflict, bump_version, claim_table_version, claim_version, data_version,
+    version_headers
+)
+from generations import (
+    GenerationError, GenerationNotFound, adopt_legacy_rows, begin_generation, current_generation,
+    fork_generation, list_generations, restore_generation
+)
+from table_history import history_compactor
+from table_rows import (
+    apply_changes, close_rows, delete_version, list_versions, load_rows, migrate_blobs, purge_rows, rows_json,
+    save_rows, stream_version, version_exists
+)
+from project_rows import (
+    ARROW_MEDIA_TYPE, FORMATS as PROJECT_FORMATS, fetch_project_columns, fetch_projects, to_arrow_ipc, to_columnar
+)
+from serialization import FastJSONResponse, dumps, raw_json_response
+from rollups import (
+    SECTION_INCLUSION_MAP, calculate_derived_values, is_section_included_in_totals,
+    _aggregate_projects_summary, apply_project_change, backfill_rollups,
+    fetch_project_row, rebuild_rollups, refresh_derived_columns
+)
 from schemas import (
-    UserRegister, UserLogin, UserResponse, LoginResponse,
+    UserRegister, UserLogin, UserResponse, LoginResponse, RefreshTokenRequest, TokenResponse,
     CommissioningProject, CommissioningSummary, CommissioningDataRequest,
-    DropdownOptionsModel, ManualProjectRequest
+    ManualProjectRequest
 )
 
-# JWT configuration
-SECRET_KEY = "your-secret-key-change-this-in-production"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
 app = FastAPI()
 
 class ChatRequest(BaseModel):
     message: str
     context: Optional[Dict[str, Any]] = None
 
+def version_conflict(e: VersionConflict) -> HTTPException:
+    """409 for a save based on a stale version; the header tells the client the current one."""
+    return HTTPException(status_code=409, detail=str(e), headers=version_headers(e.current))
+
+# In-memory column store for dashboard aggregation; reloads a year after any worker bumps its version
+project_store = ProjectStore(
+    lambda cursor, fy: data_version(cursor, 'projects', fy),
+    max_years=int(os.getenv("PROJECT_STORE_MAX_YEARS", "8"))
+)
+
+def shared_data_version(fiscal_year: str):
+    """
+    projects and summaries data_versions for a fiscal year. Cached responses are
+    keyed on these, so saves made by other workers invalidate them too.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        return data_version(cursor, 'projects', fiscal_year), data_version(cursor, 'summaries', fiscal_year)
+    finally:
+        conn.close()
+
+response_cache.set_version_source(shared_data_version)
+
+# Push every cache bump to connected dashboards as a change event
+response_cache.add_listener(change_broadcaster.on_bump)
+
+# Serve unchanged fiscal-year reads from memory (ETag / 304 aware).
+# Added first so it sits innermost: CORS headers and compression apply to cached responses too.
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
+# Bearer-token check when AUTH_REQUIRED is on; outside the response cache so cached reads are protected too
+app.add_middleware(AuthMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -46,11 +119,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", VERSION_HEADER],
 )
 
+# gzip / brotli for large bodies; compressed variants of cached responses are reused by ETag
+app.add_middleware(CompressionMiddleware)
+
+# Per-route request counts, latency and response-size histograms for /metrics.
+# Added last so it is outermost and times cached, rejected and compressed responses alike.
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
+def is_upload_request(method: str, route: str) -> bool:
+    return method == 'POST' and 'upload' in route
+
+def component_stats():
+    """Cache, pool and job gauges exported on /metrics as app_component_stat."""
+    components = {
+        "responseCache": response_cache.stats(),
+        "compression": compressed_variants.stats(),
+        "projectStore": project_store.stats(),
+        "eventStream": {"subscribers": change_broadcaster.subscriber_count},
+        "tableDataCompaction": history_compactor.stats(),
+        "softDeleteCompaction": soft_delete_compactor.stats(),
+        "masterData": master_data_cache.stats(),
+        "bootstrap": section_cache.stats(),
+        "passwordPool": password_pool.stats(),
+        "auth": auth_stats(),
+        "uploads": {"inFlight": request_metrics.in_flight(is_upload_request)},
+    }
+    # Connections are opened per request, so there is no pool to report; file sizes show WAL growth
+    if not database.USE_POSTGRES:
+        components["database"] = sqlite_file_stats(database.DB_PATH)
+    return components
+
+request_metrics.add_collector(component_stats)
+
 @app.on_event("startup")
 def startup_event():
     init_db()
+    # The migrations and maintenance jobs below are written in SQLite SQL
+    if database.USE_POSTGRES:
+        return
+    # Materialize rollups for fiscal years imported before they existed
+    conn = get_db_connection()
+    try:
+        backfill_rollups(conn.cursor())
+        # Stamp rows that predate change tracking so delta sync sees them
+        backfill_change_seq(conn.cursor())
+        # Split master-table blobs written before row-level storage
+        migrate_blobs(conn.cursor())
+        # Give fiscal years saved before generations existed their first generation
+        adopt_legacy_rows(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+    # Periodic retention + compression of master-table history
+    history_compactor.start(get_db_connection)
+    # Periodic archive/purge of soft-deleted generations
+    soft_delete_compactor.start(get_db_connection)
 
 @app.get("/health")
 def health_check():
@@ -67,6 +193,53 @@ def health_check():
 def api_health_check():
     return health_check()
 
+@app.get("/cache-stats")
+def get_cache_stats():
+    return {
+        **response_cache.stats(),
+        "compression": compressed_variants.stats(),
+        "projectStore": project_store.stats(),
+        "eventSubscribers": change_broadcaster.subscriber_count,
+        "tableDataCompaction": history_compactor.stats(),
+        "softDeleteCompaction": soft_delete_compactor.stats(),
+        "masterData": master_data_cache.stats(),
+        "bootstrap": section_cache.stats(),
+        "passwordPool": password_pool.stats(),
+        "auth": auth_stats(),
+    }
+
+# Additional route with /api prefix for direct access
+@app.get("/api/cache-stats")
+def api_get_cache_stats():
+    return get_cache_stats()
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of request and component metrics."""
+    return Response(content=request_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+# Additional route with /api prefix for direct access
+@app.get("/api/metrics")
+def api_get_metrics():
+    return get_metrics()
+
+@app.get("/events")
+async def change_events(request: Request, fiscalYear: Optional[str] = Query(None)):
+    """
+    Server-Sent Events stream of data changes: {fiscalYear, entity, version, epoch}.
+    Clients refetch only when an event for their fiscal year arrives.
+    """
+    return StreamingResponse(
+        change_broadcaster.stream(fiscalYear, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Additional route with /api prefix for direct access
+@app.get("/api/events")
+async def api_change_events(request: Request, fiscalYear: Optional[str] = Query(None)):
+    return await change_events(request, fiscalYear)
+
 @app.get("/")
 def read_root():
     return {"message": "Backend is running", "ports": "8002"}
@@ -84,17 +257,45 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# Login endpoint
-@app.post("/login", response_model=LoginResponse)
-async def login_user(user: UserLogin):
+def create_user_access_token(user_id: int, email: str) -> str:
+    return create_access_token(
+        data={"sub": str(user_id), "email": email},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+def find_login_user(email: str) -> Optional[Dict[str, Any]]:
     conn = get_db_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-   
+    try:
+        cursor.execute("SELECT id, username, email, password, role, created_at FROM users WHERE email = ?", (email,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+def start_session(user_id: int) -> str:
+    """Store a new refresh-token family for a login and return its first token."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        purge_expired_tokens(cursor, user_id)
+        refresh_token = issue_refresh_token(cursor, user_id)
+        conn.commit()
+        return refresh_token
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# Login endpoint
+@app.post("/login", response_model=LoginResponse)
+async def login_user(user: UserLogin):
+    # Database work runs on the threadpool: a write waiting on the SQLite lock must not stall the event loop
     try:
         # Find user by email
-        cursor.execute("SELECT id, username, email, password, role, created_at FROM users WHERE email = ?", (user.email,))
-        db_user = cursor.fetchone()
+        db_user = await run_in_threadpool(find_login_user, user.email)
        
         if not db_user:
             raise HTTPException(
@@ -108,8 +309,16 @@ async def login_user(user: UserLogin):
         if isinstance(stored_password, bytes):
             stored_password = stored_password.decode('utf-8')
         
-        # Now verify the password
-        if not bcrypt.checkpw(user.password.encode('utf-8'), stored_password.encode('utf-8')):
+        # Now verify the password (on the bounded pool, off the event loop)
+        try:
+            password_ok = await password_pool.verify(user.password, stored_password)
+        except PoolSaturated:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many logins in progress, please retry",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+        if not password_ok:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
@@ -124,16 +333,14 @@ async def login_user(user: UserLogin):
             "created_at": db_user["created_at"]
         }
        
-        # Create access token
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": str(db_user["id"]), "email": db_user["email"]},
-            expires_delta=access_token_expires
-        )
+        # Create access token, plus a refresh token so the session can continue without the password
+        access_token = create_user_access_token(db_user["id"], db_user["email"])
+        refresh_token = await run_in_threadpool(start_session, db_user["id"])
        
         return {
             "user": user_response,
             "access_token": access_token,
+            "refresh_token": refresh_token,
             "token_type": "bearer"
         }
     except HTTPException:
@@ -143,14 +350,81 @@ async def login_user(user: UserLogin):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error during login: {str(e)}"
         )
-    finally:
-        conn.close()
 
 # Additional route with /api prefix for direct access
 @app.post("/api/login", response_model=LoginResponse)
 async def api_login_user(user: UserLogin):
     return await login_user(user)
 
+@app.get("/me", response_model=UserResponse)
+def read_current_user(user: Dict[str, Any] = Depends(get_current_user)):
+    """The user the bearer token belongs to."""
+    return user
+
+# Additional route with /api prefix for direct access
+@app.get("/api/me", response_model=UserResponse)
+def api_read_current_user(user: Dict[str, Any] = Depends(get_current_user)):
+    return user
+
+@app.post("/token/refresh", response_model=TokenResponse)
+def refresh_access_token(request: RefreshTokenRequest):
+    """
+    Exchange a refresh token for a new access token. The refresh token is
+    rotated: the one presented is used up and its successor is returned.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        user_id, refresh_token = rotate_refresh_token(cursor, request.refresh_token)
+        cursor.execute("SELECT email FROM users WHERE id = ?", (user_id,))
+        db_user = cursor.fetchone()
+        if not db_user:
+            raise InvalidRefreshToken("User no longer exists")
+        conn.commit()
+        return {
+            "access_token": create_user_access_token(user_id, db_user[0]),
+            "refresh_token": refresh_token,
+            "token_type": "bearer"
+        }
+    except RefreshTokenReused as e:
+        # Keeps the revocation of the replayed token's family
+        conn.commit()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    except InvalidRefreshToken as e:
+        # Nothing to keep; undoes a rotation made before the user turned out to be gone
+        conn.rollback()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+# Additional route with /api prefix for direct access
+@app.post("/api/token/refresh", response_model=TokenResponse)
+def api_refresh_access_token(request: RefreshTokenRequest):
+    return refresh_access_token(request)
+
+@app.post("/logout")
+def logout_user(request: RefreshTokenRequest):
+    """Revoke the session of a refresh token. Succeeds for unknown tokens too."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        revoke_refresh_token(cursor, request.refresh_token)
+        conn.commit()
+        return {"success": True}
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+# Additional route with /api prefix for direct access
+@app.post("/api/logout")
+def api_logout_user(request: RefreshTokenRequest):
+    return logout_user(request)
+
 # --- Variables Endpoints ---
 
 # Get all variables or a specific variable by key
@@ -291,51 +565,14 @@ async def api_delete_variable(key: str, user_id: Optional[str] = None):
 
 @app.get("/dropdown-options")
 def get_dropdown_options(fiscalYear: str = Query(None)):
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
     try:
-        cursor.execute('SELECT * FROM dropdown_options WHERE is_deleted = 0')
-        rows = cursor.fetchall()
-        
-        if rows:
-            options = {
-                'groups': [],
-                'ppaMerchants': [],
-                'types': [],
-                'locationCodes': [],
-                'locations': [],
-                'connectivities': []
-            }
-            # Also handle dynamic keys
-            for row in rows:
-                key = row['option_type']
-                value = row['option_value']
-                # Map database keys to API keys
-                key_mapping = {
-                    'ppa-merchants': 'ppaMerchants',
-                    'location-codes': 'locationCodes'
-                }
-                api_key = key_mapping.get(key, key)
-                if api_key not in options:
-                    options[api_key] = []
-                options[api_key].append(value)
-            
-            return options
-        else:
-            # Default options
-            return {
-                "groups": ['AGEL', 'ACL'],
-                "ppaMerchants": ['PPA', 'Merchant'],
-                "types": ['Solar', 'Wind', 'Hybrid'],
-                "locationCodes": ['Khavda', 'RJ'],
-                "locations": ['Khavda', 'Baap', 'Essel'],
-                "connectivities": ['CTU']
-            }
+        # Options are global; fiscalYear is accepted for older clients
+        version, body = master_data_cache.get(get_db_connection, 'dropdowns', GLOBAL_SCOPE, load_dropdown_options)
+        response = raw_json_response([body])
+        response.headers[VERSION_HEADER] = str(version)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 # Additional route with /api prefix for direct access
 @app.get("/api/dropdown-options")
@@ -343,41 +580,31 @@ def api_get_dropdown_options(fiscalYear: str = Query(None)):
     return get_dropdown_options(fiscalYear)
 
 @app.post("/dropdown-options")
-def save_dropdown_options(options: dict):
+def save_dropdown_options(
+    options: dict,
+    baseVersion: Optional[int] = Query(None, description="X-Data-Version the edit was based on")
+):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        # Soft delete existing options
-        cursor.execute('''
-            UPDATE dropdown_options
-            SET is_deleted = 1, version = version + 1, updated_at = CURRENT_TIMESTAMP
-        ''')
-        
-        # Insert new options
-        # Ensure we're using the correct field names from the Pydantic model
-        options_dict = options.dict(exclude={'fiscalYear'})
-        # Map API keys to database keys
-        key_mapping = {
-            'ppaMerchants': 'ppa-merchants',
-            'locationCodes': 'location-codes'
-        }
-        for key, values in options_dict.items():
-            if isinstance(values, list):
-                # Map the key for database storage
-                db_key = key_mapping.get(key, key)
-                for value in values:
-                    cursor.execute('''
-                        INSERT INTO dropdown_options (option_type, option_value, version)
-                        VALUES (?, ?, 1)
-                    ''', (db_key, value))
+        version = claim_version(cursor, 'dropdowns', '', baseVersion)
+
+        # Write only the difference to the stored lists (fiscalYear is not used)
+        options_dict = {key: values for key, values in options.items() if key != 'fiscalYear'}
+        replace_options(
+            cursor,
+            {db_option_type(key): values for key, values in options_dict.items() if isinstance(values, list)},
+            all_types=True
+        )
         
         conn.commit()
-        # Return the saved options
-        result = options.dict()
-        # Remove fiscalYear from response since it's not used
-        if 'fiscalYear' in result:
-            del result['fiscalYear']
-        return result
+        master_data_cache.note_write('dropdowns', GLOBAL_SCOPE, version)
+        response_cache.notify(None, 'dropdowns')
+        # Return the saved options (fiscalYear is not used)
+        return FastJSONResponse(options_dict, headers=version_headers(version))
+    except VersionConflict as e:
+        conn.rollback()
+        raise version_conflict(e)
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -386,14 +613,16 @@ def save_dropdown_options(options: dict):
 
 # Additional route with /api prefix for direct access
 @app.post("/api/dropdown-options")
-def api_save_dropdown_options(options: dict):
-    return save_dropdown_options(options)
+def api_save_dropdown_options(options: dict, baseVersion: Optional[int] = Query(None)):
+    return save_dropdown_options(options, baseVersion)
 
 # Additional route for single dropdown option (used by Next.js)
 @app.post("/dropdown-option")
 def add_dropdown_option(option: Dict[str, Any] = Body(...)):
-    # This endpoint adds a single dropdown option
-    # It's used by the Next.js /api/dropdown-option route
+    """
+    Add a single dropdown option (one indexed lookup + one insert).
+    Expects json body: { "optionType": "groups", "optionValue": "AGEL", "baseVersion": 3 }
+    """
     option_type = option.get('optionType')
     option_value = option.get('optionValue')
    
@@ -403,70 +632,59 @@ def add_dropdown_option(option: Dict[str, Any] = Body(...)):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        # First, get all existing options
-        cursor.execute('''
-            SELECT option_type, option_value FROM dropdown_options
-            WHERE is_deleted = 0
-        ''', ())
-        rows = cursor.fetchall()
-       
-        # Build current options dictionary
-        current_options = {
-            'groups': [],
-            'ppaMerchants': [],
-            'types': [],
-            'locationCodes': [],
-            'locations': [],
-            'connectivities': []
-        }
-       
-        # Map database keys to API keys
-        key_mapping = {
-            'ppa-merchants': 'ppaMerchants',
-            'location-codes': 'locationCodes'
-        }
-       
-        for row in rows:
-            key = row['option_type']
-            value = row['option_value']
-            # Map database keys to API keys
-            api_key = key_mapping.get(key, key)
-            if api_key in current_options:
-                current_options[api_key].append(value)
-       
-        # Add the new option if it doesn't already exist
-        if option_type in current_options and option_value not in current_options[option_type]:
-            current_options[option_type].append(option_value)
-       
-        # Soft delete existing options
-        cursor.execute('''
-            UPDATE dropdown_options
-            SET is_deleted = 1, version = version + 1, updated_at = CURRENT_TIMESTAMP
-        ''')
-       
-        # Insert all options (including the new one)
-        # Map API keys to database keys
-        reverse_key_mapping = {
-            'ppaMerchants': 'ppa-merchants',
-            'locationCodes': 'location-codes'
-        }
-        for key, values in current_options.items():
-            # Map the key for database storage
-            db_key = reverse_key_mapping.get(key, key)
-            for value in values:
-                cursor.execute('''
-                    INSERT INTO dropdown_options (option_type, option_value, version)
-                    VALUES (?, ?, 1)
-                ''', (db_key, value))
-       
-        conn.commit()
+        version = claim_version(cursor, 'dropdowns', '', option.get('baseVersion'))
+        added = add_option(cursor, db_option_type(option_type), option_value)
+        if added:
+            conn.commit()
+            master_data_cache.note_write('dropdowns', GLOBAL_SCOPE, version)
+            response_cache.notify(None, 'dropdowns')
+        else:
+            # Nothing changed: give the claimed version back
+            conn.rollback()
+            version = data_version(cursor, 'dropdowns', GLOBAL_SCOPE)
        
-        return {
+        return FastJSONResponse({
             "success": True,
             "optionType": option_type,
             "optionValue": option_value,
-            "message": "Option added successfully"
-        }
+            "added": added,
+            "message": "Option added successfully" if added else "Option already exists"
+        }, headers=version_headers(version))
+    except VersionConflict as e:
+        conn.rollback()
+        raise version_conflict(e)
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+@app.delete("/dropdown-option")
+def delete_dropdown_option(
+    optionType: str = Query(...),
+    optionValue: str = Query(...),
+    baseVersion: Optional[int] = Query(None, description="X-Data-Version the edit was based on")
+):
+    """Remove a single dropdown option; the row is deleted, not flagged."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        version = claim_version(cursor, 'dropdowns', '', baseVersion)
+        if not remove_option(cursor, db_option_type(optionType), optionValue):
+            conn.rollback()
+            raise HTTPException(status_code=404, detail="Option not found")
+        conn.commit()
+        master_data_cache.note_write('dropdowns', GLOBAL_SCOPE, version)
+        response_cache.notify(None, 'dropdowns')
+        return FastJSONResponse(
+            {"success": True, "optionType": optionType, "optionValue": optionValue, "message": "Option removed"},
+            headers=version_headers(version)
+        )
+    except HTTPException:
+        raise
+    except VersionConflict as e:
+        conn.rollback()
+        raise version_conflict(e)
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -512,7 +730,11 @@ def get_dropdown_options_by_type(option_type: str):
         conn.close()
 
 @app.post("/dropdown-options/{option_type}")
-def save_dropdown_options_by_type(option_type: str, options: List[str] = Body(...)):
+def save_dropdown_options_by_type(
+    option_type: str,
+    options: List[str] = Body(...),
+    baseVersion: Optional[int] = Query(None, description="X-Data-Version the edit was based on")
+):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
@@ -520,23 +742,23 @@ def save_dropdown_options_by_type(option_type: str, options: List[str] = Body(..
         valid_types = ['groups', 'ppa-merchants', 'types', 'location-codes', 'locations', 'connectivities']
         if option_type not in valid_types:
             raise HTTPException(status_code=400, detail=f"Invalid option type. Valid types: {valid_types}")
+        version = claim_version(cursor, 'dropdowns', '', baseVersion)
         
-        # Soft delete existing options for this type
-        cursor.execute('''
-            UPDATE dropdown_options
-            SET is_deleted = 1, version = version + 1, updated_at = CURRENT_TIMESTAMP
-            WHERE option_type = ?
-        ''', (option_type,))
-        
-        # Insert new options
-        for value in options:
-            cursor.execute('''
-                INSERT INTO dropdown_options (option_type, option_value, version)
-                VALUES (?, ?, 1)
-            ''', (option_type, value))
+        # Write only the values that were added or removed
+        replace_options(cursor, {option_type: options})
         
         conn.commit()
-        return {option_type: options, "message": f"{option_type} saved successfully"}
+        master_data_cache.note_write('dropdowns', GLOBAL_SCOPE, version)
+        response_cache.notify(None, 'dropdowns')
+        return FastJSONResponse(
+            {option_type: options, "message": f"{option_type} saved successfully"},
+            headers=version_headers(version)
+        )
+    except HTTPException:
+        raise
+    except VersionConflict as e:
+        conn.rollback()
+        raise version_conflict(e)
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -548,28 +770,27 @@ def save_dropdown_options_by_type(option_type: str, options: List[str] = Body(..
 def api_add_dropdown_option(option: Dict[str, Any] = Body(...)):
     return add_dropdown_option(option)
 
+@app.delete("/api/dropdown-option")
+def api_delete_dropdown_option(
+    optionType: str = Query(...),
+    optionValue: str = Query(...),
+    baseVersion: Optional[int] = Query(None)
+):
+    return delete_dropdown_option(optionType, optionValue, baseVersion)
+
 # --- Table Data Endpoints ---
 
 @app.get("/table-data")
 def get_table_data(fiscalYear: str = Query(..., description="Fiscal Year")):
-    print(f"Received request for fiscalYear: {fiscalYear}")
     conn = get_db_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     try:
-        print(f"Executing query for fiscalYear: {fiscalYear}")
-        cursor.execute('SELECT * FROM table_data WHERE fiscal_year = ? AND is_deleted = 0', (fiscalYear,))
-        row = cursor.fetchone()
-        print(f"Query result: {row is not None}")
-        if row:
-            print(f"Row keys: {list(row.keys())}")
-            data = json.loads(row['data'])
-            print(f"Data loaded, length: {len(data)}")
-        else:
-            data = []
-        result = {"data": data}
-        print(f"Returning result: {result}")
-        return result
+        # Rows are stored as JSON - splice them into the envelope instead of decoding/re-encoding
+        version = data_version(cursor, 'tableData', fiscalYear)
+        response = raw_json_response([b'{"data":', rows_json(load_rows(cursor, fiscalYear)), b'}'])
+        response.headers[VERSION_HEADER] = str(version)
+        return response
     except Exception as e:
         print(f"Error in get_table_data: {e}")
         import traceback
@@ -585,49 +806,47 @@ def api_get_table_data(fiscalYear: str = Query(..., description="Fiscal Year")):
 
 @app.post("/table-data")
 def save_table_data(request: dict):
+    """
+    Save the master table. Either the full table (`data`, only rows that differ
+    from the stored ones are written) or just the edited rows
+    (`changes`: {"upsert": [rows with id], "delete": [ids]}). With `baseVersion`
+    the save is rejected (409) when the table changed since that version.
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        fiscal_year = request.fiscalYear
-        # Convert TableRow objects to dictionaries
-        data_dicts = []
-        for row in request.data:
-            try:
-                data_dicts.append(row.dict())
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Error converting row to dict: {str(e)}")
-       
-        data_json = json.dumps(data_dicts)
-       
-        # Check if there's already an active record for this fiscal year
-        cursor.execute('SELECT id, version FROM table_data WHERE fiscal_year = ? AND is_deleted = 0', (fiscal_year,))
-        existing_record = cursor.fetchone()
-       
-        if existing_record:
-            # Update existing active record
-            next_version = existing_record['version'] + 1
-            cursor.execute('''
-                UPDATE table_data
-                SET data = ?, version = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (data_json, next_version, existing_record['id']))
-        else:
-            # Get current max version for this fiscal year
-            cursor.execute('SELECT MAX(version) FROM table_data WHERE fiscal_year = ?', (fiscal_year,))
-            row = cursor.fetchone()
-            next_version = (row[0] if row[0] is not None else 0) + 1
-           
-            # Insert new active record
-            cursor.execute('''
-                INSERT INTO table_data (fiscal_year, data, version, is_deleted)
-                VALUES (?, ?, ?, 0)
-            ''', (fiscal_year, data_json, next_version))
-           
+        fiscal_year = request.get('fiscalYear')
+        if not fiscal_year:
+            raise HTTPException(status_code=400, detail="fiscalYear is required")
+        changes = request.get('changes')
+        claim_table_version(cursor, fiscal_year, request.get('baseVersion'))
+        try:
+            if changes is not None:
+                result = apply_changes(cursor, fiscal_year, changes.get('upsert') or [], changes.get('delete') or [])
+            else:
+                data = request.get('data')
+                if not isinstance(data, list):
+                    raise HTTPException(status_code=400, detail="data must be a list of rows")
+                result = save_rows(cursor, fiscal_year, data)
+        except (ValueError, AttributeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         conn.commit()
-       
-        return {"message": "Table data saved successfully", "version": next_version}
+        if result['saved']:
+            response_cache.notify(fiscal_year, 'tableData')
+
+        return FastJSONResponse({
+            "message": "Table data saved successfully",
+            "version": result['version'],
+            "changedRows": result['changed'],
+            "removedRows": result['removed'],
+        }, headers=version_headers(result['version']))
     except HTTPException:
+        conn.rollback()
         raise
+    except VersionConflict as e:
+        conn.rollback()
+        raise version_conflict(e)
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to save data to database: {str(e)}")
@@ -651,7 +870,10 @@ def delete_table_data(fiscalYear: str = Query(..., description="Fiscal Year")):
         ''', (fiscalYear,))
        
         if cursor.rowcount > 0:
+            # Rows are closed at the new version so earlier versions keep them
+            close_rows(cursor, fiscalYear)
             conn.commit()
+            response_cache.notify(fiscalYear, 'tableData')
             return {"message": "Table data marked as deleted successfully"}
         else:
             # Check if it existed at all
@@ -677,39 +899,28 @@ def api_delete_table_data(fiscalYear: str = Query(..., description="Fiscal Year"
 
 @app.get("/location-relationships")
 def get_location_relationships(fiscalYear: str = Query("FY_25", description="Fiscal Year")):
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
     try:
-        cursor.execute('SELECT * FROM location_relationships WHERE fiscal_year = ? AND is_deleted = 0', (fiscalYear,))
-        rows = cursor.fetchall()
-       
-        if rows:
-            relationships = [
-                {'location': row['location'], 'locationCode': row['location_code']}
-                for row in rows
-            ]
-            return relationships
-        else:
-            # Default relationships
-            return [
-                { 'location': 'Khavda', 'locationCode': 'Khavda' },
-                { 'location': 'Baap', 'locationCode': 'RJ' },
-                { 'location': 'Essel', 'locationCode': 'RJ' }
-            ]
+        version, body = master_data_cache.get(
+            get_db_connection, 'relationships', fiscalYear,
+            lambda cursor: load_location_relationships(cursor, fiscalYear)
+        )
+        response = raw_json_response([body])
+        response.headers[VERSION_HEADER] = str(version)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 @app.post("/location-relationships")
 def save_location_relationships(
     relationships: list,
-    fiscalYear: str = Query("FY_25")
+    fiscalYear: str = Query("FY_25"),
+    baseVersion: Optional[int] = Query(None, description="X-Data-Version the edit was based on")
 ):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        version = claim_version(cursor, 'relationships', fiscalYear, baseVersion)
+
         # Soft delete existing
         cursor.execute('''
             UPDATE location_relationships
@@ -722,10 +933,15 @@ def save_location_relationships(
             cursor.execute('''
                 INSERT INTO location_relationships (fiscal_year, location, location_code, version)
                 VALUES (?, ?, ?, 1)
-            ''', (fiscalYear, rel.location, rel.locationCode))
+            ''', (fiscalYear, rel.get('location'), rel.get('locationCode')))
            
         conn.commit()
-        return relationships
+        master_data_cache.note_write('relationships', fiscalYear, version)
+        response_cache.notify(fiscalYear, 'relationships')
+        return FastJSONResponse(relationships, headers=version_headers(version))
+    except VersionConflict as e:
+        conn.rollback()
+        raise version_conflict(e)
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -741,83 +957,77 @@ def api_get_location_relationships(fiscalYear: str = Query("FY_25")):
 @app.post("/api/location-relationships")
 def api_save_location_relationships(
     relationships: list,
-    fiscalYear: str = Query("FY_25")
+    fiscalYear: str = Query("FY_25"),
+    baseVersion: Optional[int] = Query(None)
 ):
-    return save_location_relationships(relationships, fiscalYear)
+    return save_location_relationships(relationships, fiscalYear, baseVersion)
 
 # --- Backup Data Endpoints ---
 
 @app.get("/backup-data")
-def get_backups(fiscalYear: str = Query("FY_25")):
+def get_backups(
+    fiscalYear: str = Query("FY_25"),
+    limit: int = Query(50, ge=1, le=500, description="Versions per page"),
+    before: Optional[int] = Query(None, description="Return versions older than this one (nextBefore of the previous page)")
+):
+    """Version picker listing: metadata only, newest first. Row data comes from /backup-data/{version}."""
     conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            SELECT id, fiscal_year, data, version, is_deleted, created_at, updated_at
-            FROM table_data
-            WHERE fiscal_year = ?
-            ORDER BY version DESC
-        ''', (fiscalYear,))
-        rows = cursor.fetchall()
-       
-        backups = []
-        for row in rows:
-            backup = dict(row)
-            backup['data'] = json.loads(row['data'])
-            backups.append(backup)
-           
-        return {
+        versions, next_before = list_versions(cursor, fiscalYear, limit, before)
+        cursor.execute('SELECT version, is_deleted FROM table_data WHERE fiscal_year = ?', (fiscalYear,))
+        header = cursor.fetchone()
+        for item in versions:
+            item['is_current'] = bool(header) and item['version'] == header[0] and not header[1]
+        return FastJSONResponse({
             "fiscalYear": fiscalYear,
-            "backups": backups,
-            "count": len(backups)
-        }
+            "backups": versions,
+            "count": len(versions),
+            "nextBefore": next_before,
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         conn.close()
 
+@app.get("/backup-data/{version}")
+def get_backup_version(version: int, fiscalYear: str = Query("FY_25")):
+    """One version's rows, streamed from the stored row text without decoding it."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if not version_exists(cursor, fiscalYear, version):
+            raise HTTPException(status_code=404, detail="Backup not found")
+    finally:
+        conn.close()
+
+    def body():
+        yield b'{"fiscalYear":' + dumps(fiscalYear) + b',"version":' + str(version).encode('ascii') + b',"data":'
+        yield from stream_version(get_db_connection, fiscalYear, version)
+        yield b'}'
+
+    return StreamingResponse(body(), media_type='application/json')
+
 @app.post("/backup-data/restore")
 def restore_backup(request: dict):
     conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     try:
-        # Get specific version
-        cursor.execute('''
-            SELECT data FROM table_data
-            WHERE fiscal_year = ? AND version = ?
-        ''', (request.fiscalYear, request.version))
-       
-        result = cursor.fetchone()
-        if not result:
+        fiscal_year = request.get('fiscalYear')
+        version = request.get('version')
+        if not fiscal_year or version is None:
+            raise HTTPException(status_code=400, detail="fiscalYear and version are required")
+
+        # Rebuild the requested version from the row history and save it as a new version
+        if not version_exists(cursor, fiscal_year, version):
             raise HTTPException(status_code=404, detail="Backup not found")
-           
-        # Restore by inserting new version (or updating current active one? logic says updateOne with upsert)
-        # The Next.js logic was: updateOne({fiscalYear}, {$set: ...})
-        # Which effectively updates the 'current' record (where is_deleted=0 usually, but here it just matches fiscalYear)
-        # Wait, my schema design allows multiple rows per fiscalYear (history).
-        # The 'current' one is usually the latest version or the one with is_deleted=0.
-        # But my `save_table_data` updates the existing row if `is_deleted=0`.
-        # So here I should update that row too.
-       
-        data_str = result['data']
-       
-        cursor.execute('''
-            UPDATE table_data
-            SET data = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP
-            WHERE fiscal_year = ? AND is_deleted = 0
-        ''', (data_str, request.fiscalYear))
-       
-        if cursor.rowcount == 0:
-            # If no active record, insert one
-            cursor.execute('''
-                INSERT INTO table_data (fiscal_year, data, version)
-                VALUES (?, ?, 1)
-            ''', (request.fiscalYear, data_str))
-           
+        rows = [json.loads(data) for data in load_rows(cursor, fiscal_year, version)]
+        result = save_rows(cursor, fiscal_year, rows)
+
         conn.commit()
-        return {"message": "Data restored successfully"}
+        if result['saved']:
+            response_cache.notify(fiscal_year, 'tableData')
+        return {"message": "Data restored successfully", "version": result['version']}
     except HTTPException:
         raise
     except Exception as e:
@@ -828,58 +1038,27 @@ def restore_backup(request: dict):
 
 @app.delete("/backup-data")
 def delete_backup(fiscalYear: str = Query(...), version: int = Query(...)):
+    """Delete one stored version; rows other versions still need are kept."""
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        # Hard delete specific version (only if it is a backup/history, usually we keep history but user wants delete)
-        # Next.js logic: DELETE FROM table_data WHERE ... AND is_deleted=TRUE
-        # Wait, Next.js logic deletes only if `is_deleted=TRUE`?
-        # "DELETE FROM table_data WHERE fiscal_year = ? AND version = ? AND is_deleted = TRUE"
-        # This implies it only deletes "soft deleted" records? Or maybe "history" records are marked as deleted?
-        # In my `save_table_data`, I update the single row. I don't create a new row for history.
-        # Ah, `lib/sqlite-adapter.ts` logic:
-        # `updateOne`: "UPDATE ... SET data=?, version=version+1 ..."
-        # It does NOT create a history row. It just updates the single row.
-        # So where does the history come from?
-        # The Next.js `GET` query: "SELECT ... FROM table_data WHERE fiscal_year = ? ORDER BY version DESC"
-        # If I only have one row per fiscalYear, this returns 1 row.
-        # The `lib/sqlite-adapter.ts` implementation I wrote earlier:
-        # It updates the single row.
-        # So `backup-data` logic in Next.js (which assumes history) might be broken with my previous `sqlite-adapter` implementation if it expects multiple rows.
-        # OR, the `sqlite-adapter` was supposed to INSERT a new row for every version?
-        # Let's check `lib/sqlite-adapter.ts` again.
-        # It says: `UPDATE table_data ...`
-        # So it overwrites.
-        # If the user wants backups, we should probably INSERT a new row to keep history.
-        # But the current schema has `version`.
-        # If I want to support backups, I should probably CHANGE `save_table_data` to INSERT a new row instead of UPDATE.
-        # OR, the `backup-data` route logic implies there ARE multiple rows.
-        # Let's assume for now I should INSERT new rows to keep history.
-        # But `is_deleted=0` usually implies the "active" one.
-        # If I insert a new row, I should mark the old one as `is_deleted=1`?
-        # Or just have multiple rows and `GET /table-data` fetches the latest `ORDER BY version DESC`?
-        # My `GET /table-data` does `WHERE ... AND is_deleted=0`.
-        # So I should probably:
-        # 1. Mark current as deleted (archive it).
-        # 2. Insert new as active.
-        # Let's adjust `save_table_data` to do this.
-       
-        pass
-    except Exception as e:
-        pass
-       
-    # Re-implementing delete based on adjusted logic
-    try:
-        cursor.execute('''
-            DELETE FROM table_data
-            WHERE fiscal_year = ? AND version = ? AND is_deleted = 1
-        ''', (fiscalYear, version))
-       
-        if cursor.rowcount > 0:
-            conn.commit()
-            return {"message": "Backup version deleted successfully"}
-        else:
-             raise HTTPException(status_code=404, detail="Backup version not found or not deleted")
+        if not version_exists(cursor, fiscalYear, version):
+            raise HTTPException(status_code=404, detail="Backup version not found")
+        cursor.execute('SELECT version, is_deleted FROM table_data WHERE fiscal_year = ?', (fiscalYear,))
+        header = cursor.fetchone()
+        if header and header[0] == version and not header[1]:
+            raise HTTPException(status_code=400, detail="The current version cannot be deleted")
+
+        delete_version(cursor, fiscalYear, version)
+        if header and header[1]:
+            # A deleted table whose last backup is gone leaves nothing to restore
+            cursor.execute('SELECT 1 FROM table_data_versions WHERE fiscal_year = ? LIMIT 1', (fiscalYear,))
+            if cursor.fetchone() is None:
+                cursor.execute('DELETE FROM table_data WHERE fiscal_year = ?', (fiscalYear,))
+                purge_rows(cursor, fiscalYear)
+        conn.commit()
+        response_cache.notify(fiscalYear, 'tableData')
+        return {"message": "Backup version deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
@@ -890,8 +1069,17 @@ def delete_backup(fiscalYear: str = Query(...), version: int = Query(...)):
 
 # Additional route with /api prefix for direct access
 @app.get("/api/backup-data")
-def api_get_backups(fiscalYear: str = Query("FY_25")):
-    return get_backups(fiscalYear)
+def api_get_backups(
+    fiscalYear: str = Query("FY_25"),
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[int] = Query(None)
+):
+    return get_backups(fiscalYear, limit, before)
+
+# Additional route with /api prefix for direct access
+@app.get("/api/backup-data/{version}")
+def api_get_backup_version(version: int, fiscalYear: str = Query("FY_25")):
+    return get_backup_version(version, fiscalYear)
 
 # Additional route with /api prefix for direct access
 @app.post("/api/backup-data/restore")
@@ -903,6 +1091,37 @@ def api_restore_backup(request: dict):
 def api_delete_backup(fiscalYear: str = Query(...), version: int = Query(...)):
     return delete_backup(fiscalYear, version)
 
+@app.post("/backup-data/compact")
+def compact_backups():
+    """Apply the history retention policy and compress old row versions now; returns the size report."""
+    try:
+        return history_compactor.run_once(get_db_connection)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Additional route with /api prefix for direct access
+@app.post("/api/backup-data/compact")
+def api_compact_backups():
+    return compact_backups()
+
+@app.post("/maintenance/compact-soft-deleted")
+def compact_soft_deleted_rows(
+    mode: str = Query("archive", description="archive (move to <table>_history) or purge"),
+    vacuum: bool = Query(True)
+):
+    """Reclaim soft-deleted generations now; returns rows reclaimed and probe query times before/after."""
+    if mode not in COMPACTION_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(COMPACTION_MODES)}")
+    try:
+        return soft_delete_compactor.run_once(get_db_connection, mode=mode, vacuum=vacuum)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Additional route with /api prefix for direct access
+@app.post("/api/maintenance/compact-soft-deleted")
+def api_compact_soft_deleted_rows(mode: str = Query("archive"), vacuum: bool = Query(True)):
+    return compact_soft_deleted_rows(mode, vacuum)
+
 # --- Import Data Endpoints ---
 
 def convert_to_table_row(item: Dict[str, Any], index: int) -> Dict[str, Any]:
@@ -980,23 +1199,7 @@ def import_data():
                 continue
                
             converted_data = [convert_to_table_row(row, i) for i, row in enumerate(raw_data)]
-            data_json = json.dumps(converted_data)
-           
-            # Upsert logic
-            cursor.execute('SELECT 1 FROM table_data WHERE fiscal_year = ?', (item['name'],))
-            exists = cursor.fetchone()
-           
-            if exists:
-                cursor.execute('''
-                    UPDATE table_data
-                    SET data = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE fiscal_year = ?
-                ''', (data_json, item['name']))
-            else:
-                cursor.execute('''
-                    INSERT INTO table_data (fiscal_year, data, version)
-                    VALUES (?, ?, 1)
-                ''', (item['name'], data_json))
+            save_rows(cursor, item['name'], converted_data)
                
             results.append({
                 'fiscalYear': item['name'],
@@ -1005,6 +1208,7 @@ def import_data():
             })
            
         conn.commit()
+        response_cache.notify(None, 'tableData')
         return {"message": "All fiscal year data imported successfully", "results": results}
        
     except Exception as e:
@@ -1030,44 +1234,18 @@ def import_data_from_frontend(request: dict):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        fiscal_year = request.fiscalYear
-        # Convert TableRow objects to dictionaries if needed
-        data_dicts = []
-        for row in request.data:
-            if hasattr(row, 'dict'):
-                data_dicts.append(row.dict())
-            else:
-                data_dicts.append(row)
-       
-        data_json = json.dumps(data_dicts)
-       
-        # Check if there's already an active record for this fiscal year
-        cursor.execute('SELECT id, version FROM table_data WHERE fiscal_year = ? AND is_deleted = 0', (fiscal_year,))
-        existing_record = cursor.fetchone()
-       
-        if existing_record:
-            # Update existing active record
-            next_version = existing_record['version'] + 1
-            cursor.execute('''
-                UPDATE table_data
-                SET data = ?, version = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (data_json, next_version, existing_record['id']))
-        else:
-            # Get current max version for this fiscal year
-            cursor.execute('SELECT MAX(version) FROM table_data WHERE fiscal_year = ?', (fiscal_year,))
-            row = cursor.fetchone()
-            next_version = (row[0] if row[0] is not None else 0) + 1
-           
-            # Insert new active record
-            cursor.execute('''
-                INSERT INTO table_data (fiscal_year, data, version, is_deleted)
-                VALUES (?, ?, ?, 0)
-            ''', (fiscal_year, data_json, next_version))
-           
+        fiscal_year = request.get('fiscalYear')
+        data = request.get('data')
+        if not fiscal_year or not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="fiscalYear and a list of rows are required")
+
+        # Only rows that differ from the stored table are written
+        result = save_rows(cursor, fiscal_year, data)
         conn.commit()
+        if result['saved']:
+            response_cache.notify(fiscal_year, 'tableData')
        
-        return {"message": "Table data imported successfully", "version": next_version, "count": len(data_dicts)}
+        return {"message": "Table data imported successfully", "version": result['version'], "count": len(data)}
     except HTTPException:
         raise
     except Exception as e:
@@ -1121,6 +1299,7 @@ async def upload_excel(file: UploadFile = File(...), fiscalYear: str = Form("FY_
         # Import to database
         if result['projects']:
             import_result = import_projects_to_db(result['projects'], result['summaries'], fiscalYear)
+            response_cache.bump(fiscalYear, 'projects')
             
             if not import_result['success']:
                 return JSONResponse(
@@ -1159,138 +1338,164 @@ async def upload_excel(file: UploadFile = File(...), fiscalYear: str = Form("FY_
 # --- Commissioning Status Endpoints ---
 
 @app.get("/commissioning-projects")
-def get_commissioning_projects(fiscalYear: str = Query("FY_25-26")):
+def get_commissioning_projects(
+    fiscalYear: str = Query("FY_25-26"),
+    category: Optional[str] = Query(None),
+    section: Optional[str] = Query(None),
+    spv: Optional[str] = Query(None),
+    projectType: Optional[str] = Query(None),
+    planActual: Optional[str] = Query(None, description="Plan, Rephase or Actual"),
+    includedInTotal: Optional[bool] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated projection, e.g. projectName,planActual,q3"),
+    limit: Optional[int] = Query(None, description="Page size; enables keyset pagination"),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    format: str = Query("json", description="json (row objects), columnar (struct-of-arrays) or arrow (Arrow IPC stream)"),
+    asOf: Optional[str] = Query(None, description="Month cutoff (apr..mar); adds cummToDate and remaining from stored prefix sums")
+):
+    """
+    Non-deleted projects for a fiscal year, ordered by category, sno.
+    Without `limit` the response is the plain project list (unchanged contract);
+    with `limit` it is {"projects": [...], "nextCursor": ...}.
+    format=columnar returns {"format", "count", "columns", "nextCursor"} with string
+    columns dictionary-encoded; format=arrow returns an Arrow IPC stream.
+    """
     conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    db_cursor = conn.cursor()
     try:
-        cursor.execute('''
-            SELECT * FROM commissioning_projects 
-            WHERE fiscal_year = ? AND is_deleted = 0
-            ORDER BY category, sno
-        ''', (fiscalYear,))
-        rows = cursor.fetchall()
-        
-        projects = []
-        for row in rows:
-            # Convert row to dict for safer access
-            row_dict = dict(row)
-            
-            # Calculate monthly sum (Apr-Mar) - used for ACTUAL only
-            monthly_sum = sum([
-                row_dict.get('apr') or 0,
-                row_dict.get('may') or 0,
-                row_dict.get('jun') or 0,
-                row_dict.get('jul') or 0,
-                row_dict.get('aug') or 0,
-                row_dict.get('sep') or 0,
-                row_dict.get('oct') or 0,
-                row_dict.get('nov') or 0,
-                row_dict.get('dec') or 0,
-                row_dict.get('jan') or 0,
-                row_dict.get('feb') or 0,
-                row_dict.get('mar') or 0
-            ])
-            
-            # CRITICAL FIX: Row Total Logic per PDF Spec
-            # PLAN/REPHASE: totalCapacity = capacity (the project's planned capacity)
-            # ACTUAL: totalCapacity = sum of monthly values
-            plan_actual = row_dict.get('plan_actual', '')
-            if plan_actual in ['Plan', 'Rephase']:
-                total_capacity = row_dict.get('capacity') or 0
-            else:  # ACTUAL / Fcst
-                total_capacity = monthly_sum
-            
-            # Calculate cummTillNov from Apr-Nov (Updated per latest image as of 31-Dec-25)
-            cumm_till_oct = sum([
-                row_dict.get('apr') or 0,
-                row_dict.get('may') or 0,
-                row_dict.get('jun') or 0,
-                row_dict.get('jul') or 0,
-                row_dict.get('aug') or 0,
-                row_dict.get('sep') or 0,
-                row_dict.get('oct') or 0,
-                row_dict.get('nov') or 0
-            ])
-            
-            # Calculate quarters
-            q1 = sum([row_dict.get('apr') or 0, row_dict.get('may') or 0, row_dict.get('jun') or 0])
-            q2 = sum([row_dict.get('jul') or 0, row_dict.get('aug') or 0, row_dict.get('sep') or 0])
-            q3 = sum([row_dict.get('oct') or 0, row_dict.get('nov') or 0, row_dict.get('dec') or 0])
-            q4 = sum([row_dict.get('jan') or 0, row_dict.get('feb') or 0, row_dict.get('mar') or 0])
-            
-            projects.append({
-                'id': row_dict['id'],
-                'sno': row_dict['sno'],
-                'projectName': row_dict['project_name'],
-                'spv': row_dict['spv'],
-                'projectType': row_dict['project_type'],
-                'plotLocation': row_dict['plot_location'],
-                'capacity': row_dict['capacity'],
-                'planActual': row_dict['plan_actual'],
-                'apr': row_dict['apr'],
-                'may': row_dict['may'],
-                'jun': row_dict['jun'],
-                'jul': row_dict['jul'],
-                'aug': row_dict['aug'],
-                'sep': row_dict['sep'],
-                'oct': row_dict['oct'],
-                'nov': row_dict['nov'],
-                'dec': row_dict['dec'],
-                'jan': row_dict['jan'],
-                'feb': row_dict['feb'],
-                'mar': row_dict['mar'],
-                'totalCapacity': total_capacity,
-                'cummTillOct': cumm_till_oct,
-                'q1': q1,
-                'q2': q2,
-                'q3': q3,
-                'q4': q4,
-                'category': row_dict['category'],
-                'section': row_dict.get('section', 'A'),
-                'includedInTotal': bool(row_dict.get('included_in_total', True))
-            })
-        return projects
+        filters = {
+            'category': category,
+            'section': section,
+            'spv': spv,
+            'projectType': projectType,
+            'planActual': planActual,
+        }
+        if format not in PROJECT_FORMATS:
+            raise ValueError(f"format must be one of {list(PROJECT_FORMATS)}")
+        headers = version_headers(data_version(db_cursor, 'projects', fiscalYear))
+        if format != 'json':
+            columns, count, next_cursor = fetch_project_columns(
+                db_cursor, fiscalYear, filters, includedInTotal, fields, limit, cursor, asOf
+            )
+            if format == 'arrow':
+                return Response(
+                    content=to_arrow_ipc(columns, next_cursor),
+                    media_type=ARROW_MEDIA_TYPE,
+                    headers={"X-Next-Cursor": next_cursor or "", **headers}
+                )
+            return FastJSONResponse(to_columnar(columns, count, next_cursor), headers=headers)
+
+        projects, next_cursor = fetch_projects(
+            db_cursor, fiscalYear, filters, includedInTotal, fields, limit, cursor, asOf
+        )
+        if limit is None:
+            return FastJSONResponse(projects, headers=headers)
+        return FastJSONResponse({"projects": projects, "nextCursor": next_cursor}, headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         conn.close()
 
 @app.get("/api/commissioning-projects")
-def api_get_commissioning_projects(fiscalYear: str = Query("FY_25-26")):
-    return get_commissioning_projects(fiscalYear)
+def api_get_commissioning_projects(
+    fiscalYear: str = Query("FY_25-26"),
+    category: Optional[str] = Query(None),
+    section: Optional[str] = Query(None),
+    spv: Optional[str] = Query(None),
+    projectType: Optional[str] = Query(None),
+    planActual: Optional[str] = Query(None),
+    includedInTotal: Optional[bool] = Query(None),
+    fields: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    format: str = Query("json"),
+    asOf: Optional[str] = Query(None)
+):
+    return get_commissioning_projects(
+        fiscalYear, category, section, spv, projectType, planActual, includedInTotal, fields, limit, cursor, format, asOf
+    )
+
+@app.get("/commissioning-changes")
+def get_commissioning_changes(
+    fiscalYear: str = Query("FY_25-26"),
+    since: int = Query(0, description="Token from the previous sync; 0 returns every row"),
+    fields: Optional[str] = Query(None, description="Comma-separated projection (id is always included)")
+):
+    """
+    Delta sync: project rows inserted, updated or soft-deleted after `since`,
+    each with isDeleted and changeSeq, plus the token for the next call.
+    When deletions after `since` were compacted away every row is returned
+    with full=true and the client replaces its copy.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        try:
+            changes, token = fetch_changes(cursor, fiscalYear, since, fields)
+            full = since == 0
+        except SyncTokenExpired:
+            changes, token = fetch_changes(cursor, fiscalYear, 0, fields)
+            full = True
+        return FastJSONResponse({
+            "fiscalYear": fiscalYear, "since": since, "nextSince": token, "full": full, "changes": changes
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+@app.get("/api/commissioning-changes")
+def api_get_commissioning_changes(
+    fiscalYear: str = Query("FY_25-26"),
+    since: int = Query(0),
+    fields: Optional[str] = Query(None)
+):
+    return get_commissioning_changes(fiscalYear, since, fields)
 
 @app.post("/commissioning-projects")
-def save_commissioning_projects(projects: List[CommissioningProject], fiscalYear: str = Query("FY_25-26")):
+def save_commissioning_projects(
+    projects: List[CommissioningProject],
+    fiscalYear: str = Query("FY_25-26"),
+    baseVersion: Optional[int] = Query(None, description="X-Data-Version the edit was based on")
+):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        # Soft delete existing
-        cursor.execute('''
-            UPDATE commissioning_projects
-            SET is_deleted = 1, updated_at = CURRENT_TIMESTAMP
-            WHERE fiscal_year = ?
-        ''', (fiscalYear,))
-        
-        # Insert new
+        version = claim_version(cursor, 'projects', fiscalYear, baseVersion)
+        change_seq = next_change_seq(cursor)
+
+        # Supersede the current generation (soft delete) and insert the new one
+        generation = begin_generation(cursor, fiscalYear, 'save', change_seq)
         for proj in projects:
             cursor.execute('''
                 INSERT INTO commissioning_projects (
                     fiscal_year, sno, project_name, spv, project_type, plot_location,
                     capacity, plan_actual, apr, may, jun, jul, aug, sep, oct, nov, dec,
-                    jan, feb, mar, total_capacity, cumm_till_oct, q1, q2, q3, q4, category, section, included_in_total
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    jan, feb, mar, total_capacity, cumm_till_oct, q1, q2, q3, q4, category, section, included_in_total,
+                    change_seq, generation
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 fiscalYear, proj.sno, proj.projectName, proj.spv, proj.projectType,
                 proj.plotLocation, proj.capacity, proj.planActual,
                 proj.apr, proj.may, proj.jun, proj.jul, proj.aug, proj.sep,
                 proj.oct, proj.nov, proj.dec, proj.jan, proj.feb, proj.mar,
                 proj.totalCapacity, proj.cummTillOct, proj.q1, proj.q2, proj.q3, proj.q4, proj.category,
-                proj.section, proj.includedInTotal
+                proj.section, proj.includedInTotal, change_seq, generation
             ))
         
+        rebuild_rollups(cursor, fiscalYear)
         conn.commit()
-        return {"message": "Commissioning projects saved successfully", "count": len(projects)}
+        response_cache.bump(fiscalYear, 'projects')
+        return FastJSONResponse(
+            {"message": "Commissioning projects saved successfully", "count": len(projects), "generation": generation},
+            headers=version_headers(version)
+        )
+    except VersionConflict as e:
+        conn.rollback()
+        raise version_conflict(e)
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -1298,22 +1503,83 @@ def save_commissioning_projects(projects: List[CommissioningProject], fiscalYear
         conn.close()
 
 @app.post("/api/commissioning-projects")
-def api_save_commissioning_projects(projects: List[CommissioningProject], fiscalYear: str = Query("FY_25-26")):
-    return save_commissioning_projects(projects, fiscalYear)
+def api_save_commissioning_projects(
+    projects: List[CommissioningProject],
+    fiscalYear: str = Query("FY_25-26"),
+    baseVersion: Optional[int] = Query(None)
+):
+    return save_commissioning_projects(projects, fiscalYear, baseVersion)
+
+@app.get("/commissioning-generations")
+def get_commissioning_generations(fiscalYear: str = Query("FY_25-26")):
+    """Saved generations of a fiscal year's projects (newest first) that can be restored."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        generations = list_generations(cursor, fiscalYear)
+        return {"fiscalYear": fiscalYear, "current": current_generation(cursor, fiscalYear), "generations": generations}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+@app.get("/api/commissioning-generations")
+def api_get_commissioning_generations(fiscalYear: str = Query("FY_25-26")):
+    return get_commissioning_generations(fiscalYear)
+
+@app.post("/commissioning-generations/restore")
+def restore_commissioning_generation(request: dict):
+    """
+    Make an earlier generation current again: moves the generation pointer and
+    re-flags rows in place (no copy). Expects json body: { "fiscalYear": "FY_25-26", "generation": 3 }
+    """
+    fiscal_year = request.get("fiscalYear", "FY_25-26")
+    generation = request.get("generation")
+    if not isinstance(generation, int):
+        raise HTTPException(status_code=400, detail="generation (integer) is required")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        change_seq = restore_generation(cursor, fiscal_year, generation)
+        bump_version(cursor, 'projects', fiscal_year)
+        rebuild_rollups(cursor, fiscal_year)
+        conn.commit()
+        response_cache.bump(fiscal_year, 'projects')
+        return {"message": f"Generation {generation} restored", "generation": generation, "changeSeq": change_seq}
+    except GenerationNotFound as e:
+        conn.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except GenerationError as e:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+@app.post("/api/commissioning-generations/restore")
+def api_restore_commissioning_generation(request: dict):
+    return restore_commissioning_generation(request)
 
 @app.delete("/commissioning-projects/{project_id}")
 def delete_commissioning_project(project_id: int):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        old_row = fetch_project_row(cursor, project_id)
+        # Only live rows: a superseded row must keep change_seq = superseded_seq to stay restorable
         cursor.execute('''
             UPDATE commissioning_projects
-            SET is_deleted = 1, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (project_id,))
+            SET is_deleted = 1, change_seq = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND is_deleted = 0
+        ''', (next_change_seq(cursor), project_id))
         
         if cursor.rowcount > 0:
+            apply_project_change(cursor, old_row['fiscal_year'], old_row, None)
+            bump_version(cursor, 'projects', old_row['fiscal_year'])
             conn.commit()
+            response_cache.bump(old_row['fiscal_year'], 'projects')
             return {"message": "Project deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="Project not found")
@@ -1335,39 +1601,7 @@ def get_commissioning_summaries(fiscalYear: str = Query("FY_25-26")):
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     try:
-        cursor.execute('''
-            SELECT * FROM commissioning_summaries 
-            WHERE fiscal_year = ? AND is_deleted = 0
-            ORDER BY summary_type, category
-        ''', (fiscalYear,))
-        rows = cursor.fetchall()
-        
-        summaries = []
-        for row in rows:
-            summaries.append({
-                'id': row['id'],
-                'category': row['category'],
-                'summaryType': row['summary_type'],
-                'apr': row['apr'],
-                'may': row['may'],
-                'jun': row['jun'],
-                'jul': row['jul'],
-                'aug': row['aug'],
-                'sep': row['sep'],
-                'oct': row['oct'],
-                'nov': row['nov'],
-                'dec': row['dec'],
-                'jan': row['jan'],
-                'feb': row['feb'],
-                'mar': row['mar'],
-                'total': row['total'],
-                'cummTillOct': row['cumm_till_oct'],
-                'q1': row['q1'],
-                'q2': row['q2'],
-                'q3': row['q3'],
-                'q4': row['q4']
-            })
-        return summaries
+        return load_summaries(cursor, fiscalYear)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -1382,11 +1616,11 @@ def save_commissioning_summaries(summaries: List[CommissioningSummary], fiscalYe
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        # Soft delete existing
+        # Soft delete existing (rollup rows are derived from projects and kept)
         cursor.execute('''
             UPDATE commissioning_summaries
             SET is_deleted = 1, updated_at = CURRENT_TIMESTAMP
-            WHERE fiscal_year = ?
+            WHERE fiscal_year = ? AND level IS NULL
         ''', (fiscalYear,))
         
         # Insert new
@@ -1403,7 +1637,9 @@ def save_commissioning_summaries(summaries: List[CommissioningSummary], fiscalYe
                 summary.total, summary.cummTillOct, summary.q1, summary.q2, summary.q3, summary.q4
             ))
         
+        bump_version(cursor, 'summaries', fiscalYear)
         conn.commit()
+        response_cache.bump(fiscalYear, 'summaries')
         return {"message": "Commissioning summaries saved successfully", "count": len(summaries)}
     except Exception as e:
         conn.rollback()
@@ -1415,6 +1651,105 @@ def save_commissioning_summaries(summaries: List[CommissioningSummary], fiscalYe
 def api_save_commissioning_summaries(summaries: List[CommissioningSummary], fiscalYear: str = Query("FY_25-26")):
     return save_commissioning_summaries(summaries, fiscalYear)
 
+@app.get("/commissioning-bootstrap")
+def get_commissioning_bootstrap(fiscalYear: str = Query("FY_25-26")):
+    """
+    Everything the commissioning status and dashboard pages load on open, read
+    from one snapshot: {fiscalYear, versions, projects, summaries, uploadStatus,
+    dropdownOptions, locationRelationships}. Unchanged sections are served
+    from cache.
+    """
+    conn = get_db_connection()
+    try:
+        return raw_json_response(build_bootstrap(conn, fiscalYear))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+# Additional route with /api prefix for direct access
+@app.get("/api/commissioning-bootstrap")
+def api_get_commissioning_bootstrap(fiscalYear: str = Query("FY_25-26")):
+    return get_commissioning_bootstrap(fiscalYear)
+
+# --- Executive Dashboard Aggregates ---
+
+@app.get("/commissioning-dashboard")
+def get_commissioning_dashboard(
+    fiscalYear: str = Query("FY_25-26"),
+    scope: str = Query("Overall", description="Overall, Solar or Wind"),
+    category: Optional[str] = Query(None),
+    projectName: Optional[str] = Query(None),
+    spv: Optional[str] = Query(None),
+    projectType: Optional[str] = Query(None, description="PPA, Merchant or Group"),
+    period: str = Query("yearly", description="yearly, h1/h2, q1-q4 or a month key (apr..mar)"),
+    asOf: Optional[str] = Query(None, description="Month cutoff (apr..mar) for cumulative-to-date figures")
+):
+    """
+    Precomputed dashboard aggregates (KPIs, gauge, half-yearly/quarterly/monthly
+    series and slicer options) so the frontend does not need every project row.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        return build_dashboard(
+            cursor, fiscalYear,
+            scope=scope, category=category, project_name=projectName,
+            spv=spv, project_type=projectType, period=period,
+            store=project_store.get(cursor, fiscalYear), as_of=asOf
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+@app.get("/api/commissioning-dashboard")
+def api_get_commissioning_dashboard(
+    fiscalYear: str = Query("FY_25-26"),
+    scope: str = Query("Overall"),
+    category: Optional[str] = Query(None),
+    projectName: Optional[str] = Query(None),
+    spv: Optional[str] = Query(None),
+    projectType: Optional[str] = Query(None),
+    period: str = Query("yearly"),
+    asOf: Optional[str] = Query(None)
+):
+    return get_commissioning_dashboard(fiscalYear, scope, category, projectName, spv, projectType, period, asOf)
+
+@app.get("/commissioning-comparison")
+def get_commissioning_comparison(
+    fiscalYears: str = Query(..., description="Comma-separated fiscal years, e.g. FY_24-25,FY_25-26"),
+    groupBy: str = Query("category", description="category, section, spv or project"),
+    scope: str = Query("Overall", description="Overall, Solar or Wind")
+):
+    """
+    Year-over-year Plan / Rephase / Actual figures (monthly, quarterly, total) per group,
+    computed with one grouped query; unchanged years come from cached aggregates.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        return build_comparison(
+            cursor, parse_fiscal_years(fiscalYears), group_by=groupBy, scope=scope,
+            version_of=lambda fy: data_version(cursor, 'projects', fy)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+@app.get("/api/commissioning-comparison")
+def api_get_commissioning_comparison(
+    fiscalYears: str = Query(...),
+    groupBy: str = Query("category"),
+    scope: str = Query("Overall")
+):
+    return get_commissioning_comparison(fiscalYears, groupBy, scope)
+
 
 @app.post("/api/upload-commissioning-data")
 async def upload_commissioning_data(
@@ -1463,6 +1798,8 @@ async def upload_commissioning_data(
 
         conn = get_db_connection()
         cursor = conn.cursor()
+        # The upload updates copies in a new generation; the previous one stays restorable
+        fork_generation(cursor, fiscalYear, 'upload')
         
         success_count = 0
         failed_count = 0
@@ -1518,7 +1855,7 @@ async def upload_commissioning_data(
             # Find matching project in DB
             cursor.execute('''
                 SELECT id FROM commissioning_projects 
-                WHERE project_name = ? AND spv = ? AND plan_actual = ? AND fiscal_year = ?
+                WHERE project_name = ? AND spv = ? AND plan_actual = ? AND fiscal_year = ? AND is_deleted = 0
             ''', (current_project["name"], current_project["spv"], plan_actual, fiscalYear))
             
             proj_record = cursor.fetchone()
@@ -1527,12 +1864,13 @@ async def upload_commissioning_data(
                 # Try fallback matching (e.g. without SPV if SPV is messy in excel)
                 cursor.execute('''
                     SELECT id FROM commissioning_projects 
-                    WHERE project_name = ? AND plan_actual = ? AND fiscal_year = ?
+                    WHERE project_name = ? AND plan_actual = ? AND fiscal_year = ? AND is_deleted = 0
                 ''', (current_project["name"], plan_actual, fiscalYear))
                 proj_record = cursor.fetchone()
 
             if proj_record:
                 proj_id = proj_record['id']
+                old_row = fetch_project_row(cursor, proj_id)
                 
                 # Update monthly values
                 update_fields = []
@@ -1545,12 +1883,13 @@ async def upload_commissioning_data(
                         update_params.append(val)
                 
                 if update_fields:
-                    update_params.append(proj_id)
+                    update_params.extend([next_change_seq(cursor), proj_id])
                     cursor.execute(f'''
                         UPDATE commissioning_projects 
-                        SET {", ".join(update_fields)}, updated_at = CURRENT_TIMESTAMP
+                        SET {", ".join(update_fields)}, change_seq = ?, updated_at = CURRENT_TIMESTAMP
                         WHERE id = ?
                     ''', tuple(update_params))
+                    apply_project_change(cursor, fiscalYear, old_row, fetch_project_row(cursor, proj_id))
                     success_count += 1
             else:
                 # Log mismatch if it's a real project row
@@ -1558,7 +1897,13 @@ async def upload_commissioning_data(
                     failed_count += 1
                     errors.append(f"Row {i+1}: Project '{current_project['name']}' with type '{plan_actual}' not found in DB")
 
-        conn.commit()
+        if success_count:
+            bump_version(cursor, 'projects', fiscalYear)
+            conn.commit()
+            response_cache.bump(fiscalYear, 'projects')
+        else:
+            # Nothing matched: drop the forked generation
+            conn.rollback()
         conn.close()
         
         return {
@@ -1581,6 +1926,8 @@ def reset_commissioning_data(request: dict):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        # The reset edits copies in a new generation; the previous one stays restorable
+        fork_generation(cursor, fiscal_year, 'reset')
         
         # Reset monthly columns to NULL or 0
         cursor.execute('''
@@ -1588,16 +1935,18 @@ def reset_commissioning_data(request: dict):
             SET apr = NULL, may = NULL, jun = NULL, jul = NULL, aug = NULL, sep = NULL,
                 oct = NULL, nov = NULL, dec = NULL, jan = NULL, feb = NULL, mar = NULL,
                 total_capacity = 0, cumm_till_oct = 0, q1 = 0, q2 = 0, q3 = 0, q4 = 0,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE fiscal_year = ?
-        ''', (fiscal_year,))
+                change_seq = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE fiscal_year = ? AND is_deleted = 0
+        ''', (next_change_seq(cursor), fiscal_year))
         
         updated_count = cursor.rowcount
-        conn.commit()
         
-        # Recalculate derived (will just confirm 0s)
-        calculate_derived_values(cursor)
+        # Recalculate derived (Plan/Rephase totals fall back to capacity) and rollups
+        refresh_derived_columns(cursor, fiscal_year)
+        rebuild_rollups(cursor, fiscal_year)
+        bump_version(cursor, 'projects', fiscal_year)
         conn.commit()
+        response_cache.bump(fiscal_year, 'projects')
         
         conn.close()
         return {"message": "Commissioning data reset successfully", "count": updated_count}
@@ -1647,6 +1996,7 @@ async def upload_excel_workbook(
         
         # Import to database (clears existing data first)
         db_result = import_projects_to_db(result['projects'], result.get('summaries'), fiscalYear)
+        response_cache.bump(fiscalYear, 'projects')
         
         if not db_result['success']:
             raise HTTPException(
@@ -1680,38 +2030,8 @@ def get_upload_status(fiscalYear: str = Query("FY_25-26")):
     """
     conn = get_db_connection()
     cursor = conn.cursor()
-    
     try:
-        # Count projects
-        cursor.execute('''
-            SELECT COUNT(*) as total,
-                   SUM(CASE WHEN plan_actual = 'Plan' THEN 1 ELSE 0 END) as plan_count,
-                   SUM(CASE WHEN plan_actual = 'Rephase' THEN 1 ELSE 0 END) as rephase_count,
-                   SUM(CASE WHEN plan_actual = 'Actual' THEN 1 ELSE 0 END) as actual_count
-            FROM commissioning_projects 
-            WHERE fiscal_year = ? AND is_deleted = 0
-        ''', (fiscalYear,))
-        
-        row = cursor.fetchone()
-        
-        # Get last update
-        cursor.execute('''
-            SELECT MAX(updated_at) as last_update 
-            FROM commissioning_projects 
-            WHERE fiscal_year = ?
-        ''', (fiscalYear,))
-        
-        last_update = cursor.fetchone()
-        
-        return {
-            "fiscal_year": fiscalYear,
-            "total_projects": row[0] if row else 0,
-            "plan_count": row[1] if row else 0,
-            "rephase_count": row[2] if row else 0,
-            "actual_count": row[3] if row else 0,
-            "last_update": last_update[0] if last_update else None
-        }
-        
+        return load_upload_status(cursor, fiscalYear)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -1749,107 +2069,6 @@ async def chat_endpoint(request: ChatRequest):
         return {"response": "I'm sorry, I'm having trouble responding right now. Please try again later."}
 
 
-# --- Master Data Management Endpoints ---
-
-@app.get("/api/dropdown-options")
-def get_dropdown_options(fiscalYear: str = Query("FY_25-26")):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT option_type, option_value FROM dropdown_options WHERE fiscal_year = ?", (fiscalYear,))
-        rows = cursor.fetchall()
-        
-        # Initialize dictionary with empty lists
-        options = {
-            "groups": [], "ppaMerchants": [], "types": [], 
-            "locationCodes": [], "locations": [], "connectivities": [], 
-            "sections": [], "categories": []
-        }
-        
-        # Map values to correct types
-        mapping = {
-            "groups": "groups", "ppa_merchants": "ppaMerchants", "types": "types",
-            "location_codes": "locationCodes", "locations": "locations", 
-            "connectivities": "connectivities", "sections": "sections",
-            "categories": "categories"
-        }
-        
-        for opt_type, opt_val in rows:
-            mapped_key = mapping.get(opt_type, opt_type)
-            if mapped_key in options:
-                options[mapped_key].append(opt_val)
-                
-        # Fill defaults if missing
-        if not options["sections"]: options["sections"] = ["A", "B", "C", "D", "E"]
-        if not options["ppaMerchants"]: options["ppaMerchants"] = ["AGEL", "AREPL", "AHPPL"]
-        if not options["types"]: options["types"] = ["PPA", "Merchant", "Group"]
-        if not options["categories"]: options["categories"] = ["Solar", "Wind"]
-             
-        return options
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
-
-@app.post("/api/dropdown-options")
-def save_dropdown_options(options: DropdownOptionsModel, fiscalYear: str = Query("FY_25-26")):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # Clear existing
-        cursor.execute("DELETE FROM dropdown_options WHERE fiscal_year = ?", (fiscalYear,))
-        
-        # Reverse mapping for storage
-        inv_mapping = {
-            "groups": "groups", "ppaMerchants": "ppa_merchants", "types": "types",
-            "locationCodes": "location_codes", "locations": "locations", 
-            "connectivities": "connectivities", "sections": "sections",
-            "categories": "categories"
-        }
-        
-        data_dict = options.dict()
-        for key, values in data_dict.items():
-            db_key = inv_mapping.get(key, key)
-            for val in values:
-                cursor.execute(
-                    "INSERT INTO dropdown_options (option_type, option_value, fiscal_year) VALUES (?, ?, ?)",
-                    (db_key, val, fiscalYear)
-                )
-        conn.commit()
-        return {"success": True}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
-
-@app.get("/api/location-relationships")
-def get_location_relationships(fiscalYear: str = Query("FY_25-26")):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT location, location_code FROM location_relationships WHERE fiscal_year = ?", (fiscalYear,))
-        rows = cursor.fetchall()
-        return [{"location": r[0], "locationCode": r[1]} for r in rows]
-    finally:
-        conn.close()
-
-@app.post("/api/location-relationships")
-def save_location_relationships(relationships: List[Dict[str, str]], fiscalYear: str = Query("FY_25-26")):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("DELETE FROM location_relationships WHERE fiscal_year = ?", (fiscalYear,))
-        for rel in relationships:
-            cursor.execute(
-                "INSERT INTO location_relationships (location, location_code, fiscal_year) VALUES (?, ?, ?)",
-                (rel.get('location'), rel.get('locationCode'), fiscalYear)
-            )
-        conn.commit()
-        return {"success": True}
-    finally:
-        conn.close()
-
 @app.post("/api/manual-add-project")
 async def manual_add_project(request: ManualProjectRequest):
     """
@@ -1867,25 +2086,30 @@ async def manual_add_project(request: ManualProjectRequest):
         
         # 2. Add 3 rows
         statuses = ['Plan', 'Rephase', 'Actual']
+        new_ids = []
+        change_seq = next_change_seq(cursor)
+        generation = current_generation(cursor, request.fiscalYear)
         for status in statuses:
             cursor.execute('''
                 INSERT INTO commissioning_projects (
                     sno, category, section, project_name, spv, project_type, 
                     capacity, plan_actual, fiscal_year, is_deleted,
-                    total_capacity, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+                    total_capacity, plot_location, change_seq, generation
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)
             ''', (
                 new_sno, request.category, request.section, request.projectName, 
                 request.spv, request.projectType, request.capacity, status, 
-                request.fiscalYear, request.capacity, 'Active'
+                request.fiscalYear, request.capacity, '', change_seq, generation
             ))
+            new_ids.append(cursor.lastrowid)
         
+        # 3. Recalculate derived (sets initial 0s for quarters etc) and roll the new rows up
+        refresh_derived_columns(cursor, request.fiscalYear, new_ids)
+        for new_id in new_ids:
+            apply_project_change(cursor, request.fiscalYear, None, fetch_project_row(cursor, new_id))
+        bump_version(cursor, 'projects', request.fiscalYear)
         conn.commit()
-        
-        # 3. Recalculate derived (sets initial 0s for quarters etc)
-        from main import calculate_derived_values
-        calculate_derived_values(cursor)
-        conn.commit()
+        response_cache.bump(request.fiscalYear, 'projects')
         
         conn.close()
         return {"success": True, "message": f"Project '{request.projectName}' added successfully."}
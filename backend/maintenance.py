@@ -0,0 +1,218 @@
+"""
+Scheduled database maintenance.
+
+PeriodicJob runs a maintenance function on a daemon thread. Soft-delete
+compaction is defined here; table_history's history compaction also runs as
+a PeriodicJob.
+
+Soft-delete compaction: saves of commissioning projects and summaries, and
+of dropdown options and location relationships, flag the previous copy
+is_deleted = 1 and insert a new one. Every is_deleted = 0 query then scans
+those dead generations too. Compaction moves the flagged rows into
+<table>_history ('archive' mode) or drops them ('purge' mode). It then runs
+VACUUM and ANALYZE and reports the rows reclaimed and the timing of a live-row
+probe query before and after.
+
+Delta sync reports soft-deleted projects to clients holding an older token.
+Before removing them, compaction raises the sync floor (change_seq.py) to
+the highest change_seq it removes. Clients with an older token are then
+told to do a full resync instead of silently missing the deletions.
+
+Superseded project rows that a retained generation (generations.py) still
+needs for restore are left in place. Generations past the retention limit
+are marked pruned first, so their rows are reclaimed in the same run.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from change_seq import raise_sync_floor
+from generations import PROTECTED_ROW, prune_generations
+
+SOFT_DELETE_COMPACTION_HOURS = float(os.getenv("SOFT_DELETE_COMPACTION_HOURS", "24"))
+SOFT_DELETE_COMPACTION_MODE = os.getenv("SOFT_DELETE_COMPACTION_MODE", "archive")
+MODES = ('archive', 'purge')
+
+# Tables whose saves leave soft-deleted generations behind
+SOFT_DELETE_TABLES = (
+    'commissioning_projects',
+    'commissioning_summaries',
+    'dropdown_options',
+    'location_relationships',
+)
+
+PROBE_RUNS = 5
+
+
+class PeriodicJob:
+    """Runs `job(connect, **kwargs)` every `interval_hours` on a daemon thread and keeps the last report."""
+
+    def __init__(self, name: str, job: Callable[..., Dict[str, Any]], interval_hours: float):
+        self.name = name
+        self.job = job
+        self.interval = interval_hours * 3600
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def run_once(self, connect: Callable[[], Any], **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            self.last_report = self.job(connect, **kwargs)
+            self.last_error = None
+            return self.last_report
+
+    def start(self, connect: Callable[[], Any]) -> None:
+        """Start the schedule (no-op when the interval is 0 or it is already running)."""
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.run_once(connect)
+                except Exception as e:
+                    self.last_error = str(e)
+                    print(f"{self.name} failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'intervalHours': self.interval / 3600,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'lastReport': self.last_report,
+            'lastError': self.last_error,
+        }
+
+
+def _table_exists(cursor, table: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def _columns(cursor, table: str) -> List[str]:
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [r[1] for r in cursor.fetchall()]
+
+
+def ensure_history_table(cursor, table: str) -> List[str]:
+    """
+    Create <table>_history (same columns plus archived_at) or add columns the
+    live table gained since. Returns the live table's columns.
+    """
+    columns = _columns(cursor, table)
+    history = f'{table}_history'
+    if not _table_exists(cursor, history):
+        cursor.execute(f'CREATE TABLE {history} AS SELECT * FROM {table} WHERE 0')
+        cursor.execute(f'ALTER TABLE {history} ADD COLUMN archived_at DATETIME')
+        if 'fiscal_year' in columns:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{history}_fiscal_year ON {history}(fiscal_year)')
+    else:
+        existing = set(_columns(cursor, history))
+        for column in columns:
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE {history} ADD COLUMN {column}')
+    return columns
+
+
+def _probe_ms(cursor, table: str) -> float:
+    """Best-of-N time of a typical live-row query on `table`."""
+    group = 'fiscal_year' if 'fiscal_year' in _columns(cursor, table) else "''"
+    best = float('inf')
+    for _ in range(PROBE_RUNS):
+        started = time.perf_counter()
+        cursor.execute(f'SELECT {group}, COUNT(*) FROM {table} WHERE is_deleted = 0 GROUP BY 1')
+        cursor.fetchall()
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000, 3)
+
+
+def _db_bytes(cursor) -> int:
+    cursor.execute('PRAGMA page_size')
+    page_size = cursor.fetchone()[0]
+    cursor.execute('PRAGMA page_count')
+    return cursor.fetchone()[0] * page_size
+
+
+def compact_soft_deleted(
+    connect: Callable[[], Any],
+    mode: str = SOFT_DELETE_COMPACTION_MODE,
+    vacuum: bool = True
+) -> Dict[str, Any]:
+    """Archive or purge soft-deleted rows of SOFT_DELETE_TABLES, then VACUUM / ANALYZE."""
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+    started = time.perf_counter()
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        db_before = _db_bytes(cursor)
+        tables = [t for t in SOFT_DELETE_TABLES if _table_exists(cursor, t)]
+        report: Dict[str, Dict[str, Any]] = {}
+        for table in tables:
+            report[table] = {'probeMsBefore': _probe_ms(cursor, table)}
+
+        generations_pruned = 0
+        if _table_exists(cursor, 'commissioning_generations'):
+            generations_pruned = prune_generations(cursor)
+            conn.commit()
+
+        for table in tables:
+            reclaimable = 'is_deleted = 1'
+            if table == 'commissioning_projects':
+                if _table_exists(cursor, 'commissioning_generations'):
+                    reclaimable += f' AND NOT {PROTECTED_ROW}'
+                cursor.execute(
+                    f'SELECT MAX(change_seq) FROM commissioning_projects WHERE {reclaimable}'
+                )
+                floor = cursor.fetchone()[0]
+                if floor is not None:
+                    raise_sync_floor(cursor, floor)
+            if mode == 'archive':
+                columns = ", ".join(ensure_history_table(cursor, table))
+                cursor.execute(f'''
+                    INSERT INTO {table}_history ({columns}, archived_at)
+                    SELECT {columns}, CURRENT_TIMESTAMP FROM {table} WHERE {reclaimable}
+                ''')
+            cursor.execute(f'DELETE FROM {table} WHERE {reclaimable}')
+            report[table]['rowsReclaimed'] = cursor.rowcount
+            conn.commit()
+
+        vacuumed = False
+        if vacuum:
+            try:
+                cursor.execute('VACUUM')
+                vacuumed = True
+            except Exception as e:
+                # Another connection holds a lock; the freed pages are still reused
+                print(f"VACUUM skipped: {e}")
+        cursor.execute('ANALYZE')
+        conn.commit()
+
+        for table in tables:
+            report[table]['probeMsAfter'] = _probe_ms(cursor, table)
+        db_after = _db_bytes(cursor)
+    finally:
+        conn.close()
+    return {
+        'mode': mode,
+        'tables': report,
+        'rowsReclaimed': sum(t['rowsReclaimed'] for t in report.values()),
+        'generationsPruned': generations_pruned,
+        'vacuumed': vacuumed,
+        'dbBytesBefore': db_before,
+        'dbBytesAfter': db_after,
+        'durationMs': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+soft_delete_compactor = PeriodicJob('soft-delete-compactor', compact_soft_deleted, SOFT_DELETE_COMPACTION_HOURS)
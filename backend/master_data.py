@@ -0,0 +1,146 @@
+"""
+Incremental writes for dropdown master data (dropdown_options).
+
+Adding one value used to soft-delete the whole table and re-insert every
+option, so each edit cost O(table) and left a dead copy of the table behind.
+Writes now touch only the rows that change:
+
+- add_option / remove_option insert or delete one row. Each is a lookup
+  through the unique index on (option_type, option_value).
+- replace_options (full and per-type saves) diffs the submitted lists
+  against the stored ones. It deletes removed values and inserts new ones.
+  Values that stay keep their row, so a save costs O(changes).
+
+Removed values are deleted outright, not flagged, so no dead rows
+accumulate. Options are global; the table has no fiscal year. The unique
+index covers live rows only (is_deleted = 0), so soft-deleted rows left by
+earlier saves can stay until soft-delete compaction archives them.
+
+load_dropdown_options / load_location_relationships build the read payloads
+that master_data_cache.py keeps in memory.
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+# API keys whose stored option_type differs
+API_TO_DB_TYPES = {
+    'ppaMerchants': 'ppa-merchants',
+    'locationCodes': 'location-codes',
+}
+DB_TO_API_TYPES = {db: api for api, db in API_TO_DB_TYPES.items()}
+
+
+def db_option_type(api_key: str) -> str:
+    return API_TO_DB_TYPES.get(api_key, api_key)
+
+
+def api_option_type(db_type: str) -> str:
+    return DB_TO_API_TYPES.get(db_type, db_type)
+
+
+# Served while nothing has been saved
+DEFAULT_DROPDOWN_OPTIONS = {
+    "groups": ['AGEL', 'ACL'],
+    "ppaMerchants": ['PPA', 'Merchant'],
+    "types": ['Solar', 'Wind', 'Hybrid'],
+    "locationCodes": ['Khavda', 'RJ'],
+    "locations": ['Khavda', 'Baap', 'Essel'],
+    "connectivities": ['CTU'],
+}
+DEFAULT_LOCATION_RELATIONSHIPS = [
+    {'location': 'Khavda', 'locationCode': 'Khavda'},
+    {'location': 'Baap', 'locationCode': 'RJ'},
+    {'location': 'Essel', 'locationCode': 'RJ'},
+]
+
+
+def load_dropdown_options(cursor) -> Dict[str, List[str]]:
+    """Live options grouped by API key (the defaults when none are stored)."""
+    cursor.execute('SELECT option_type, option_value FROM dropdown_options WHERE is_deleted = 0 ORDER BY id')
+    rows = cursor.fetchall()
+    if not rows:
+        return {key: list(values) for key, values in DEFAULT_DROPDOWN_OPTIONS.items()}
+    options: Dict[str, List[str]] = {key: [] for key in DEFAULT_DROPDOWN_OPTIONS}
+    for option_type, option_value in rows:
+        options.setdefault(api_option_type(option_type), []).append(option_value)
+    return options
+
+
+def load_location_relationships(cursor, fiscal_year: str) -> List[Dict[str, Any]]:
+    """Live location -> location code pairs of a fiscal year (the defaults when none are stored)."""
+    cursor.execute(
+        'SELECT location, location_code FROM location_relationships '
+        'WHERE fiscal_year = ? AND is_deleted = 0 ORDER BY id',
+        (fiscal_year,)
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        return [dict(r) for r in DEFAULT_LOCATION_RELATIONSHIPS]
+    return [{'location': r[0], 'locationCode': r[1]} for r in rows]
+
+
+def _unique(values: Iterable[str]) -> List[str]:
+    seen = set()
+    return [v for v in values if not (v in seen or seen.add(v))]
+
+
+def add_option(cursor, option_type: str, option_value: str) -> bool:
+    """Insert one value (stored option_type); False when it already exists."""
+    cursor.execute('''
+        SELECT 1 FROM dropdown_options WHERE option_type = ? AND option_value = ? AND is_deleted = 0
+    ''', (option_type, option_value))
+    if cursor.fetchone():
+        return False
+    cursor.execute('''
+        INSERT INTO dropdown_options (option_type, option_value, version) VALUES (?, ?, 1)
+    ''', (option_type, option_value))
+    return True
+
+
+def remove_option(cursor, option_type: str, option_value: str) -> bool:
+    """Delete one value; False when it did not exist."""
+    cursor.execute('''
+        DELETE FROM dropdown_options WHERE option_type = ? AND option_value = ? AND is_deleted = 0
+    ''', (option_type, option_value))
+    return cursor.rowcount > 0
+
+
+def replace_options(cursor, options: Dict[str, List[str]], all_types: bool = False) -> Tuple[int, int]:
+    """
+    Make the stored values of each option type in `options` (stored types)
+    equal the given lists, writing only the difference. With `all_types`,
+    types missing from `options` are emptied too (full save). Returns
+    (added, removed).
+    """
+    if all_types:
+        cursor.execute('SELECT option_type, option_value FROM dropdown_options WHERE is_deleted = 0')
+    elif options:
+        marks = ', '.join('?' for _ in options)
+        cursor.execute(f'''
+            SELECT option_type, option_value FROM dropdown_options
+            WHERE is_deleted = 0 AND option_type IN ({marks})
+        ''', list(options))
+    else:
+        return 0, 0
+    stored: Dict[str, set] = {}
+    for option_type, option_value in cursor.fetchall():
+        stored.setdefault(option_type, set()).add(option_value)
+
+    removals = [
+        (option_type, value)
+        for option_type, values in stored.items()
+        for value in values - set(options.get(option_type, ()))
+    ]
+    inserts = [
+        (option_type, value)
+        for option_type, values in options.items()
+        for value in _unique(values)
+        if value not in stored.get(option_type, ())
+    ]
+    cursor.executemany(
+        'DELETE FROM dropdown_options WHERE option_type = ? AND option_value = ? AND is_deleted = 0', removals
+    )
+    cursor.executemany(
+        'INSERT INTO dropdown_options (option_type, option_value, version) VALUES (?, ?, 1)', inserts
+    )
+    return len(inserts), len(removals)
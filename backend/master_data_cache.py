@@ -0,0 +1,134 @@
+"""
+In-process cache of the master-data lookups: dropdown options and the
+location relationships of each fiscal year.
+
+The data changes a few times a month, but every page load and dropdown
+mount used to re-query it and rebuild the same dicts. Each entry holds the
+serialized response body and the data_versions version it was built at.
+
+- Within CHECK_SECONDS of the last check a hit touches no SQL.
+- After that, one primary-key lookup of the version confirms the entry.
+  That check is how writes made by other workers are noticed; a changed
+  version reloads the entry.
+- Save endpoints in this process call note_write() with the version they
+  committed. Older entries stop being served at once, including one a
+  concurrent read is still storing.
+
+Versions are read before the data. A write landing in between only makes
+the entry look older than its data, which costs one extra reload.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from data_versions import data_version
+from serialization import dumps
+
+CHECK_SECONDS = float(os.getenv("MASTER_DATA_CHECK_SECONDS", "5"))
+
+
+class _Entry:
+    __slots__ = ('version', 'body', 'checked')
+
+    def __init__(self, version: int, body: bytes, checked: float):
+        self.version = version
+        self.body = body
+        self.checked = checked
+
+
+class MasterDataCache:
+    """Serialized lookups keyed by (entity, scope), validated against data_versions."""
+
+    def __init__(self, check_seconds: float = CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._written: Dict[Tuple[str, str], int] = {}
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+
+    def get(
+        self,
+        connect: Callable[[], Any],
+        entity: str,
+        scope: str,
+        load: Callable[[Any], Any]
+    ) -> Tuple[int, bytes]:
+        """(version, JSON body) of a lookup; `load(cursor)` builds it on a miss."""
+        key = (entity, scope)
+        with self._lock:
+            entry = self._usable(key)
+            if entry is not None and time.monotonic() - entry.checked < self.check_seconds:
+                self.hits += 1
+                return entry.version, entry.body
+
+        conn = connect()
+        try:
+            return self._validate(conn.cursor(), key, entry, load)
+        finally:
+            conn.close()
+
+    def get_at(self, cursor, entity: str, scope: str, load: Callable[[Any], Any]) -> Tuple[int, bytes]:
+        """
+        Like get(), but always checks the version through `cursor`, so the
+        result matches the snapshot of a read transaction the caller holds.
+        """
+        key = (entity, scope)
+        with self._lock:
+            entry = self._usable(key)
+        return self._validate(cursor, key, entry, load)
+
+    def _usable(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        # Caller holds the lock
+        entry = self._entries.get(key)
+        if entry is not None and entry.version < self._written.get(key, 0):
+            return None
+        return entry
+
+    def _validate(self, cursor, key: Tuple[str, str], entry: Optional[_Entry], load) -> Tuple[int, bytes]:
+        now = time.monotonic()
+        version = data_version(cursor, *key)
+        if entry is not None and entry.version == version:
+            entry.checked = now
+            with self._lock:
+                self.revalidations += 1
+            return version, entry.body
+        body = dumps(load(cursor))
+        with self._lock:
+            self.loads += 1
+            current = self._entries.get(key)
+            # A reader holding an older snapshot must not replace a newer entry
+            if current is None or current.version <= version:
+                self._entries[key] = _Entry(version, body, now)
+        return version, body
+
+    def note_write(self, entity: str, scope: str, version: int) -> None:
+        """A save in this process committed `version`; stop serving anything older."""
+        key = (entity, scope)
+        with self._lock:
+            self._written[key] = max(version, self._written.get(key, 0))
+            entry = self._entries.get(key)
+            if entry is not None and entry.version < version:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._written.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(len(e.body) for e in self._entries.values()),
+                'checkSeconds': self.check_seconds,
+                'hits': self.hits,
+                'revalidations': self.revalidations,
+                'loads': self.loads,
+            }
+
+
+master_data_cache = MasterDataCache()
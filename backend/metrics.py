@@ -0,0 +1,245 @@
+"""
+Request metrics in Prometheus text format (/metrics).
+
+MetricsMiddleware is the outermost middleware, so it sees every response.
+That includes responses served by the response cache, rejected by auth,
+and compressed. Per method, route and status it records:
+
+    http_requests_total                 counter
+    http_request_duration_seconds       histogram
+    http_response_size_bytes            histogram (bytes sent, after compression)
+    http_requests_in_flight             gauge (method, route)
+
+The route label is the route template (/commissioning-generations/restore,
+/backup-data/{version}), so /x and /api/x show up as separate series and
+the hot duplicates are easy to spot. The template is known only after
+routing, so in-flight counts use the raw path for static routes and
+"<dynamic>" for parameterized ones. Requests that matched no route are
+grouped under "<unmatched>" to keep attacker-chosen paths out of the label
+set.
+
+Recording is a dict lookup, a bisect and a few integer increments under one
+lock; no formatting happens until a scrape. Component gauges (caches, the
+password pool, compaction jobs, database file size) are read from
+registered collectors at scrape time:
+
+    app_component_stat{component="responseCache", stat="hits"} 42
+
+No prometheus_client dependency: the exposition format is small enough to
+write out directly.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+UNMATCHED = '<unmatched>'
+DYNAMIC = '<dynamic>'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Series:
+    """Counts and histograms for one (method, route, status)."""
+
+    __slots__ = ('count', 'duration_buckets', 'duration_sum', 'size_buckets', 'size_sum')
+
+    def __init__(self):
+        self.count = 0
+        # One slot per bucket plus +Inf; made cumulative when rendered
+        self.duration_buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.size_buckets = [0] * (len(SIZE_BUCKETS) + 1)
+        self.size_sum = 0
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: Any) -> str:
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + '}'
+
+
+def _flatten(prefix: str, stats: Dict[str, Any]) -> Iterable[Tuple[str, float]]:
+    """Numeric leaves of a stats dict; nested dicts become dotted stat names."""
+    for key, value in stats.items():
+        name = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict):
+            yield from _flatten(name, value)
+
+
+class RequestMetrics:
+    """Thread-safe store of request series, in-flight counts and component collectors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str, str], _Series] = {}
+        self._in_flight: Dict[Tuple[str, str], int] = {}
+        self._collectors: List[Callable[[], Dict[str, Dict[str, Any]]]] = []
+        self._static_paths: Optional[frozenset] = None
+
+    def add_collector(self, collector: Callable[[], Dict[str, Dict[str, Any]]]) -> None:
+        """`collector()` returns {component: stats dict}; it runs at scrape time."""
+        self._collectors.append(collector)
+
+    def route_label(self, scope, app=None) -> str:
+        """Label for a request before routing: its path if a static route of `app` has it."""
+        if self._static_paths is None:
+            routes = getattr(app, 'routes', None)
+            if routes is None:
+                return DYNAMIC
+            self._static_paths = frozenset(r.path for r in routes if '{' not in getattr(r, 'path', '{'))
+        return scope['path'] if scope['path'] in self._static_paths else DYNAMIC
+
+    def started(self, method: str, route: str) -> None:
+        key = (method, route)
+        with self._lock:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+
+    def finished(self, method: str, started_route: str, route: str, status: int, seconds: float, size: int) -> None:
+        key = (method, route, str(status))
+        duration_slot = bisect_left(DURATION_BUCKETS, seconds)
+        size_slot = bisect_left(SIZE_BUCKETS, size)
+        with self._lock:
+            self._in_flight[(method, started_route)] -= 1
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.count += 1
+            series.duration_buckets[duration_slot] += 1
+            series.duration_sum += seconds
+            series.size_buckets[size_slot] += 1
+            series.size_sum += size
+
+    def in_flight(self, matches: Callable[[str, str], bool] = lambda method, route: True) -> int:
+        """Requests in flight whose (method, in-flight route label) `matches`."""
+        with self._lock:
+            return sum(n for (method, route), n in self._in_flight.items() if matches(method, route))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._in_flight.clear()
+
+    def _histogram(self, lines: List[str], name: str, bounds, buckets: List[int], total: float, count: int, labels):
+        cumulative = 0
+        for bound, n in zip(bounds, buckets):
+            cumulative += n
+            lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {count}')
+        lines.append(f'{name}_sum{_labels(**labels)} {total}')
+        lines.append(f'{name}_count{_labels(**labels)} {count}')
+
+    def render(self) -> str:
+        with self._lock:
+            series = [
+                (key, s.count, list(s.duration_buckets), s.duration_sum, list(s.size_buckets), s.size_sum)
+                for key, s in sorted(self._series.items())
+            ]
+            in_flight = sorted(self._in_flight.items())
+
+        lines = [
+            '# HELP http_requests_total Requests by method, route and status.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (method, route, status), count, *_ in series:
+            lines.append(f'http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+        lines += [
+            '# HELP http_request_duration_seconds Time to the last response byte.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (method, route, status), count, durations, duration_sum, _, _ in series:
+            self._histogram(lines, 'http_request_duration_seconds', DURATION_BUCKETS, durations, duration_sum, count,
+                            dict(method=method, route=route, status=status))
+
+        lines += [
+            '# HELP http_response_size_bytes Response body bytes sent (after compression).',
+            '# TYPE http_response_size_bytes histogram',
+        ]
+        for (method, route, status), count, _, _, sizes, size_sum in series:
+            self._histogram(lines, 'http_response_size_bytes', SIZE_BUCKETS, sizes, size_sum, count,
+                            dict(method=method, route=route, status=status))
+
+        lines += [
+            '# HELP http_requests_in_flight Requests being handled.',
+            '# TYPE http_requests_in_flight gauge',
+        ]
+        for (method, route), count in in_flight:
+            lines.append(f'http_requests_in_flight{_labels(method=method, route=route)} {count}')
+
+        lines += [
+            '# HELP app_component_stat Cache, pool and job statistics.',
+            '# TYPE app_component_stat gauge',
+        ]
+        for collector in self._collectors:
+            try:
+                components = collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for component, stats in components.items():
+                for stat, value in _flatten('', stats):
+                    lines.append(f'app_component_stat{_labels(component=component, stat=stat)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+def sqlite_file_stats(db_path: str) -> Dict[str, int]:
+    """Database and WAL file sizes (no connection needed)."""
+    stats = {}
+    for name, path in (('sizeBytes', db_path), ('walBytes', db_path + '-wal')):
+        try:
+            stats[name] = os.path.getsize(path)
+        except OSError:
+            stats[name] = 0
+    return stats
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding RequestMetrics; add it last so it is outermost."""
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        # Inside the Starlette stack scope['app'] is the application; wrapped from outside, the app itself
+        started_route = self.metrics.route_label(scope, scope.get('app', self.app))
+        response = {'status': 500, 'size': 0}
+
+        async def record(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['size'] += len(message.get('body', b''))
+            await send(message)
+
+        self.metrics.started(method, started_route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, record)
+        finally:
+            route = getattr(scope.get('route'), 'path', None)
+            if route is None:
+                route = started_route if started_route != DYNAMIC else UNMATCHED
+            self.metrics.finished(
+                method, started_route, route, response['status'], time.perf_counter() - start, response['size']
+            )
@@ -0,0 +1,88 @@
+"""
+Bounded worker pool for bcrypt password checks.
+
+A bcrypt check costs 100-300 ms of CPU. Called inline from the async login
+handler, it stalled the event loop, and with it every other request on the
+worker, for as long as a burst of logins lasted. Checks now run on a small
+thread pool. bcrypt releases the GIL while hashing, so threads run in
+parallel and the event loop keeps serving requests.
+
+Admission is bounded: at most PASSWORD_WORKERS checks run and at most
+PASSWORD_QUEUE_LIMIT more wait. Anything beyond that is rejected at once
+with PoolSaturated, which login turns into a 503 with Retry-After, instead
+of queueing without limit. A slot is released when its check finishes, not
+when the request is cancelled, so abandoned checks still count against the
+bound.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+import bcrypt
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+RETRY_AFTER_SECONDS = 1
+
+
+class PoolSaturated(Exception):
+    """Every worker is busy and the wait queue is full."""
+
+
+class PasswordPool:
+    """Runs password checks on a bounded thread pool with a queue-depth limit."""
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_WORKERS,
+        queue_limit: int = PASSWORD_QUEUE_LIMIT,
+        check: Callable[[bytes, bytes], bool] = bcrypt.checkpw
+    ):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._check = check
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-check')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise PoolSaturated(f"{self._in_flight} password checks already in progress")
+            self._in_flight += 1
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """bcrypt check of `password` against a stored hash, off the event loop."""
+        self._admit()
+        try:
+            future = self._executor.submit(self._check, password.encode('utf-8'), hashed.encode('utf-8'))
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queueLimit': self.queue_limit,
+                'inFlight': self._in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+
+password_pool = PasswordPool()
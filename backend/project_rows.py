@@ -0,0 +1,327 @@
+"""
+Query building and row formatting for /commissioning-projects.
+
+Filters, `fields=` projection and keyset pagination are pushed down into
+SQL so consumers only fetch the slice they render. Besides one object per
+row, the data can be returned column-oriented (`format=columnar`, or an
+Arrow IPC stream with `format=arrow` when pyarrow is installed).
+"""
+
+import base64
+import json
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fiscal import CUMM_MONTHS, MONTH_KEYS, PREFIX_COLUMNS, QUARTER_MONTHS, validate_month
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+except ImportError:  # optional dependency, only needed for format=arrow
+    pa = None
+
+# API field -> DB columns needed to produce it
+PROJECT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'id': ('id',),
+    'sno': ('sno',),
+    'projectName': ('project_name',),
+    'spv': ('spv',),
+    'projectType': ('project_type',),
+    'plotLocation': ('plot_location',),
+    'capacity': ('capacity',),
+    'planActual': ('plan_actual',),
+    **{m: (m,) for m in MONTH_KEYS},
+    'totalCapacity': ('plan_actual', 'capacity', *MONTH_KEYS),
+    'cummTillOct': tuple(CUMM_MONTHS),
+    **{q: tuple(months) for q, months in QUARTER_MONTHS.items()},
+    'category': ('category',),
+    'section': ('section',),
+    'includedInTotal': ('included_in_total',),
+}
+
+# Fields only available with asOf=<month>, read from the stored prefix sums:
+# cummToDate = Apr..asOf, remaining = months after asOf up to Mar
+AS_OF_FIELDS = ('cummToDate', 'remaining')
+
+# Query parameter -> column for the optional equality filters
+FILTER_COLUMNS = {
+    'category': 'category',
+    'section': 'section',
+    'spv': 'spv',
+    'projectType': 'project_type',
+    'planActual': 'plan_actual',
+}
+
+# Keyset order - matches idx_commissioning_projects_keyset
+ORDER_BY = 'category, sno, id'
+KEYSET_COLUMNS = ('category', 'sno', 'id')
+
+MAX_PAGE_SIZE = 5000
+
+# Response formats for /commissioning-projects
+FORMATS = ('json', 'columnar', 'arrow')
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Fields dictionary-encoded in the columnar formats; the rest are numeric
+STRING_FIELDS = {'projectName', 'spv', 'projectType', 'plotLocation', 'planActual', 'category', 'section'}
+INTEGER_FIELDS = {'id', 'sno'}
+
+
+def parse_fields(fields: Optional[str], as_of: Optional[str] = None) -> List[str]:
+    """Validate a comma-separated `fields=` projection. Empty means every field."""
+    valid = list(PROJECT_FIELDS) + (list(AS_OF_FIELDS) if as_of else [])
+    if not fields:
+        return valid
+    requested = [f.strip() for f in fields.split(',') if f.strip()]
+    if not as_of and any(f in AS_OF_FIELDS for f in requested):
+        raise ValueError(f"Fields {list(AS_OF_FIELDS)} require the asOf parameter")
+    unknown = [f for f in requested if f not in valid]
+    if unknown:
+        raise ValueError(f"Unknown fields: {unknown}. Valid fields: {valid}")
+    return requested
+
+
+def _field_columns(field: str, as_of: Optional[str]) -> Tuple[str, ...]:
+    if field == 'cummToDate':
+        return (PREFIX_COLUMNS[as_of],)
+    if field == 'remaining':
+        return (PREFIX_COLUMNS[as_of], PREFIX_COLUMNS['mar'])
+    return PROJECT_FIELDS[field]
+
+
+def columns_for(fields: Sequence[str], as_of: Optional[str] = None) -> List[str]:
+    """DB columns to SELECT for a projection (always including the keyset columns)."""
+    columns = list(KEYSET_COLUMNS)
+    for field in fields:
+        for column in _field_columns(field, as_of):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def encode_cursor(row: Sequence[Any]) -> str:
+    """Opaque cursor from a row whose leading columns are KEYSET_COLUMNS."""
+    raw = json.dumps(list(row[:len(KEYSET_COLUMNS)])).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(KEYSET_COLUMNS):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def build_where(
+    fiscal_year: str,
+    filters: Dict[str, Optional[str]],
+    included_in_total: Optional[bool] = None,
+    after: Optional[str] = None
+) -> Tuple[str, List[Any]]:
+    clauses = ['fiscal_year = ?', 'is_deleted = 0']
+    params: List[Any] = [fiscal_year]
+
+    for name, column in FILTER_COLUMNS.items():
+        value = filters.get(name)
+        if value:
+            clauses.append(f'{column} = ?')
+            params.append(value)
+
+    if included_in_total is not None:
+        clauses.append('included_in_total = ?')
+        params.append(1 if included_in_total else 0)
+
+    if after:
+        category, sno, row_id = decode_cursor(after)
+        # Row-value comparison spelled out so a NULL sno still pages correctly
+        if sno is None:
+            clauses.append('(category > ? OR (category = ? AND (sno IS NOT NULL OR id > ?)))')
+            params.extend([category, category, row_id])
+        else:
+            clauses.append('(category > ? OR (category = ? AND (sno > ? OR (sno = ? AND id > ?))))')
+            params.extend([category, category, sno, sno, row_id])
+
+    return ' AND '.join(clauses), params
+
+
+def compile_getters(
+    fields: Sequence[str], columns: Sequence[str], as_of: Optional[str] = None
+) -> List[Callable[[Sequence[Any]], Any]]:
+    """One function per requested field extracting/deriving its value from a cursor tuple."""
+    pos = {c: i for i, c in enumerate(columns)}
+    month_pos = [pos[m] for m in MONTH_KEYS if m in pos]
+    getters: List[Callable[[Sequence[Any]], Any]] = []
+
+    for field in fields:
+        if field == 'totalCapacity':
+            pa_i, cap_i = pos['plan_actual'], pos['capacity']
+
+            # PLAN/REPHASE: totalCapacity = capacity. ACTUAL / Fcst: sum of monthly values
+            def total(row, pa_i=pa_i, cap_i=cap_i):
+                if row[pa_i] in ('Plan', 'Rephase'):
+                    return row[cap_i] or 0
+                return sum(row[i] or 0 for i in month_pos)
+            getters.append(total)
+        elif field == 'cummTillOct' or field in QUARTER_MONTHS:
+            months = CUMM_MONTHS if field == 'cummTillOct' else QUARTER_MONTHS[field]
+            idxs = tuple(pos[m] for m in months)
+            getters.append(lambda row, idxs=idxs: sum(row[i] or 0 for i in idxs))
+        elif field == 'cummToDate':
+            i = pos[PREFIX_COLUMNS[as_of]]
+            getters.append(lambda row, i=i: row[i] or 0)
+        elif field == 'remaining':
+            cut_i, mar_i = pos[PREFIX_COLUMNS[as_of]], pos[PREFIX_COLUMNS['mar']]
+            getters.append(lambda row, cut_i=cut_i, mar_i=mar_i: (row[mar_i] or 0) - (row[cut_i] or 0))
+        elif field == 'section':
+            i = pos['section']
+            getters.append(lambda row, i=i: row[i] if row[i] is not None else 'A')
+        elif field == 'includedInTotal':
+            i = pos['included_in_total']
+            getters.append(lambda row, i=i: bool(row[i] if row[i] is not None else True))
+        else:
+            getters.append(itemgetter(pos[PROJECT_FIELDS[field][0]]))
+
+    return getters
+
+
+def compile_formatter(
+    fields: Sequence[str], columns: Sequence[str], as_of: Optional[str] = None
+) -> Callable[[Sequence[Any]], Dict[str, Any]]:
+    """
+    Build a function turning one cursor tuple straight into the API dict,
+    computing only the requested derived fields.
+    """
+    getters = compile_getters(fields, columns, as_of)
+    keys = tuple(fields)
+
+    def format_row(row: Sequence[Any]) -> Dict[str, Any]:
+        return dict(zip(keys, [g(row) for g in getters]))
+
+    return format_row
+
+
+def _query_rows(cursor, fiscal_year, filters, included_in_total, fields, limit, after, as_of):
+    """Run the filtered / projected / paginated query; returns (fields, columns, rows, next_cursor)."""
+    selected_fields = parse_fields(fields, as_of)
+    columns = columns_for(selected_fields, as_of)
+    where, params = build_where(fiscal_year, filters or {}, included_in_total, after)
+
+    sql = f'SELECT {", ".join(columns)} FROM commissioning_projects WHERE {where} ORDER BY {ORDER_BY}'
+    if limit is not None:
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        # Fetch one extra row to know whether another page exists
+        sql += ' LIMIT ?'
+        params.append(limit + 1)
+
+    # Plain tuples from the cursor - no sqlite3.Row / intermediate dict per row
+    if hasattr(cursor, 'row_factory'):
+        cursor.row_factory = None
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+
+    return selected_fields, columns, rows, next_cursor
+
+
+def fetch_projects(
+    cursor,
+    fiscal_year: str,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+    included_in_total: Optional[bool] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    as_of: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Projects as one dict per row.
+    Returns (projects, next_cursor); next_cursor is None on the last page.
+    """
+    as_of = validate_month(as_of) if as_of else None
+    selected_fields, columns, rows, next_cursor = _query_rows(
+        cursor, fiscal_year, filters, included_in_total, fields, limit, after, as_of
+    )
+    format_row = compile_formatter(selected_fields, columns, as_of)
+    return [format_row(r) for r in rows], next_cursor
+
+
+def fetch_project_columns(
+    cursor,
+    fiscal_year: str,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+    included_in_total: Optional[bool] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    as_of: Optional[str] = None
+) -> Tuple[Dict[str, List[Any]], int, Optional[str]]:
+    """
+    Same query as fetch_projects, returned struct-of-arrays: {field: [value per row]}.
+    Returns (columns, row_count, next_cursor).
+    """
+    as_of = validate_month(as_of) if as_of else None
+    selected_fields, columns, rows, next_cursor = _query_rows(
+        cursor, fiscal_year, filters, included_in_total, fields, limit, after, as_of
+    )
+    getters = compile_getters(selected_fields, columns, as_of)
+    return {f: [g(r) for r in rows] for f, g in zip(selected_fields, getters)}, len(rows), next_cursor
+
+
+def dictionary_encode(values: Sequence[Any]) -> Dict[str, List[Any]]:
+    """{"dictionary": distinct values in first-seen order, "indices": position per row (null stays null)}."""
+    lookup: Dict[Any, int] = {}
+    indices: List[Optional[int]] = []
+    for value in values:
+        if value is None:
+            indices.append(None)
+            continue
+        idx = lookup.get(value)
+        if idx is None:
+            idx = lookup[value] = len(lookup)
+        indices.append(idx)
+    return {'dictionary': list(lookup), 'indices': indices}
+
+
+def to_columnar(columns: Dict[str, List[Any]], count: int, next_cursor: Optional[str]) -> Dict[str, Any]:
+    """JSON columnar payload: string fields dictionary-encoded, everything else as a plain array."""
+    return {
+        'format': 'columnar',
+        'count': count,
+        'columns': {
+            f: dictionary_encode(values) if f in STRING_FIELDS else values
+            for f, values in columns.items()
+        },
+        'nextCursor': next_cursor,
+    }
+
+
+def to_arrow_ipc(columns: Dict[str, List[Any]], next_cursor: Optional[str]) -> bytes:
+    """Arrow IPC stream of one record batch. Requires the optional pyarrow package."""
+    if pa is None:
+        raise ValueError("format=arrow requires pyarrow, which is not installed on the server")
+    arrays, names = [], []
+    for field, values in columns.items():
+        if field in STRING_FIELDS:
+            array = pa.array(values, type=pa.string()).dictionary_encode()
+        elif field in INTEGER_FIELDS:
+            array = pa.array(values, type=pa.int64())
+        elif field == 'includedInTotal':
+            array = pa.array(values, type=pa.bool_())
+        else:
+            array = pa.array(values, type=pa.float64())
+        arrays.append(array)
+        names.append(field)
+    batch = pa.RecordBatch.from_arrays(arrays, names=names)
+    batch = batch.replace_schema_metadata({'nextCursor': next_cursor or ''})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
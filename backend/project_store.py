@@ -0,0 +1,169 @@
+"""
+In-memory, NumPy-backed read store for commissioning projects.
+
+Each fiscal year's non-deleted projects are loaded once into contiguous
+arrays (a rows x 12 month matrix, capacity, integer-coded dimension columns)
+with bitmap indexes per dimension value, so dashboard filters and
+aggregations run as vectorized masks instead of SQL round-trips. A year is
+reloaded lazily on the first read after a write bumps its data version. Only
+the most recently used years are kept, since the year comes from the client.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fiscal import MONTH_KEYS
+
+# Dimension columns stored as integer codes
+CODED_COLUMNS = ('category', 'section', 'spv', 'project_type', 'plan_actual', 'project_name')
+
+
+class CodedColumn:
+    """Dictionary-encoded column with a lazily built bitmap per value."""
+
+    __slots__ = ('labels', 'codes', '_lookup', '_bitmaps')
+
+    def __init__(self, values: List[Optional[str]]):
+        lookup: Dict[Optional[str], int] = {}
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            codes[i] = code
+        self.labels = list(lookup)
+        self.codes = codes
+        self._lookup = lookup
+        self._bitmaps: Dict[int, np.ndarray] = {}
+
+    def bitmap(self, value: Optional[str]) -> np.ndarray:
+        """Boolean row mask for rows equal to `value` (all False when the value is absent)."""
+        code = self._lookup.get(value)
+        if code is None:
+            return np.zeros(len(self.codes), dtype=bool)
+        mask = self._bitmaps.get(code)
+        if mask is None:
+            mask = self._bitmaps[code] = self.codes == code
+        return mask
+
+    def bitmap_where(self, predicate: Callable[[Optional[str]], bool]) -> np.ndarray:
+        """Mask for rows whose label satisfies `predicate` (evaluated once per distinct value)."""
+        matching = np.array([predicate(label) for label in self.labels], dtype=bool)
+        return matching[self.codes] if len(self.codes) else np.zeros(0, dtype=bool)
+
+
+class FiscalYearStore:
+    """Column arrays for one fiscal year's non-deleted projects."""
+
+    def __init__(self, fiscal_year: str, rows: List[Tuple]):
+        self.fiscal_year = fiscal_year
+        self.size = len(rows)
+        # rows: (capacity, included_in_total, <coded columns...>, <12 months...>)
+        n_coded = len(CODED_COLUMNS)
+        columns = list(zip(*rows)) if rows else [[] for _ in range(2 + n_coded + len(MONTH_KEYS))]
+
+        self.capacity = np.array([v or 0.0 for v in columns[0]], dtype=np.float64)
+        self.included = np.array([bool(v) for v in columns[1]], dtype=bool)
+        self.columns: Dict[str, CodedColumn] = {
+            name: CodedColumn(list(columns[2 + i])) for i, name in enumerate(CODED_COLUMNS)
+        }
+        month_values = columns[2 + n_coded:]
+        self.months = np.array(
+            [[v or 0.0 for v in col] for col in month_values], dtype=np.float64
+        ).T.reshape(self.size, len(MONTH_KEYS))
+
+    @classmethod
+    def load(cls, cursor, fiscal_year: str) -> 'FiscalYearStore':
+        select = ['capacity', 'included_in_total', *CODED_COLUMNS, *MONTH_KEYS]
+        cursor.execute(
+            f'SELECT {", ".join(select)} FROM commissioning_projects WHERE fiscal_year = ? AND is_deleted = 0',
+            (fiscal_year,)
+        )
+        return cls(fiscal_year, [tuple(r) for r in cursor.fetchall()])
+
+    def mask(
+        self,
+        scope: str = 'Overall',
+        category: Optional[str] = None,
+        project_name: Optional[str] = None,
+        spv: Optional[str] = None,
+        project_type: Optional[str] = None,
+        included_only: bool = True,
+    ) -> np.ndarray:
+        """Row mask equivalent to dashboard._build_filters."""
+        mask = self.included.copy() if included_only else np.ones(self.size, dtype=bool)
+        if scope == 'Solar':
+            mask &= self.columns['category'].bitmap_where(lambda c: c is not None and 'solar' in c.lower())
+        elif scope == 'Wind':
+            mask &= self.columns['category'].bitmap_where(lambda c: c is not None and 'wind' in c.lower())
+        for column, value in (('category', category), ('project_name', project_name),
+                              ('spv', spv), ('project_type', project_type)):
+            if value:
+                mask &= self.columns[column].bitmap(value)
+        return mask
+
+    def totals(self, mask: np.ndarray, plan_actual: str) -> Dict[str, Any]:
+        """Row count, distinct projects, capacity and monthly sums for one plan_actual type."""
+        selected = mask & self.columns['plan_actual'].bitmap(plan_actual)
+        month_sums = self.months[selected].sum(axis=0) if self.size else np.zeros(len(MONTH_KEYS))
+        return {
+            'rows': int(selected.sum()),
+            'projects': int(np.unique(self.columns['project_name'].codes[selected]).size),
+            'capacity': float(self.capacity[selected].sum()),
+            'months': {m: float(month_sums[i]) for i, m in enumerate(MONTH_KEYS)},
+        }
+
+    def distinct(self, column: str, mask: np.ndarray) -> List[str]:
+        """Sorted non-empty labels of `column` among masked rows."""
+        coded = self.columns[column]
+        codes = np.unique(coded.codes[mask])
+        return sorted(coded.labels[c] for c in codes if coded.labels[c])
+
+
+class ProjectStore:
+    """
+    LRU of per-fiscal-year FiscalYearStore instances, reloaded when the data
+    version changes. `version_of(cursor, fiscal_year)` reads the version.
+    """
+
+    def __init__(self, version_of: Callable[[Any, str], Any], max_years: int = 8):
+        self._version_of = version_of
+        self.max_years = max_years
+        self._lock = threading.Lock()
+        self._years: "OrderedDict[str, Tuple[Any, FiscalYearStore]]" = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, cursor, fiscal_year: str) -> FiscalYearStore:
+        version = self._version_of(cursor, fiscal_year)
+        with self._lock:
+            cached = self._years.get(fiscal_year)
+            if cached is not None and cached[0] == version:
+                self._years.move_to_end(fiscal_year)
+                return cached[1]
+            store = FiscalYearStore.load(cursor, fiscal_year)
+            self.loads += 1
+            # Only keep it if no write landed while loading
+            if self._version_of(cursor, fiscal_year) == version:
+                self._years[fiscal_year] = (version, store)
+                self._years.move_to_end(fiscal_year)
+                while len(self._years) > self.max_years:
+                    self._years.popitem(last=False)
+                    self.evictions += 1
+            return store
+
+    def clear(self) -> None:
+        with self._lock:
+            self._years.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'fiscalYears': {fy: store.size for fy, (_, store) in self._years.items()},
+                'maxYears': self.max_years,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,136 @@
+"""
+Refresh tokens, so sessions outlive the 30-minute access token without a
+new password login (and its bcrypt check).
+
+A refresh token is 32 random bytes, handed to the client once. Only its
+SHA-256 is stored. The token already has full entropy, so a fast hash is
+enough, and the lookup is a unique-index equality on the hash. The client
+never controls the hash, so the lookup leaks no usable timing information
+about stored tokens.
+
+Every token belongs to a family, one per login session:
+
+- /token/refresh marks the presented token used and issues its successor
+  in the same family (rotation).
+- A used token presented again after REFRESH_REUSE_GRACE_SECONDS means it
+  was copied. The whole family is revoked and the device has to log in
+  again. Inside the grace window the request is only refused, so two tabs
+  refreshing at once do not end the session. The losing tab retries with
+  the token the other one stored.
+- Logout revokes the family; revoke_user_tokens ends every session of a
+  user.
+
+Expired tokens of a user are deleted whenever that user logs in.
+"""
+
+import hashlib
+import os
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+REFRESH_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "30"))
+
+# Same layout as SQLite's CURRENT_TIMESTAMP (UTC), so stored values compare as text
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class InvalidRefreshToken(Exception):
+    """Unknown, expired, revoked or already rotated refresh token."""
+
+
+class RefreshTokenReused(InvalidRefreshToken):
+    """A rotated token was replayed; its family has been revoked and that must be committed."""
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime(TIMESTAMP_FORMAT)
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.strptime(str(value)[:19], TIMESTAMP_FORMAT)
+
+
+def issue_refresh_token(cursor, user_id: int, family_id: Optional[str] = None) -> str:
+    """Store a new token (a new family unless `family_id` is given) and return it."""
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    cursor.execute('''
+        INSERT INTO refresh_tokens (user_id, token_hash, family_id, expires_at)
+        VALUES (?, ?, ?, ?)
+    ''', (user_id, hash_token(token), family_id or uuid.uuid4().hex, _timestamp(expires_at)))
+    return token
+
+
+def purge_expired_tokens(cursor, user_id: int) -> int:
+    cursor.execute(
+        'DELETE FROM refresh_tokens WHERE user_id = ? AND expires_at < ?',
+        (user_id, _timestamp(datetime.utcnow()))
+    )
+    return cursor.rowcount
+
+
+def revoke_family(cursor, family_id: str) -> None:
+    cursor.execute('''
+        UPDATE refresh_tokens SET revoked_at = CURRENT_TIMESTAMP
+        WHERE family_id = ? AND revoked_at IS NULL
+    ''', (family_id,))
+
+
+def rotate_refresh_token(cursor, token: str) -> Tuple[int, str]:
+    """Use up `token`; returns (user_id, successor token) or raises InvalidRefreshToken."""
+    cursor.execute('''
+        SELECT id, user_id, family_id, expires_at, used_at, revoked_at
+        FROM refresh_tokens WHERE token_hash = ?
+    ''', (hash_token(token),))
+    row = cursor.fetchone()
+    if row is None:
+        raise InvalidRefreshToken("Unknown refresh token")
+    token_id, user_id, family_id, expires_at, used_at, revoked_at = row
+    now = datetime.utcnow()
+
+    if revoked_at is not None:
+        raise InvalidRefreshToken("Refresh token has been revoked")
+    if used_at is not None:
+        if now - _as_datetime(used_at) > timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS):
+            # Replay of a rotated token: the token was copied, end the session everywhere
+            revoke_family(cursor, family_id)
+            raise RefreshTokenReused("Refresh token reuse detected; session revoked")
+        raise InvalidRefreshToken("Refresh token already rotated")
+    if _as_datetime(expires_at) <= now:
+        raise InvalidRefreshToken("Refresh token has expired")
+
+    # Guarded so that of two concurrent refreshes only one rotates
+    cursor.execute(
+        'UPDATE refresh_tokens SET used_at = ? WHERE id = ? AND used_at IS NULL',
+        (_timestamp(now), token_id)
+    )
+    if cursor.rowcount != 1:
+        raise InvalidRefreshToken("Refresh token already rotated")
+    return user_id, issue_refresh_token(cursor, user_id, family_id)
+
+
+def revoke_refresh_token(cursor, token: str) -> bool:
+    """Logout: revoke the session `token` belongs to. False for an unknown token."""
+    cursor.execute('SELECT family_id FROM refresh_tokens WHERE token_hash = ?', (hash_token(token),))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+    revoke_family(cursor, row[0])
+    return True
+
+
+def revoke_user_tokens(cursor, user_id: int) -> None:
+    """End every session of a user (e.g. after a password change)."""
+    cursor.execute('''
+        UPDATE refresh_tokens SET revoked_at = CURRENT_TIMESTAMP
+        WHERE user_id = ? AND revoked_at IS NULL
+    ''', (user_id,))
@@ -0,0 +1,266 @@
+"""
+In-process cache of serialized GET responses with strong ETags.
+
+Entries are keyed by endpoint path + fiscal year + query string + data
+version. The data version is read from the shared data_versions rows (one
+indexed lookup per request, off the event loop), so a save made by any worker
+changes the key everywhere and stale entries are never served. Local writes
+also bump an in-process counter, which drops that year's entries right away
+and notifies change listeners. Clients revalidating with If-None-Match get a
+304 without running the endpoint.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi.concurrency import run_in_threadpool
+
+# Read endpoints served through the cache. Master data and the bootstrap are
+# left out: their own caches check the shared data_versions rows, which a hit
+# here would skip, so saves made by other workers would never be seen.
+CACHEABLE_PATHS = {
+    '/commissioning-projects',
+    '/api/commissioning-projects',
+    '/commissioning-summaries',
+    '/api/commissioning-summaries',
+    '/commissioning-dashboard',
+    '/api/commissioning-dashboard',
+}
+
+DEFAULT_FISCAL_YEAR = 'FY_25-26'
+
+# Response headers stored with an entry and replayed on hits
+STORED_HEADERS = (b'x-data-version',)
+
+
+class CachedResponse:
+    __slots__ = ('body', 'etag', 'media_type', 'fiscal_year', 'headers')
+
+    def __init__(
+        self, body: bytes, etag: str, media_type: str, fiscal_year: str,
+        headers: Optional[List[Tuple[bytes, bytes]]] = None
+    ):
+        self.body = body
+        self.etag = etag
+        self.media_type = media_type
+        self.fiscal_year = fiscal_year
+        self.headers = headers or []
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes."""
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """Bounded LRU of serialized responses plus per-fiscal-year data versions."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, CachedResponse]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.not_modified = 0
+        # Called with (fiscal_year, entity, new version) after every bump
+        self._listeners: List[Callable[[Optional[str], Optional[str], Tuple[int, int]], None]] = []
+        # Called with a fiscal year; returns the shared data version entries are keyed on
+        self.version_source: Optional[Callable[[str], Any]] = None
+
+    def add_listener(self, listener: Callable[[Optional[str], Optional[str], Tuple[int, int]], None]) -> None:
+        self._listeners.append(listener)
+
+    def set_version_source(self, source: Callable[[str], Any]) -> None:
+        self.version_source = source
+
+    def version(self, fiscal_year: str) -> Tuple[int, int]:
+        """In-process version for a fiscal year (global epoch, per-year counter)."""
+        return self._epoch, self._versions.get(fiscal_year, 0)
+
+    def bump(self, fiscal_year: Optional[str] = None, entity: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Invalidate a fiscal year (or everything when fiscal_year is None) after a
+        write to a cached entity (projects, summaries). `entity` names what changed
+        for change listeners.
+        """
+        with self._lock:
+            if fiscal_year is None:
+                self._epoch += 1
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                self._versions[fiscal_year] = self._versions.get(fiscal_year, 0) + 1
+                stale = [k for k, e in self._entries.items() if e.fiscal_year == fiscal_year]
+                for key in stale:
+                    del self._entries[key]
+                dropped = len(stale)
+            self.invalidations += dropped
+        return self.notify(fiscal_year, entity)
+
+    def notify(self, fiscal_year: Optional[str] = None, entity: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Tell change listeners about a write without invalidating anything; for
+        entities no cached response depends on (dropdowns, relationships, tableData).
+        """
+        version = self.version(fiscal_year) if fiscal_year else (self._epoch, 0)
+        for listener in self._listeners:
+            try:
+                listener(fiscal_year, entity, version)
+            except Exception as e:
+                print(f"Cache bump listener failed: {e}")
+        return version
+
+    def key_for(self, path: str, fiscal_year: str, query_string: str, shared_version: Any = None) -> Tuple:
+        return (path, fiscal_year, query_string, self.version(fiscal_year), shared_version)
+
+    def get(self, key: Tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, entry: CachedResponse) -> None:
+        with self._lock:
+            # A write may have landed while the response was being built
+            if key[3] != self.version(entry.fiscal_year):
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'bytes': sum(len(e.body) for e in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'notModified': self.not_modified,
+            }
+
+
+response_cache = ResponseCache(max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256")))
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware serving cacheable GETs from ResponseCache.
+    Only complete 200 JSON responses are stored; everything else passes through.
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'GET' or scope['path'] not in CACHEABLE_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        query_string = scope.get('query_string', b'').decode('latin-1')
+        fiscal_year = parse_qs(query_string).get('fiscalYear', [DEFAULT_FISCAL_YEAR])[0]
+        shared_version = None
+        if self.cache.version_source is not None:
+            # Read before the endpoint runs, so an entry is never older than its key
+            try:
+                shared_version = await run_in_threadpool(self.cache.version_source, fiscal_year)
+            except Exception as e:
+                print(f"Response cache version check failed: {e}")
+                await self.app(scope, receive, send)
+                return
+        key = self.cache.key_for(scope['path'], fiscal_year, query_string, shared_version)
+        if_none_match = None
+        for name, value in scope.get('headers', []):
+            if name == b'if-none-match':
+                if_none_match = value.decode('latin-1')
+                break
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            await self._send_entry(send, entry, if_none_match)
+            return
+
+        captured = {'status': None, 'headers': None, 'chunks': [], 'complete': False}
+
+        async def capture(message):
+            if message['type'] == 'http.response.start':
+                captured['status'] = message['status']
+                captured['headers'] = message.get('headers', [])
+                return
+            if message['type'] == 'http.response.body':
+                captured['chunks'].append(message.get('body', b''))
+                if message.get('more_body', False):
+                    return
+                captured['complete'] = True
+
+        await self.app(scope, receive, capture)
+
+        body = b''.join(captured['chunks'])
+        headers = captured['headers'] or []
+        media_type = 'application/json'
+        for name, value in headers:
+            if name == b'content-type':
+                media_type = value.decode('latin-1')
+
+        if captured['status'] == 200 and captured['complete'] and media_type.startswith('application/json'):
+            stored = [(name, value) for name, value in headers if name in STORED_HEADERS]
+            entry = CachedResponse(body, make_etag(body), media_type, fiscal_year, stored)
+            self.cache.put(key, entry)
+            await self._send_entry(send, entry, if_none_match)
+            return
+
+        await send({'type': 'http.response.start', 'status': captured['status'] or 500, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _send_entry(self, send, entry: CachedResponse, if_none_match: Optional[str]):
+        headers = [
+            (b'etag', entry.etag.encode('latin-1')),
+            (b'cache-control', b'no-cache'),
+            *entry.headers,
+        ]
+        if etag_matches(if_none_match, entry.etag):
+            self.cache.not_modified += 1
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        headers += [
+            (b'content-type', entry.media_type.encode('latin-1')),
+            (b'content-length', str(len(entry.body)).encode('latin-1')),
+        ]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': entry.body})
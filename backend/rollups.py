@@ -0,0 +1,271 @@
+"""
+Commissioning calculation chain and materialized rollups.
+
+Aggregation order: Project -> Section -> Category -> Solar/Wind -> Overall.
+Rollups are stored in commissioning_summaries (rows with a non-NULL `level`)
+for the Plan, Rephase, Actual, PPA, Merchant and Group metrics. Bulk writes
+rebuild a fiscal year; single-row writes apply a delta to the affected
+ancestors only, so summary reads never have to aggregate projects.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fiscal import CUMM_MONTHS, CUMM_TILL_MONTH, MONTH_KEYS, PREFIX_COLUMNS, QUARTER_MONTHS
+
+# Section label -> included in Solar/Wind/Overall totals
+SECTION_INCLUSION_MAP = {
+    'A. Khavda Solar Projects': True,
+    'B. Rajasthan Solar Projects': True,
+    'C. Rajasthan Solar Additional 500MW': True,
+    'A. Khavda Wind Projects': True,
+    'C. Mundra Wind 76MW': True,
+    'D1. Khavda Solar Copper + Merchant 50MW': False,
+    'D2. Khavda Solar Internal 650MW': False,
+    'B. Khavda Wind Internal 421MW': False,
+    'D. Mundra Wind Internal 224.4MW': False,
+}
+
+ROLLUP_LEVELS = ('section', 'category', 'technology', 'overall')
+BUSINESS_MODELS = ('PPA', 'Merchant', 'Group')
+
+# Numeric columns carried by every summary row
+SUMMARY_VALUE_COLUMNS = MONTH_KEYS + ['total', 'cumm_till_oct', 'q1', 'q2', 'q3', 'q4']
+
+
+def is_section_included_in_totals(section: str) -> bool:
+    """Whether a section label counts towards the Solar/Wind/Overall totals."""
+    if section in SECTION_INCLUSION_MAP:
+        return SECTION_INCLUSION_MAP[section]
+    # Internal / copper sections are tracked separately
+    lowered = (section or '').lower()
+    return 'internal' not in lowered and 'copper' not in lowered
+
+
+def calculate_derived_values(
+    monthly_dict: Dict[str, Any],
+    capacity: Optional[float] = None,
+    plan_actual: Optional[str] = None,
+    cumm_till: str = CUMM_TILL_MONTH
+) -> Dict[str, float]:
+    """
+    Deterministic derived values from the monthly values.
+    PLAN/REPHASE: totalCapacity = Capacity. ACTUAL (or no type): totalCapacity = sum(Apr..Mar).
+    Cumulative and quarterly figures always come from the monthly values.
+    """
+    values = [monthly_dict.get(m) or 0 for m in MONTH_KEYS]
+    monthly_sum = sum(values)
+
+    if plan_actual in ('Plan', 'Rephase') and capacity is not None:
+        total_capacity = capacity or 0
+    else:
+        total_capacity = monthly_sum
+
+    cutoff = MONTH_KEYS.index(cumm_till) + 1
+    derived = {
+        'totalCapacity': total_capacity,
+        'cummTillOct': sum(values[:cutoff]),
+    }
+    for quarter, months in QUARTER_MONTHS.items():
+        derived[quarter] = sum(monthly_dict.get(m) or 0 for m in months)
+    return derived
+
+
+def _aggregate_projects_summary(
+    projects: List[Dict[str, Any]],
+    summary_type: str,
+    category: Optional[str]
+) -> Dict[str, Any]:
+    """
+    Sum projects (each with 'month_values' and 'derived') into one summary row.
+    """
+    summary = {'category': category, 'summaryType': summary_type}
+    for m in MONTH_KEYS:
+        summary[m] = sum(p['month_values'].get(m) or 0 for p in projects)
+    summary['total'] = sum(p['derived'].get('totalCapacity') or 0 for p in projects)
+    summary['cummTillOct'] = sum(p['derived'].get('cummTillOct') or 0 for p in projects)
+    for q in QUARTER_MONTHS:
+        summary[q] = sum(p['derived'].get(q) or 0 for p in projects)
+    return summary
+
+
+def technology_of(category: Optional[str]) -> Optional[str]:
+    lowered = (category or '').lower()
+    if 'solar' in lowered:
+        return 'Solar'
+    if 'wind' in lowered:
+        return 'Wind'
+    return None
+
+
+def _metrics_for(row: Dict[str, Any]) -> List[str]:
+    """Summary metrics a project row contributes to (never mixes capacity types)."""
+    plan_actual = row.get('plan_actual')
+    metrics = []
+    if plan_actual in ('Plan', 'Rephase', 'Actual'):
+        metrics.append(plan_actual)
+    if plan_actual == 'Plan' and row.get('project_type') in BUSINESS_MODELS:
+        metrics.append(row['project_type'])
+    return metrics
+
+
+def _rollup_keys(row: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """(level, summary_type, section) ancestors of a project row."""
+    category = row.get('category') or ''
+    keys = [
+        ('section', category, row.get('section') or ''),
+        ('category', category, ''),
+    ]
+    # Excluded sections keep their own subtotals but never reach Solar/Wind/Overall
+    if row.get('included_in_total') in (None, True, 1, '1'):
+        technology = technology_of(category)
+        if technology:
+            keys.append(('technology', technology, ''))
+        keys.append(('overall', 'Overall', ''))
+    return keys
+
+
+def _row_vector(row: Dict[str, Any]) -> List[float]:
+    derived = calculate_derived_values(row, row.get('capacity'), row.get('plan_actual'))
+    return (
+        [row.get(m) or 0 for m in MONTH_KEYS]
+        + [derived['totalCapacity'], derived['cummTillOct']]
+        + [derived[q] for q in QUARTER_MONTHS]
+    )
+
+
+def project_contributions(row: Dict[str, Any]) -> Dict[Tuple[str, str, str, str], List[float]]:
+    """Map of (level, summary_type, section, metric) -> value vector for one project row."""
+    vector = _row_vector(row)
+    return {
+        (level, summary_type, section, metric): vector
+        for metric in _metrics_for(row)
+        for level, summary_type, section in _rollup_keys(row)
+    }
+
+
+def _merge(target: Dict, contributions: Dict, sign: float = 1.0) -> None:
+    for key, vector in contributions.items():
+        acc = target.setdefault(key, [0.0] * len(SUMMARY_VALUE_COLUMNS))
+        for i, v in enumerate(vector):
+            acc[i] += sign * v
+
+
+def _fetch_project_rows(cursor, where: str, params: Iterable[Any]) -> List[Dict[str, Any]]:
+    cursor.execute(f'SELECT * FROM commissioning_projects WHERE {where}', tuple(params))
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, r)) for r in cursor.fetchall()]
+
+
+def fetch_project_row(cursor, project_id: int) -> Optional[Dict[str, Any]]:
+    rows = _fetch_project_rows(cursor, 'id = ?', (project_id,))
+    return rows[0] if rows else None
+
+
+def rebuild_rollups(cursor, fiscal_year: str) -> int:
+    """Recompute every rollup row (and the per-row prefix sums) of a fiscal year. Used after bulk writes."""
+    refresh_prefix_sums(cursor, 'fiscal_year = ? AND is_deleted = 0', (fiscal_year,))
+    totals: Dict[Tuple[str, str, str, str], List[float]] = {}
+    for row in _fetch_project_rows(cursor, 'fiscal_year = ? AND is_deleted = 0', (fiscal_year,)):
+        _merge(totals, project_contributions(row))
+
+    cursor.execute(
+        'DELETE FROM commissioning_summaries WHERE fiscal_year = ? AND level IS NOT NULL',
+        (fiscal_year,)
+    )
+    columns = ', '.join(SUMMARY_VALUE_COLUMNS)
+    marks = ', '.join('?' for _ in SUMMARY_VALUE_COLUMNS)
+    for (level, summary_type, section, metric), vector in totals.items():
+        cursor.execute(f'''
+            INSERT INTO commissioning_summaries (fiscal_year, level, summary_type, section, category, {columns})
+            VALUES (?, ?, ?, ?, ?, {marks})
+        ''', (fiscal_year, level, summary_type, section, metric, *vector))
+    return len(totals)
+
+
+def apply_project_change(
+    cursor,
+    fiscal_year: str,
+    old_row: Optional[Dict[str, Any]],
+    new_row: Optional[Dict[str, Any]]
+) -> int:
+    """
+    Incrementally maintain rollups for one project write: subtract the old
+    row's contributions, add the new row's. Only the affected ancestors
+    (at most 4 levels x 2 metrics per side) are touched.
+    """
+    if new_row and new_row.get('id') is not None:
+        refresh_prefix_sums(cursor, 'id = ?', (new_row['id'],))
+
+    delta: Dict[Tuple[str, str, str, str], List[float]] = {}
+    if old_row and not old_row.get('is_deleted'):
+        _merge(delta, project_contributions(old_row), -1.0)
+    if new_row and not new_row.get('is_deleted'):
+        _merge(delta, project_contributions(new_row))
+
+    set_clause = ', '.join(f'{c} = COALESCE({c}, 0) + ?' for c in SUMMARY_VALUE_COLUMNS)
+    columns = ', '.join(SUMMARY_VALUE_COLUMNS)
+    marks = ', '.join('?' for _ in SUMMARY_VALUE_COLUMNS)
+    for (level, summary_type, section, metric), vector in delta.items():
+        cursor.execute(f'''
+            UPDATE commissioning_summaries
+            SET {set_clause}, updated_at = CURRENT_TIMESTAMP
+            WHERE fiscal_year = ? AND level = ? AND summary_type = ? AND section = ? AND category = ?
+        ''', (*vector, fiscal_year, level, summary_type, section, metric))
+        if cursor.rowcount == 0:
+            cursor.execute(f'''
+                INSERT INTO commissioning_summaries (fiscal_year, level, summary_type, section, category, {columns})
+                VALUES (?, ?, ?, ?, ?, {marks})
+            ''', (fiscal_year, level, summary_type, section, metric, *vector))
+    return len(delta)
+
+
+def refresh_derived_columns(cursor, fiscal_year: str, ids: Optional[List[int]] = None) -> None:
+    """
+    Recompute total_capacity, cumm_till_oct and q1-q4 in place from the
+    monthly columns, for the live rows of a fiscal year or only rows `ids`.
+    """
+    if ids is not None and not ids:
+        return
+    id_filter = f" AND id IN ({', '.join('?' for _ in ids)})" if ids is not None else ''
+    month_sum = ' + '.join(f'COALESCE({m}, 0)' for m in MONTH_KEYS)
+    cumm = ' + '.join(f'COALESCE({m}, 0)' for m in CUMM_MONTHS)
+    quarters = ', '.join(
+        f"{q} = {' + '.join(f'COALESCE({m}, 0)' for m in months)}"
+        for q, months in QUARTER_MONTHS.items()
+    )
+    cursor.execute(f'''
+        UPDATE commissioning_projects
+        SET total_capacity = CASE WHEN plan_actual IN ('Plan', 'Rephase') THEN COALESCE(capacity, 0)
+                                  ELSE {month_sum} END,
+            cumm_till_oct = {cumm},
+            {quarters}
+        WHERE fiscal_year = ? AND is_deleted = 0{id_filter}
+    ''', (fiscal_year, *(ids or ())))
+
+
+def refresh_prefix_sums(cursor, where: str, params: Iterable[Any]) -> None:
+    """Recompute the stored cumm_<month> prefix sums for the rows matching `where`."""
+    assignments = ', '.join(
+        f"{column} = {' + '.join(f'COALESCE({m}, 0)' for m in MONTH_KEYS[:i + 1])}"
+        for i, column in enumerate(PREFIX_COLUMNS.values())
+    )
+    cursor.execute(f'UPDATE commissioning_projects SET {assignments} WHERE {where}', tuple(params))
+
+
+def backfill_rollups(cursor) -> List[str]:
+    """
+    Build rollups for fiscal years that have projects but no rollup rows yet,
+    and fill prefix sums for rows written before those columns existed.
+    """
+    refresh_prefix_sums(cursor, f"{PREFIX_COLUMNS['mar']} IS NULL", ())
+    cursor.execute('''
+        SELECT DISTINCT fiscal_year FROM commissioning_projects p
+        WHERE is_deleted = 0 AND NOT EXISTS (
+            SELECT 1 FROM commissioning_summaries s
+            WHERE s.fiscal_year = p.fiscal_year AND s.level IS NOT NULL
+        )
+    ''')
+    fiscal_years = [r[0] for r in cursor.fetchall()]
+    for fiscal_year in fiscal_years:
+        rebuild_rollups(cursor, fiscal_year)
+    return fiscal_years
@@ -33,6 +33,16 @@ class UserResponse(BaseModel):
 class LoginResponse(BaseModel):
     user: UserResponse
     access_token: str
+    refresh_token: Optional[str] = None
+    token_type: str = "bearer"
+
+# For /token/refresh and /logout
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
     token_type: str = "bearer"
 
 
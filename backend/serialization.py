@@ -0,0 +1,60 @@
+"""
+Fast JSON serialization for the large read endpoints.
+
+Handlers that return FastJSONResponse(...) directly skip FastAPI's
+jsonable_encoder walk; the body is produced by orjson when it is installed
+and by the stdlib encoder (same output options as JSONResponse) otherwise.
+"""
+
+import json
+from typing import Any, Iterable
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def dumps(content: Any, sort_keys: bool = False) -> bytes:
+    """Serialize plain Python data (dicts, lists, str, numbers, None) to JSON bytes."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(content, option=option)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+        sort_keys=sort_keys
+    ).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fastest available encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def raw_json_response(parts: Iterable[bytes], status_code: int = 200) -> Response:
+    """
+    Response assembled from already-serialized JSON fragments (e.g. a stored
+    JSON blob spliced into an envelope) without decoding them first.
+    """
+    return Response(content=b''.join(parts), status_code=status_code, media_type='application/json')
+
+
+def as_json_text(value: Any) -> bytes:
+    """A stored JSON column as bytes, ready to be spliced into a response."""
+    if value is None:
+        return b'null'
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
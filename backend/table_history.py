@@ -0,0 +1,229 @@
+"""
+Cold storage and retention for the master table's row history.
+
+Current rows in table_data_rows stay plain JSON text, so reads can splice
+them into responses. Once a save replaces a row, its old state is only read
+for restores and the backup viewer. Compaction works on those history rows
+(valid_to IS NOT NULL):
+
+1. Versions outside the retention policy are pruned. The policy keeps the
+   last N versions, the last version of each recent day and the last version
+   of each month. History rows that no kept version needs are then deleted.
+2. The remaining history rows are compressed behind a 3-byte format marker:
+   zlib, or zstd when the zstandard package is installed. Both use a preset
+   dictionary of the table's field names and common values, which is where
+   most of a ~200 byte row's redundancy lies. SQLite keeps the compressed
+   bytes in the TEXT column as a BLOB.
+
+decode_row() turns either form back into JSON text, so readers do not need
+to know which one a row is in.
+"""
+
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple, Union
+
+from maintenance import PeriodicJob
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+KEEP_LAST_VERSIONS = int(os.getenv("TABLE_DATA_KEEP_VERSIONS", "20"))
+KEEP_DAILY_DAYS = int(os.getenv("TABLE_DATA_KEEP_DAYS", "30"))
+KEEP_MONTHLY_MONTHS = int(os.getenv("TABLE_DATA_KEEP_MONTHS", "24"))
+COMPACTION_INTERVAL_HOURS = float(os.getenv("TABLE_DATA_COMPACTION_HOURS", "6"))
+
+ZLIB_MARKER = b'ZL1'
+ZSTD_MARKER = b'ZS1'
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 19
+
+# Preset dictionary: master table field names and frequent values. Changing it
+# makes existing compressed rows unreadable - add a new marker instead.
+PRESET_DICTIONARY = (
+    b'{"capacity":null,"connectivity":"CTU","group":"AGEL","id":,"location":"Khavda",'
+    b'"locationCode":"Khavda","ppaMerchant":"PPA","pss":"PSS-0","sno":,"solar":null,'
+    b'"spv":"","type":"Solar","wind":null}"Merchant","Wind","Hybrid","STU","RJ","Others",'
+    b'"PSS - 0",0.0,'
+)
+
+_zstd_dictionary = (
+    zstandard.ZstdCompressionDict(PRESET_DICTIONARY, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+    if zstandard is not None else None
+)
+
+CODEC = 'zstd' if zstandard is not None else 'zlib'
+
+
+def encode_cold(text: str) -> Union[str, bytes]:
+    """Compressed form of a history row, or the text itself when that is not smaller."""
+    raw = text.encode('utf-8')
+    if zstandard is not None:
+        packed = ZSTD_MARKER + zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL, dict_data=_zstd_dictionary
+        ).compress(raw)
+    else:
+        compressor = zlib.compressobj(ZLIB_LEVEL, zdict=PRESET_DICTIONARY)
+        packed = ZLIB_MARKER + compressor.compress(raw) + compressor.flush()
+    return packed if len(packed) < len(raw) else text
+
+
+def decode_row(value: Union[str, bytes]) -> str:
+    """Stored row (plain text or marker + compressed bytes) as JSON text."""
+    if isinstance(value, str):
+        return value
+    marker, payload = bytes(value[:3]), value[3:]
+    if marker == ZLIB_MARKER:
+        decompressor = zlib.decompressobj(zdict=PRESET_DICTIONARY)
+        return (decompressor.decompress(payload) + decompressor.flush()).decode('utf-8')
+    if marker == ZSTD_MARKER:
+        if zstandard is None:
+            raise RuntimeError("Row was stored with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor(dict_data=_zstd_dictionary).decompress(payload).decode('utf-8')
+    return bytes(value).decode('utf-8')
+
+
+class RetentionPolicy:
+    """Which table versions compaction keeps."""
+
+    def __init__(
+        self,
+        keep_last: int = KEEP_LAST_VERSIONS,
+        keep_days: int = KEEP_DAILY_DAYS,
+        keep_months: int = KEEP_MONTHLY_MONTHS
+    ):
+        self.keep_last = keep_last
+        self.keep_days = keep_days
+        self.keep_months = keep_months
+
+    def kept(self, versions: Iterable[Tuple[int, Optional[str]]], now: datetime) -> Set[int]:
+        """
+        From (version, created_at) pairs: the newest `keep_last` versions, the
+        last version of each of the past `keep_days` days and of each of the
+        past `keep_months` months. The newest version is always kept.
+        """
+        ordered = sorted(versions, key=lambda v: v[0], reverse=True)
+        kept = {v for v, _ in ordered[:max(self.keep_last, 1)]}
+        first_day = (now - timedelta(days=self.keep_days)).strftime('%Y-%m-%d')
+        month_index = now.year * 12 + now.month - 1 - self.keep_months
+        first_month = f'{month_index // 12:04d}-{month_index % 12 + 1:02d}'
+        seen_days, seen_months = set(), set()
+        for version, created_at in ordered:
+            if not created_at:
+                continue
+            day, month = created_at[:10], created_at[:7]
+            if day not in seen_days:
+                seen_days.add(day)
+                if day > first_day:
+                    kept.add(version)
+            if month not in seen_months:
+                seen_months.add(month)
+                if month > first_month:
+                    kept.add(version)
+        return kept
+
+
+def storage_stats(cursor) -> Dict[str, int]:
+    """Database size and how much of it is current vs. history rows."""
+    cursor.execute('PRAGMA page_size')
+    page_size = cursor.fetchone()[0]
+    cursor.execute('PRAGMA page_count')
+    page_count = cursor.fetchone()[0]
+    cursor.execute('PRAGMA freelist_count')
+    free_pages = cursor.fetchone()[0]
+    cursor.execute('''
+        SELECT valid_to IS NULL, COUNT(*), COALESCE(SUM(LENGTH(data)), 0)
+        FROM table_data_rows GROUP BY valid_to IS NULL
+    ''')
+    split = {bool(r[0]): (r[1], r[2]) for r in cursor.fetchall()}
+    current, history = split.get(True, (0, 0)), split.get(False, (0, 0))
+    return {
+        'dbBytes': page_count * page_size,
+        'freeBytes': free_pages * page_size,
+        'currentRows': current[0],
+        'currentBytes': current[1],
+        'historyRows': history[0],
+        'historyBytes': history[1],
+    }
+
+
+def drop_unneeded_history(cursor, fiscal_year: str) -> int:
+    """Delete history rows that no remaining version of the fiscal year needs."""
+    # A history row is needed while some remaining version lies in [valid_from, valid_to)
+    cursor.execute('''
+        DELETE FROM table_data_rows
+        WHERE fiscal_year = ? AND valid_to IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM table_data_versions v
+            WHERE v.fiscal_year = table_data_rows.fiscal_year
+              AND v.version >= table_data_rows.valid_from AND v.version < table_data_rows.valid_to
+        )
+    ''', (fiscal_year,))
+    return cursor.rowcount
+
+
+def compact_fiscal_year(cursor, fiscal_year: str, policy: RetentionPolicy, now: datetime) -> Dict[str, int]:
+    """Prune versions outside the policy, drop unneeded history rows, compress the rest."""
+    cursor.execute('SELECT version, created_at FROM table_data_versions WHERE fiscal_year = ?', (fiscal_year,))
+    versions = [(r[0], r[1]) for r in cursor.fetchall()]
+    kept = policy.kept(versions, now)
+    pruned = [v for v, _ in versions if v not in kept]
+    cursor.executemany(
+        'DELETE FROM table_data_versions WHERE fiscal_year = ? AND version = ?',
+        [(fiscal_year, v) for v in pruned]
+    )
+    deleted = drop_unneeded_history(cursor, fiscal_year)
+
+    cursor.execute('''
+        SELECT id, data FROM table_data_rows
+        WHERE fiscal_year = ? AND valid_to IS NOT NULL AND typeof(data) = 'text'
+    ''', (fiscal_year,))
+    updates = []
+    for row_id, data in cursor.fetchall():
+        packed = encode_cold(data)
+        if packed is not data:
+            updates.append((packed, row_id))
+    cursor.executemany('UPDATE table_data_rows SET data = ? WHERE id = ?', updates)
+    return {'prunedVersions': len(pruned), 'deletedRows': deleted, 'compressedRows': len(updates)}
+
+
+def run_compaction(
+    connect: Callable[[], Any],
+    policy: Optional[RetentionPolicy] = None,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Compact every fiscal year (one transaction each) and report the size change."""
+    policy = policy or RetentionPolicy()
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        before = storage_stats(cursor)
+        cursor.execute('SELECT DISTINCT fiscal_year FROM table_data_versions')
+        fiscal_years = [r[0] for r in cursor.fetchall()]
+        totals = {'prunedVersions': 0, 'deletedRows': 0, 'compressedRows': 0}
+        for fiscal_year in fiscal_years:
+            result = compact_fiscal_year(cursor, fiscal_year, policy, now)
+            conn.commit()
+            for key, value in result.items():
+                totals[key] += value
+        after = storage_stats(cursor)
+    finally:
+        conn.close()
+    return {
+        **totals,
+        'codec': CODEC,
+        'fiscalYears': len(fiscal_years),
+        'before': before,
+        'after': after,
+        'historyBytesSaved': before['historyBytes'] - after['historyBytes'],
+        'durationMs': round((time.perf_counter() - started) * 1000, 1),
+        'ranAt': now.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+history_compactor = PeriodicJob('table-history-compactor', run_compaction, COMPACTION_INTERVAL_HOURS)
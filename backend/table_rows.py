@@ -0,0 +1,448 @@
+"""
+Row-level, versioned storage for the master table (/table-data).
+
+A fiscal year's table used to be one JSON blob in table_data, rewritten on
+every save. Rows now live in table_data_rows, one record per row state:
+
+    valid_from  table version that wrote this state of the row
+    valid_to    version that replaced or removed it (NULL while current)
+
+table_data is kept as the per-year header holding the current version and
+the deleted flag. A save diffs the incoming rows against the current ones by
+row key (the row's "id") and writes only rows that were added, changed,
+moved or removed, so its cost follows the size of the edit, not the table.
+Version v of the table is every row with valid_from <= v < valid_to, i.e.
+history is rebuilt from the stored deltas instead of full copies.
+
+Rows are stored in a canonical encoding (sorted keys) so an unchanged row
+compares equal as text, and read back as JSON fragments that are spliced
+into responses without decoding. History rows may be compressed by
+table_history's compaction; readers go through decode_row().
+"""
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from serialization import dumps, loads
+from table_history import decode_row, drop_unneeded_history
+
+# Written by a save: (row_key, position, data)
+RowWrite = Tuple[str, float, str]
+
+# Rows per query when streaming a version
+STREAM_PAGE_SIZE = 1000
+
+# Version metadata returned by the backup listing
+VERSION_COLUMNS = ('fiscal_year', 'version', 'row_count', 'size_bytes', 'changed_rows', 'removed_rows', 'created_at')
+
+
+class VersionRemoved(Exception):
+    """The version being streamed was pruned or deleted before the stream finished."""
+
+
+def encode_row(row: Dict[str, Any]) -> str:
+    return dumps(row, sort_keys=True).decode('utf-8')
+
+
+def row_keys(rows: List[Dict[str, Any]]) -> List[str]:
+    """Stable key per row: its id, or its index when the id is missing or repeated."""
+    keys, seen = [], set()
+    for index, row in enumerate(rows):
+        row_id = row.get('id') if isinstance(row, dict) else None
+        key = str(row_id) if row_id is not None else None
+        if key is None or key in seen:
+            key = f'#{index}'
+        seen.add(key)
+        keys.append(key)
+    return keys
+
+
+def _current_rows(cursor, fiscal_year: str) -> Dict[str, Tuple[int, float, str]]:
+    """row_key -> (id, position, data) for the rows of the current version."""
+    cursor.execute('''
+        SELECT id, row_key, position, data FROM table_data_rows
+        WHERE fiscal_year = ? AND valid_to IS NULL
+    ''', (fiscal_year,))
+    return {r[1]: (r[0], r[2], r[3]) for r in cursor.fetchall()}
+
+
+def _kept_positions(positions: List[Optional[float]]) -> List[bool]:
+    """
+    Which existing rows can keep their stored position: the longest run of
+    them that is already in increasing order. Everything else is moved.
+    """
+    tails: List[float] = []
+    tail_at: List[int] = []
+    previous: List[int] = [-1] * len(positions)
+    for i, position in enumerate(positions):
+        if position is None:
+            continue
+        j = bisect_left(tails, position)
+        previous[i] = tail_at[j - 1] if j else -1
+        if j == len(tails):
+            tails.append(position)
+            tail_at.append(i)
+        else:
+            tails[j] = position
+            tail_at[j] = i
+    kept = [False] * len(positions)
+    i = tail_at[-1] if tail_at else -1
+    while i >= 0:
+        kept[i] = True
+        i = previous[i]
+    return kept
+
+
+def _assign_positions(existing: List[Optional[float]]) -> Optional[List[float]]:
+    """
+    Positions for the incoming row order. Rows that keep their place reuse the
+    stored position; new or moved rows get one between their neighbours.
+    Returns None when a gap is exhausted and the table has to be renumbered.
+    """
+    kept = _kept_positions(existing)
+    positions: List[Optional[float]] = [p if k else None for p, k in zip(existing, kept)]
+    next_kept: List[Optional[float]] = [None] * len(positions)
+    upcoming = None
+    for i in range(len(positions) - 1, -1, -1):
+        next_kept[i] = upcoming
+        if positions[i] is not None:
+            upcoming = positions[i]
+    before = None
+    for i, position in enumerate(positions):
+        if position is None:
+            after = next_kept[i]
+            if before is None:
+                position = after - 1 if after is not None else 0.0
+            elif after is None:
+                position = before + 1
+            else:
+                position = (before + after) / 2
+                if not before < position < after:
+                    return None
+            positions[i] = position
+        before = position
+    return positions
+
+
+def _next_version(cursor, fiscal_year: str) -> int:
+    """Bump (or create) the fiscal year's header and return the new version."""
+    cursor.execute('SELECT id, version FROM table_data WHERE fiscal_year = ? ORDER BY version DESC', (fiscal_year,))
+    header = cursor.fetchone()
+    if header is None:
+        cursor.execute('''
+            INSERT INTO table_data (fiscal_year, data, version, is_deleted, row_storage)
+            VALUES (?, '[]', 1, 0, 1)
+        ''', (fiscal_year,))
+        return 1
+    version = (header[1] or 0) + 1
+    cursor.execute('''
+        UPDATE table_data
+        SET version = ?, is_deleted = 0, row_storage = 1, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (version, header[0]))
+    return version
+
+
+def _record_version(cursor, fiscal_year: str, version: int, changed: int, removed: int) -> int:
+    cursor.execute('''
+        SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM table_data_rows
+        WHERE fiscal_year = ? AND valid_to IS NULL
+    ''', (fiscal_year,))
+    row_count, size = cursor.fetchone()
+    cursor.execute('''
+        INSERT INTO table_data_versions (fiscal_year, version, row_count, size_bytes, changed_rows, removed_rows)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (fiscal_year, version, row_count, size, changed, removed))
+    return row_count
+
+
+def _apply_delta(
+    cursor,
+    fiscal_year: str,
+    writes: List[RowWrite],
+    closed_ids: List[int],
+    removed: int
+) -> Dict[str, Any]:
+    """Write one new version: close replaced/removed rows and insert the new states."""
+    if not writes and not closed_ids:
+        return {'version': current_version(cursor, fiscal_year), 'changed': 0, 'removed': 0, 'saved': False}
+    version = _next_version(cursor, fiscal_year)
+    cursor.executemany(
+        'UPDATE table_data_rows SET valid_to = ? WHERE id = ?', [(version, row_id) for row_id in closed_ids]
+    )
+    cursor.executemany('''
+        INSERT INTO table_data_rows (fiscal_year, row_key, position, data, valid_from)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(fiscal_year, key, position, data, version) for key, position, data in writes])
+    row_count = _record_version(cursor, fiscal_year, version, len(writes), removed)
+    return {'version': version, 'changed': len(writes), 'removed': removed, 'rows': row_count, 'saved': True}
+
+
+def save_rows(cursor, fiscal_year: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Make `rows` (the full table, in order) current, writing only what differs."""
+    current = _current_rows(cursor, fiscal_year)
+    keys = row_keys(rows)
+    encoded = [encode_row(row) for row in rows]
+    matched = [current.pop(key, None) for key in keys]
+
+    positions = _assign_positions([m[1] if m is not None else None for m in matched])
+    if positions is None:
+        # Gaps used up by repeated inserts at one spot: renumber every row once
+        positions = [float(i) for i in range(len(rows))]
+
+    writes: List[RowWrite] = []
+    closed_ids = []
+    for key, position, data, existing in zip(keys, positions, encoded, matched):
+        if existing is not None:
+            if existing[1] == position and existing[2] == data:
+                continue
+            closed_ids.append(existing[0])
+        writes.append((key, position, data))
+    closed_ids += [row_id for row_id, _, _ in current.values()]
+    return _apply_delta(cursor, fiscal_year, writes, closed_ids, len(current))
+
+
+def apply_changes(
+    cursor,
+    fiscal_year: str,
+    upsert: Iterable[Dict[str, Any]] = (),
+    delete: Iterable[Any] = ()
+) -> Dict[str, Any]:
+    """
+    Apply only the rows the client edited: `upsert` rows (matched by "id";
+    new ids are appended to the end of the table) and the ids in `delete`.
+    """
+    current = _current_rows(cursor, fiscal_year)
+    end = max((position for _, position, _ in current.values()), default=-1.0) + 1
+
+    changed: Dict[str, Dict[str, Any]] = {}
+    for row in upsert:
+        if not isinstance(row, dict) or row.get('id') is None:
+            raise ValueError("Every upserted row needs an id")
+        changed[str(row['id'])] = row
+
+    writes: List[RowWrite] = []
+    closed_ids = []
+    for key, row in changed.items():
+        data = encode_row(row)
+        existing = current.get(key)
+        if existing is None:
+            writes.append((key, end, data))
+            end += 1
+        elif existing[2] != data:
+            closed_ids.append(existing[0])
+            writes.append((key, existing[1], data))
+
+    removed = 0
+    for row_id in delete:
+        key = str(row_id)
+        existing = current.get(key)
+        if existing is not None and key not in changed:
+            closed_ids.append(existing[0])
+            removed += 1
+    return _apply_delta(cursor, fiscal_year, writes, closed_ids, removed)
+
+
+def close_rows(cursor, fiscal_year: str) -> int:
+    """
+    Remove every current row as of the header's (already bumped) version; used
+    when the fiscal year's table is deleted so the history still shows it.
+    """
+    version = current_version(cursor, fiscal_year)
+    cursor.execute('''
+        UPDATE table_data_rows SET valid_to = ?
+        WHERE fiscal_year = ? AND valid_to IS NULL
+    ''', (version, fiscal_year))
+    removed = cursor.rowcount
+    _record_version(cursor, fiscal_year, version, 0, removed)
+    return removed
+
+
+def purge_rows(cursor, fiscal_year: str) -> None:
+    """Drop all stored row history of a fiscal year (its header was hard-deleted)."""
+    cursor.execute('DELETE FROM table_data_rows WHERE fiscal_year = ?', (fiscal_year,))
+    cursor.execute('DELETE FROM table_data_versions WHERE fiscal_year = ?', (fiscal_year,))
+
+
+def delete_version(cursor, fiscal_year: str, version: int) -> int:
+    """
+    Drop one stored version and the history rows only it needed. Rows shared
+    with other versions, and the current rows, stay. Returns the rows deleted.
+    """
+    cursor.execute(
+        'DELETE FROM table_data_versions WHERE fiscal_year = ? AND version = ?', (fiscal_year, version)
+    )
+    return drop_unneeded_history(cursor, fiscal_year)
+
+
+def current_version(cursor, fiscal_year: str) -> int:
+    cursor.execute('SELECT MAX(version) FROM table_data WHERE fiscal_year = ?', (fiscal_year,))
+    row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else 0
+
+
+def load_rows(cursor, fiscal_year: str, version: Optional[int] = None) -> List[str]:
+    """
+    Encoded rows of the current table, or of `version` rebuilt from the row
+    history. Returned as JSON text so callers can splice them into a response.
+    """
+    if version is None:
+        cursor.execute('''
+            SELECT data FROM table_data_rows
+            WHERE fiscal_year = ? AND valid_to IS NULL
+            ORDER BY position
+        ''', (fiscal_year,))
+    else:
+        cursor.execute('''
+            SELECT data FROM table_data_rows
+            WHERE fiscal_year = ? AND valid_from <= ? AND (valid_to IS NULL OR valid_to > ?)
+            ORDER BY position
+        ''', (fiscal_year, version, version))
+    return [decode_row(r[0]) for r in cursor.fetchall()]
+
+
+def version_exists(cursor, fiscal_year: str, version: int) -> bool:
+    cursor.execute(
+        'SELECT 1 FROM table_data_versions WHERE fiscal_year = ? AND version = ?', (fiscal_year, version)
+    )
+    return cursor.fetchone() is not None
+
+
+def rows_json(rows: List[str]) -> bytes:
+    """Encoded rows as one JSON array."""
+    return b'[' + ','.join(rows).encode('utf-8') + b']'
+
+
+def list_versions(
+    cursor,
+    fiscal_year: str,
+    limit: int = 50,
+    before: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Metadata of a fiscal year's stored versions, newest first, without
+    touching row data. Returns the page and the `before` value for the next
+    page (None on the last one).
+    """
+    cursor.execute(f'''
+        SELECT {", ".join(VERSION_COLUMNS)} FROM table_data_versions
+        WHERE fiscal_year = ? AND version < ?
+        ORDER BY version DESC
+        LIMIT ?
+    ''', (fiscal_year, before if before is not None else 2 ** 62, limit + 1))
+    rows = [dict(zip(VERSION_COLUMNS, r)) for r in cursor.fetchall()]
+    next_before = rows[limit - 1]['version'] if len(rows) > limit else None
+    return rows[:limit], next_before
+
+
+def stream_version(
+    connect: Callable[[], Any],
+    fiscal_year: str,
+    version: int,
+    page_size: int = STREAM_PAGE_SIZE
+) -> Iterator[bytes]:
+    """
+    One version's rows as a JSON array, produced a page at a time straight
+    from the stored row text.
+
+    Each page uses its own short-lived connection: a streamed body is pulled
+    from different threadpool threads, and a read transaction held for the
+    whole download would block writers. Saves never change a stored version;
+    they only add rows with a higher valid_from and set valid_to above it.
+    Retention compaction and backup deletion do remove versions and their
+    rows, though. So before the closing bracket the version is checked again.
+    If it is gone, VersionRemoved is raised and the response is cut off
+    instead of ending as a truncated or mixed array that looks complete.
+    """
+    yield b'['
+    after = None
+    first = True
+    while True:
+        conn = connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT position, data FROM table_data_rows
+                WHERE fiscal_year = ? AND valid_from <= ? AND (valid_to IS NULL OR valid_to > ?)
+                  AND position > ?
+                ORDER BY position
+                LIMIT ?
+            ''', (fiscal_year, version, version, after if after is not None else float('-inf'), page_size))
+            page = cursor.fetchall()
+            last = len(page) < page_size
+            # Rows of a version are only deleted together with its metadata row
+            if last and not version_exists(cursor, fiscal_year, version):
+                raise VersionRemoved(f"Version {version} of {fiscal_year} was removed while streaming")
+        finally:
+            conn.close()
+        if page:
+            chunk = ','.join(decode_row(r[1]) for r in page).encode('utf-8')
+            yield chunk if first else b',' + chunk
+            first = False
+            after = page[-1][0]
+        if last:
+            break
+    yield b']'
+
+
+def backfill_version_sizes(cursor) -> int:
+    """Fill size_bytes for versions recorded before it was tracked."""
+    cursor.execute('''
+        UPDATE table_data_versions SET size_bytes = (
+            SELECT COALESCE(SUM(LENGTH(r.data)), 0) FROM table_data_rows r
+            WHERE r.fiscal_year = table_data_versions.fiscal_year
+              AND r.valid_from <= table_data_versions.version
+              AND (r.valid_to IS NULL OR r.valid_to > table_data_versions.version)
+        )
+        WHERE size_bytes IS NULL
+    ''')
+    return cursor.rowcount
+
+
+def migrate_blobs(cursor) -> int:
+    """
+    Split table_data blobs written before row storage into table_data_rows
+    (as the header's current version) and empty the blob, then fill missing
+    version sizes. A blob that is not a JSON list is logged and left as it
+    is. Returns the number of fiscal years migrated.
+    """
+    cursor.execute('''
+        SELECT id, fiscal_year, data, version, is_deleted FROM table_data
+        WHERE NOT row_storage ORDER BY fiscal_year, version
+    ''')
+    headers = [tuple(r) for r in cursor.fetchall()]
+    migrated = 0
+    for header_id, fiscal_year, data, version, is_deleted in headers:
+        try:
+            rows = loads(data) if data else []
+        except ValueError as e:
+            print(f"Skipping table_data blob for {fiscal_year}: not valid JSON ({e})")
+            continue
+        if not isinstance(rows, list):
+            print(f"Skipping table_data blob for {fiscal_year}: expected a list, got {type(rows).__name__}")
+            continue
+        version = version or 1
+        keys = row_keys(rows)
+        cursor.executemany('''
+            INSERT INTO table_data_rows (fiscal_year, row_key, position, data, valid_from)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(fiscal_year, key, float(i), encode_row(row), version)
+              for i, (key, row) in enumerate(zip(keys, rows))])
+        cursor.execute(
+            'SELECT 1 FROM table_data_versions WHERE fiscal_year = ? AND version = ?', (fiscal_year, version)
+        )
+        if cursor.fetchone() is None:
+            cursor.execute('''
+                INSERT INTO table_data_versions (fiscal_year, version, row_count, changed_rows, removed_rows)
+                VALUES (?, ?, ?, ?, 0)
+            ''', (fiscal_year, version, len(rows), len(rows)))
+        cursor.execute('''
+            UPDATE table_data SET data = '[]', version = ?, row_storage = 1 WHERE id = ?
+        ''', (version, header_id))
+        if is_deleted:
+            # Keep the deleted table's last contents as history, then remove them
+            cursor.execute('UPDATE table_data SET version = version + 1 WHERE id = ?', (header_id,))
+            close_rows(cursor, fiscal_year)
+        migrated += 1
+    backfill_version_sizes(cursor)
+    return migrated
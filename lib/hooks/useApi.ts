@@ -1,6 +1,106 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { useState, useEffect, useCallback } from 'react';
 
+// Column-oriented /commissioning-projects payload (format=columnar)
+export interface ColumnarProjects {
+  format: 'columnar';
+  count: number;
+  columns: Record<string, any[] | { dictionary: string[]; indices: (number | null)[] }>;
+  nextCursor: string | null;
+}
+
+// Expand a columnar payload back into row objects for components that need them
+export function columnarToRows(payload: ColumnarProjects): Record<string, any>[] {
+  const decoded = Object.entries(payload.columns).map(([field, column]) => [
+    field,
+    Array.isArray(column) ? column : column.indices.map((i) => (i === null ? null : column.dictionary[i])),
+  ] as const);
+  const rows: Record<string, any>[] = [];
+  for (let r = 0; r < payload.count; r++) {
+    const row: Record<string, any> = {};
+    for (const [field, values] of decoded) row[field] = values[r];
+    rows.push(row);
+  }
+  return rows;
+}
+
+// Row-level edit of the master table: rows are matched by id
+export interface TableDataChanges {
+  upsert?: Record<string, any>[];
+  delete?: (string | number)[];
+}
+
+// /commissioning-bootstrap payload: every section read from one snapshot, with the versions it was read at
+export interface CommissioningBootstrap {
+  fiscalYear: string;
+  versions: { projects: number; summaries: number; dropdowns: number; relationships: number };
+  projects: any[];
+  summaries: any[];
+  uploadStatus: Record<string, any>;
+  dropdownOptions: Record<string, string[]>;
+  locationRelationships: { location: string; locationCode: string }[];
+}
+
+// Optimistic concurrency: the X-Data-Version each dataset was last read at. Saves send it
+// back as baseVersion, so a save based on data someone else has changed since gets a 409
+// instead of silently overwriting their edits.
+const dataVersions = new Map<string, number>();
+
+export class VersionConflictError extends Error {
+  constructor(message: string, public currentVersion: number | null) {
+    super(message);
+    this.name = 'VersionConflictError';
+  }
+}
+
+export function rememberDataVersion(key: string, response: Response) {
+  const version = response.headers.get('x-data-version');
+  if (version !== null) dataVersions.set(key, Number(version));
+}
+
+// The bootstrap carries its versions in the body instead of one X-Data-Version header
+export function rememberBootstrapVersions(payload: CommissioningBootstrap) {
+  dataVersions.set(`projects:${payload.fiscalYear}`, payload.versions.projects);
+  dataVersions.set('dropdowns', payload.versions.dropdowns);
+  dataVersions.set(`relationships:${payload.fiscalYear}`, payload.versions.relationships);
+}
+
+export async function getCommissioningBootstrap(fiscalYear: string): Promise<CommissioningBootstrap> {
+  const response = await fetch(`/api/commissioning-bootstrap?fiscalYear=${fiscalYear}`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch commissioning data');
+  }
+  const payload: CommissioningBootstrap = await response.json();
+  rememberBootstrapVersions(payload);
+  return payload;
+}
+
+export function baseVersionFor(key: string): number | undefined {
+  return dataVersions.get(key);
+}
+
+// Query string suffix carrying the remembered base version (empty when the data was never read)
+function baseVersionParam(key: string) {
+  const version = dataVersions.get(key);
+  return version === undefined ? '' : `&baseVersion=${version}`;
+}
+
+// Throw on failure (VersionConflictError for a 409), remember the new version on success
+export async function checkSaveResponse(key: string, response: Response, message: string) {
+  if (response.status === 409) {
+    const current = response.headers.get('x-data-version');
+    throw new VersionConflictError(
+      'This data was changed by someone else. Reload it and reapply your edits.',
+      current === null ? null : Number(current)
+    );
+  }
+  if (!response.ok) {
+    throw new Error(message);
+  }
+  rememberDataVersion(key, response);
+  return response.json();
+}
+
 // API functions
 const api = {
   getTableData: async (fiscalYear: string) => {
@@ -8,6 +108,7 @@ const api = {
     if (!response.ok) {
       throw new Error('Failed to fetch table data');
     }
+    rememberDataVersion(`tableData:${fiscalYear}`, response);
     return response.json();
   },
 
@@ -17,12 +118,21 @@ const api = {
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ fiscalYear, data }),
+      body: JSON.stringify({ fiscalYear, data, baseVersion: baseVersionFor(`tableData:${fiscalYear}`) }),
     });
-    if (!response.ok) {
-      throw new Error('Failed to save table data');
-    }
-    return response.json();
+    return checkSaveResponse(`tableData:${fiscalYear}`, response, 'Failed to save table data');
+  },
+
+  // Send only the edited rows; the backend writes them as one new table version
+  saveTableDataChanges: async (fiscalYear: string, changes: TableDataChanges) => {
+    const response = await fetch(`/api/table-data`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ fiscalYear, changes, baseVersion: baseVersionFor(`tableData:${fiscalYear}`) }),
+    });
+    return checkSaveResponse(`tableData:${fiscalYear}`, response, 'Failed to save table data');
   },
 
   getDropdownOptions: async (fiscalYear: string) => {
@@ -30,21 +140,19 @@ const api = {
     if (!response.ok) {
       throw new Error('Failed to fetch dropdown options');
     }
+    rememberDataVersion('dropdowns', response);
     return response.json();
   },
 
   saveDropdownOptions: async (fiscalYear: string, options: any) => {
-    const response = await fetch(`/api/dropdown-options?fiscalYear=${fiscalYear}`, {
+    const response = await fetch(`/api/dropdown-options?fiscalYear=${fiscalYear}${baseVersionParam('dropdowns')}`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
       body: JSON.stringify(options),
     });
-    if (!response.ok) {
-      throw new Error('Failed to save dropdown options');
-    }
-    return response.json();
+    return checkSaveResponse('dropdowns', response, 'Failed to save dropdown options');
   },
 
   getLocationRelationships: async (fiscalYear: string) => {
@@ -52,38 +160,166 @@ const api = {
     if (!response.ok) {
       throw new Error('Failed to fetch location relationships');
     }
+    rememberDataVersion(`relationships:${fiscalYear}`, response);
     return response.json();
   },
 
   saveLocationRelationships: async (fiscalYear: string, relationships: any) => {
-    const response = await fetch(`/api/location-relationships?fiscalYear=${fiscalYear}`, {
+    const key = `relationships:${fiscalYear}`;
+    const response = await fetch(`/api/location-relationships?fiscalYear=${fiscalYear}${baseVersionParam(key)}`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
       body: JSON.stringify(relationships),
     });
+    return checkSaveResponse(key, response, 'Failed to save location relationships');
+  },
+
+  getCommissioningDashboard: async (fiscalYear: string, filters: Record<string, string | undefined>) => {
+    const params = new URLSearchParams({ fiscalYear });
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value) params.set(key, value);
+    });
+    const response = await fetch(`/api/commissioning-dashboard?${params.toString()}`);
     if (!response.ok) {
-      throw new Error('Failed to save location relationships');
+      throw new Error('Failed to fetch dashboard aggregates');
     }
     return response.json();
   },
 
-  saveSingleDropdownOption: async (fiscalYear: string, optionType: string, optionValue: string) => {
-    const response = await fetch(`/api/dropdown-option`, {
+  getCommissioningComparison: async (fiscalYears: string[], groupBy: string, scope: string) => {
+    const params = new URLSearchParams({ fiscalYears: fiscalYears.join(','), groupBy, scope });
+    const response = await fetch(`/api/commissioning-comparison?${params.toString()}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch fiscal year comparison');
+    }
+    return response.json();
+  },
+
+  // Delta sync: rows changed after `since` (isDeleted marks removals) and the next token.
+  // `full: true` means the token was too old: replace the local rows instead of merging.
+  getCommissioningChanges: async (fiscalYear: string, since: number, fields?: string) => {
+    const params = new URLSearchParams({ fiscalYear, since: String(since) });
+    if (fields) params.set('fields', fields);
+    const response = await fetch(`/api/commissioning-changes?${params.toString()}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch commissioning changes');
+    }
+    return response.json();
+  },
+
+  // Generations: every bulk save / import of a fiscal year; restoring one moves the pointer back
+  getCommissioningGenerations: async (fiscalYear: string) => {
+    const response = await fetch(`/api/commissioning-generations?fiscalYear=${fiscalYear}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch commissioning generations');
+    }
+    return response.json();
+  },
+
+  restoreCommissioningGeneration: async (fiscalYear: string, generation: number) => {
+    const response = await fetch(`/api/commissioning-generations/restore`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ fiscalYear, optionType, optionValue }),
+      body: JSON.stringify({ fiscalYear, generation }),
     });
     if (!response.ok) {
-      throw new Error('Failed to save dropdown option');
+      throw new Error('Failed to restore commissioning generation');
+    }
+    return response.json();
+  },
+
+  getCommissioningProjectsColumnar: async (fiscalYear: string, fields?: string): Promise<ColumnarProjects> => {
+    const params = new URLSearchParams({ fiscalYear, format: 'columnar' });
+    if (fields) params.set('fields', fields);
+    const response = await fetch(`/api/commissioning-projects?${params.toString()}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch commissioning projects');
     }
     return response.json();
   },
+
+  saveSingleDropdownOption: async (fiscalYear: string, optionType: string, optionValue: string) => {
+    const response = await fetch(`/api/dropdown-option`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ fiscalYear, optionType, optionValue, baseVersion: baseVersionFor('dropdowns') }),
+    });
+    return checkSaveResponse('dropdowns', response, 'Failed to save dropdown option');
+  },
+
+  deleteSingleDropdownOption: async (optionType: string, optionValue: string) => {
+    const params = new URLSearchParams({ optionType, optionValue });
+    const response = await fetch(`/api/dropdown-option?${params.toString()}${baseVersionParam('dropdowns')}`, {
+      method: 'DELETE',
+    });
+    return checkSaveResponse('dropdowns', response, 'Failed to delete dropdown option');
+  },
+};
+
+// Query keys refetched for each change-event entity. Project writes also rebuild summaries/rollups.
+const CHANGE_EVENT_QUERY_KEYS: Record<string, string[]> = {
+  projects: ['commissioning-projects', 'commissioning-projects-all', 'commissioning-summaries', 'commissioningDashboard', 'commissioningComparison'],
+  summaries: ['commissioning-summaries', 'commissioningDashboard'],
+  dropdowns: ['dropdownOptions', 'masterData'],
+  relationships: ['locationRelationships', 'masterData'],
+  tableData: ['tableData'],
 };
 
+// Global changes (no fiscal year) hit every query; otherwise only queries for that year
+// or queries not tied to a single year
+function affectsQuery(queryKey: readonly unknown[], changedYear?: string | null) {
+  if (!changedYear) return true;
+  const years = queryKey.filter((part) => typeof part === 'string' && part.startsWith('FY'));
+  return years.length === 0 || years.includes(changedYear);
+}
+
+// Subscribe to backend change events (SSE) and invalidate only the affected queries
+export function useChangeEvents(fiscalYear?: string) {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (typeof window === 'undefined' || typeof EventSource === 'undefined') return;
+
+    const url = fiscalYear ? `/api/events?fiscalYear=${encodeURIComponent(fiscalYear)}` : '/api/events';
+    const source = new EventSource(url);
+    let disconnected = false;
+
+    source.addEventListener('ready', () => {
+      // Events may have been missed while reconnecting - refetch whatever is active once
+      if (disconnected) {
+        queryClient.invalidateQueries();
+        disconnected = false;
+      }
+    });
+
+    source.addEventListener('change', (message) => {
+      try {
+        const { fiscalYear: changedYear, entity } = JSON.parse((message as MessageEvent).data);
+        const keys = CHANGE_EVENT_QUERY_KEYS[entity] || Object.values(CHANGE_EVENT_QUERY_KEYS).flat();
+        keys.forEach((key) => {
+          queryClient.invalidateQueries({
+            predicate: (query) => query.queryKey[0] === key && affectsQuery(query.queryKey, changedYear),
+          });
+        });
+      } catch (error) {
+        console.error('Invalid change event:', error);
+      }
+    });
+
+    source.onerror = () => {
+      disconnected = true;
+    };
+
+    return () => source.close();
+  }, [fiscalYear, queryClient]);
+}
+
 // Custom hook for table data
 export function useTableData(fiscalYear: string) {
   const { data, isLoading, error, refetch } = useQuery({
@@ -135,7 +371,40 @@ export function useLocationRelationships(fiscalYear: string) {
   };
 }
 
+// Custom hook for server-side dashboard aggregates (KPIs, gauge, series, options)
+export function useCommissioningDashboard(fiscalYear: string, filters: Record<string, string | undefined> = {}) {
+  const { data, isLoading, error, refetch } = useQuery({
+    queryKey: ['commissioningDashboard', fiscalYear, filters],
+    queryFn: () => api.getCommissioningDashboard(fiscalYear, filters),
+    enabled: !!fiscalYear, // Only fetch when fiscalYear is provided
+    staleTime: 60 * 1000, // 1 minute
+  });
+
+  return {
+    data,
+    isLoading,
+    error,
+    refetch,
+  };
+}
+
 // Custom hook for saving table data with mutation
+export function useCommissioningComparison(fiscalYears: string[], groupBy = 'category', scope = 'Overall') {
+  const { data, isLoading, error, refetch } = useQuery({
+    queryKey: ['commissioningComparison', fiscalYears, groupBy, scope],
+    queryFn: () => api.getCommissioningComparison(fiscalYears, groupBy, scope),
+    enabled: fiscalYears.length > 0,
+    staleTime: 60 * 1000, // 1 minute
+  });
+
+  return {
+    data,
+    isLoading,
+    error,
+    refetch,
+  };
+}
+
 export function useSaveTableData() {
   const queryClient = useQueryClient();
 
@@ -151,6 +420,20 @@ export function useSaveTableData() {
   return mutation;
 }
 
+export function useSaveTableDataChanges() {
+  const queryClient = useQueryClient();
+
+  const mutation = useMutation({
+    mutationFn: ({ fiscalYear, changes }: { fiscalYear: string; changes: TableDataChanges }) =>
+      api.saveTableDataChanges(fiscalYear, changes),
+    onSuccess: (data, variables) => {
+      queryClient.invalidateQueries({ queryKey: ['tableData', variables.fiscalYear] });
+    },
+  });
+
+  return mutation;
+}
+
 // Custom hook for saving dropdown options with mutation
 export function useSaveDropdownOptions() {
   const queryClient = useQueryClient();
@@ -199,6 +482,53 @@ export function useSaveSingleDropdownOption() {
   return mutation;
 }
 
+// Custom hook for the restorable generations of a fiscal year's projects
+export function useCommissioningGenerations(fiscalYear: string) {
+  const { data, isLoading, error, refetch } = useQuery({
+    queryKey: ['commissioningGenerations', fiscalYear],
+    queryFn: () => api.getCommissioningGenerations(fiscalYear),
+    enabled: !!fiscalYear,
+  });
+
+  return {
+    data,
+    isLoading,
+    error,
+    refetch,
+  };
+}
+
+// Custom hook for restoring a generation with mutation
+export function useRestoreCommissioningGeneration() {
+  const queryClient = useQueryClient();
+
+  const mutation = useMutation({
+    mutationFn: ({ fiscalYear, generation }: { fiscalYear: string; generation: number }) =>
+      api.restoreCommissioningGeneration(fiscalYear, generation),
+    onSuccess: (data, variables) => {
+      queryClient.invalidateQueries({ queryKey: ['commissioningGenerations', variables.fiscalYear] });
+      CHANGE_EVENT_QUERY_KEYS.projects.forEach((key) => queryClient.invalidateQueries({ queryKey: [key] }));
+    },
+  });
+
+  return mutation;
+}
+
+// Custom hook for removing a single dropdown option with mutation
+export function useDeleteSingleDropdownOption() {
+  const queryClient = useQueryClient();
+
+  const mutation = useMutation({
+    mutationFn: ({ optionType, optionValue }: { fiscalYear: string; optionType: string; optionValue: string }) =>
+      api.deleteSingleDropdownOption(optionType, optionValue),
+    onSuccess: (data, variables) => {
+      queryClient.invalidateQueries({ queryKey: ['dropdownOptions', variables.fiscalYear] });
+    },
+  });
+
+  return mutation;
+}
+
 // Custom hook for debounced search
 export function useDebounce(value: string, delay: number) {
   const [debouncedValue, setDebouncedValue] = useState(value);
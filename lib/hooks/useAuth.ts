@@ -8,24 +8,110 @@ interface User {
   created_at: string;
 }
 
+// Refresh the access token this long before it expires
+const REFRESH_MARGIN_MS = 60 * 1000;
+
+// Expiry of a JWT in ms since epoch (null when it cannot be read)
+function tokenExpiry(token: string): number | null {
+  try {
+    const payload = JSON.parse(atob(token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')));
+    return typeof payload.exp === 'number' ? payload.exp * 1000 : null;
+  } catch {
+    return null;
+  }
+}
+
+function storeTokens(data: { access_token: string; refresh_token?: string }) {
+  localStorage.setItem('authToken', data.access_token);
+  if (data.refresh_token) localStorage.setItem('refreshToken', data.refresh_token);
+}
+
+async function requestRefresh(retried = false): Promise<boolean> {
+  const refreshToken = localStorage.getItem('refreshToken');
+  if (!refreshToken) return false;
+  try {
+    const response = await fetch('/api/token/refresh', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (response.ok) {
+      storeTokens(await response.json());
+      return true;
+    }
+  } catch {
+    return false;
+  }
+  // Another tab may have rotated the token first and stored its successor
+  const current = localStorage.getItem('refreshToken');
+  return !retried && !!current && current !== refreshToken ? requestRefresh(true) : false;
+}
+
+// One refresh at a time per tab; concurrent callers share it
+let refreshInFlight: Promise<boolean> | null = null;
+
+// Get a new access token with the stored refresh token (no password needed)
+export function refreshAccessToken(): Promise<boolean> {
+  if (!refreshInFlight) {
+    refreshInFlight = requestRefresh().finally(() => {
+      refreshInFlight = null;
+    });
+  }
+  return refreshInFlight;
+}
+
 export function useAuth() {
   const [user, setUser] = useState<User | null>(null);
   const [loading, setLoading] = useState(true);
 
+  const clearSession = () => {
+    localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
+    localStorage.removeItem('userData');
+    setUser(null);
+  };
+
   // Check if user is logged in
   useEffect(() => {
     const token = localStorage.getItem('authToken');
-    if (token) {
-      // In a real app, you would validate the token with your backend
-      // For now, we'll just check if it exists
-      const userData = localStorage.getItem('userData');
-      if (userData) {
-        setUser(JSON.parse(userData));
-      }
+    const userData = localStorage.getItem('userData');
+    if (!token || !userData) {
+      setLoading(false);
+      return;
     }
+    const expiry = tokenExpiry(token);
+    if (expiry !== null && expiry <= Date.now()) {
+      // Access token lapsed while the app was closed: continue the session if it is still valid
+      refreshAccessToken().then((ok) => {
+        if (ok) setUser(JSON.parse(userData));
+        else clearSession();
+        setLoading(false);
+      });
+      return;
+    }
+    setUser(JSON.parse(userData));
     setLoading(false);
   }, []);
 
+  // Keep the access token fresh while logged in
+  useEffect(() => {
+    if (!user) return;
+    const token = localStorage.getItem('authToken');
+    const expiry = token ? tokenExpiry(token) : null;
+    if (expiry === null) return;
+    const timer = setTimeout(async () => {
+      if (await refreshAccessToken()) {
+        // Re-run this effect for the new token's expiry
+        setUser((current) => (current ? { ...current } : current));
+      } else {
+        clearSession();
+      }
+    }, Math.max(expiry - Date.now() - REFRESH_MARGIN_MS, 0));
+    return () => clearTimeout(timer);
+  }, [user]);
+
   const login = async (email: string, password: string) => {
     try {
       const response = await fetch('/api/login', {
@@ -39,9 +125,9 @@ export function useAuth() {
       const data = await response.json();
 
       if (response.ok) {
-        // Store user data and token
+        // Store user data and tokens
         localStorage.setItem('userData', JSON.stringify(data.user));
-        localStorage.setItem('authToken', data.access_token); // Store the actual JWT token
+        storeTokens(data);
         setUser(data.user);
         return { success: true, user: data.user };
       } else {
@@ -53,9 +139,18 @@ export function useAuth() {
   };
 
   const logout = () => {
-    localStorage.removeItem('authToken');
-    localStorage.removeItem('userData');
-    setUser(null);
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (refreshToken) {
+      // Revoke the session server-side; the local logout does not wait for it
+      fetch('/api/logout', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(() => {});
+    }
+    clearSession();
   };
 
   return {
@@ -65,4 +160,4 @@ export function useAuth() {
     logout,
     isAdmin: user?.role === 'admin',
   };
-}
\ No newline at end of file
+}
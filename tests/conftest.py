@@ -0,0 +1,74 @@
+"""
+Shared fixtures for backend tests.
+Tests run against a throw-away SQLite database, never data/adani-excel.db.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import database
+from auth import token_cache, user_cache
+from bootstrap import section_cache
+from master_data_cache import master_data_cache
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the backend at an empty SQLite file and create the schema."""
+    monkeypatch.setattr(database, 'DB_DIR', str(tmp_path))
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'test.db'))
+    database.init_db()
+    master_data_cache.clear()
+    section_cache.clear()
+    token_cache.clear()
+    user_cache.invalidate()
+    return database
+
+
+def asgi_get(app, path, query_string=''):
+    """GET through the full ASGI stack (middleware included); returns (status, body)."""
+    sent = []
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': query_string.encode(), 'headers': [(b'host', b'test')], 'scheme': 'http',
+        'server': ('test', 80), 'client': ('test', 1), 'http_version': '1.1',
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    body = b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+    return sent[0]['status'], body
+
+
+def insert_project(conn, fiscal_year='FY_25-26', **fields):
+    """Insert one commissioning_projects row with sensible defaults."""
+    row = {
+        'fiscal_year': fiscal_year,
+        'sno': 1,
+        'project_name': 'Project',
+        'spv': 'SPV',
+        'project_type': 'PPA',
+        'plot_location': 'Plot',
+        'capacity': 0.0,
+        'plan_actual': 'Plan',
+        'category': 'Khavda Solar',
+        'section': 'A',
+        'included_in_total': True,
+    }
+    row.update(fields)
+    cols = ', '.join(row.keys())
+    marks = ', '.join('?' for _ in row)
+    cur = conn.execute(f'INSERT INTO commissioning_projects ({cols}) VALUES ({marks})', list(row.values()))
+    return cur.lastrowid
@@ -0,0 +1,142 @@
+"""
+Tests for cached access-token verification:
+1. Verified tokens are cached by hash, honour exp and stay within the LRU bound
+2. User records are cached for a TTL and can be invalidated
+3. get_current_user / require_admin answer 401 / 403
+4. AuthMiddleware guards non-public paths only when enforcement is on
+"""
+
+import asyncio
+from datetime import timedelta
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+from auth import AuthError, AuthMiddleware, TokenCache, UserCache, get_current_user, require_admin
+
+
+def add_user(database, email='ops@example.com', role='viewer'):
+    conn = database.get_db_connection()
+    try:
+        hashed = bcrypt.hashpw(b'secret', bcrypt.gensalt(rounds=4)).decode('utf-8')
+        cur = conn.execute(
+            "INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, ?)",
+            (email.split('@')[0], email, hashed, role)
+        )
+        conn.commit()
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def token_for(user_id, minutes=30):
+    import main
+    return main.create_access_token({"sub": str(user_id)}, timedelta(minutes=minutes))
+
+
+class TestTokenCache:
+    """LRU of verified tokens."""
+
+    def test_hit_skips_decode(self, monkeypatch):
+        cache = TokenCache(max_entries=2)
+        decoded = []
+        real_decode = auth.jwt.decode
+        monkeypatch.setattr(auth.jwt, 'decode', lambda *a, **k: decoded.append(1) or real_decode(*a, **k))
+        token = token_for(7)
+        assert cache.verify(token) == 7
+        assert cache.verify(token) == 7
+        assert len(decoded) == 1, "The second check is a cache hit"
+
+        for user_id in (8, 9):
+            cache.verify(token_for(user_id))
+        assert cache.stats()['entries'] == 2, "The LRU stays bounded"
+
+    def test_expiry_and_invalid(self, monkeypatch):
+        cache = TokenCache()
+        token = token_for(7, minutes=1)
+        cache.verify(token)
+        later = auth.time.time() + 120
+        monkeypatch.setattr(auth.time, 'time', lambda: later)
+        with pytest.raises(AuthError, match='expired'):
+            cache.verify(token)
+        with pytest.raises(AuthError, match='Invalid'):
+            cache.verify('not-a-jwt')
+
+
+class TestUserCache:
+    """TTL cache of user records."""
+
+    def test_ttl_and_invalidate(self, temp_db, monkeypatch):
+        user_id = add_user(temp_db)
+        opened = []
+        monkeypatch.setattr(auth, 'get_db_connection', lambda: opened.append(1) or temp_db.get_db_connection())
+        cache = UserCache(ttl_seconds=60)
+        assert cache.get(user_id)['role'] == 'viewer'
+        assert cache.get(user_id)['email'] == 'ops@example.com'
+        assert len(opened) == 1, "Served from memory within the TTL"
+
+        conn = temp_db.get_db_connection()
+        conn.execute("UPDATE users SET role = 'admin' WHERE id = ?", (user_id,))
+        conn.commit()
+        conn.close()
+        cache.invalidate(user_id)
+        assert cache.get(user_id)['role'] == 'admin'
+        assert cache.get(999) is None
+
+
+class TestDependencies:
+    """401 / 403 from the route dependencies."""
+
+    def test_current_user_and_admin(self, temp_db):
+        viewer = add_user(temp_db)
+        credentials = HTTPAuthorizationCredentials(scheme='Bearer', credentials=token_for(viewer))
+        assert get_current_user(credentials)['id'] == viewer
+        with pytest.raises(HTTPException) as missing:
+            get_current_user(None)
+        assert missing.value.status_code == 401
+        with pytest.raises(HTTPException) as forbidden:
+            require_admin(get_current_user(credentials))
+        assert forbidden.value.status_code == 403
+
+        gone = HTTPAuthorizationCredentials(scheme='Bearer', credentials=token_for(999))
+        with pytest.raises(HTTPException) as unknown:
+            get_current_user(gone)
+        assert unknown.value.status_code == 401
+
+
+class TestMiddleware:
+    """Enforcement for every non-public route."""
+
+    def call(self, middleware, path, token=None):
+        sent = []
+        headers = [(b'authorization', f'Bearer {token}'.encode())] if token else []
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': headers}
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(middleware(scope, receive, send))
+        return sent[0]['status'] if sent else None
+
+    def test_enforcement(self, temp_db):
+        reached = []
+
+        async def app(scope, receive, send):
+            reached.append(scope.get('state', {}).get('user'))
+
+        user_id = add_user(temp_db)
+        enforced = AuthMiddleware(app, required=True)
+        assert self.call(enforced, '/commissioning-projects') == 401
+        assert self.call(enforced, '/commissioning-projects', token='bad') == 401
+        assert self.call(enforced, '/api/login') is None, "Public paths pass"
+        self.call(enforced, '/commissioning-projects', token=token_for(user_id))
+        assert reached[-1]['id'] == user_id
+
+        self.call(AuthMiddleware(app, required=False), '/commissioning-projects')
+        assert len(reached) == 3, "Nothing is enforced while AUTH_REQUIRED is off"
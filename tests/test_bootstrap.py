@@ -0,0 +1,112 @@
+"""
+Tests for the commissioning bootstrap endpoint:
+1. One response carries every section and the versions they were read at
+2. Unchanged sections are served from cache; a write rebuilds only what it touched
+3. All sections are read inside one transaction on one connection
+4. Through the full app, writes by other workers show up on the next request
+"""
+
+import json
+
+from bootstrap import build_bootstrap, section_cache
+from conftest import asgi_get, insert_project
+from data_versions import bump_version
+
+
+def bootstrap(database, fiscal_year='FY_25-26'):
+    conn = database.get_db_connection()
+    try:
+        return json.loads(b''.join(build_bootstrap(conn, fiscal_year)))
+    finally:
+        conn.close()
+
+
+def write(database, action):
+    conn = database.get_db_connection()
+    try:
+        action(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class TestBootstrap:
+    """Sections, versions and section caching."""
+
+    def test_sections(self, temp_db):
+        def seed(conn):
+            insert_project(conn, project_name='Khavda 1')
+            conn.execute(
+                "INSERT INTO commissioning_summaries (fiscal_year, category, summary_type, total) "
+                "VALUES ('FY_25-26', 'Khavda Solar', 'Plan', 100)"
+            )
+
+        write(temp_db, seed)
+        data = bootstrap(temp_db)
+        assert data['fiscalYear'] == 'FY_25-26'
+        assert [p['projectName'] for p in data['projects']] == ['Khavda 1']
+        assert data['uploadStatus']['total_projects'] == 1
+        assert [(r['category'], r['total']) for r in data['summaries']] == [('Khavda Solar', 100)]
+        assert data['dropdownOptions']['types'] == ['Solar', 'Wind', 'Hybrid']
+        assert data['locationRelationships'][0] == {'location': 'Khavda', 'locationCode': 'Khavda'}
+        assert data['versions'] == {'projects': 0, 'summaries': 0, 'dropdowns': 0, 'relationships': 0}
+
+    def test_unchanged_sections_come_from_cache(self, temp_db):
+        write(temp_db, lambda conn: insert_project(conn, project_name='Khavda 1'))
+        builds = section_cache.stats()['builds']
+        bootstrap(temp_db)
+        assert section_cache.stats()['builds'] == builds + 3
+
+        bootstrap(temp_db)
+        assert section_cache.stats()['builds'] == builds + 3, "Nothing changed, nothing rebuilt"
+
+        def add_project(conn):
+            insert_project(conn, sno=2, project_name='Khavda 2')
+            bump_version(conn.cursor(), 'projects', 'FY_25-26')
+
+        write(temp_db, add_project)
+        data = bootstrap(temp_db)
+        assert [p['projectName'] for p in data['projects']] == ['Khavda 1', 'Khavda 2']
+        assert data['versions']['projects'] == 1
+        assert section_cache.stats()['builds'] == builds + 6, "Every project-derived section is rebuilt"
+
+        write(temp_db, lambda conn: bump_version(conn.cursor(), 'summaries', 'FY_25-26'))
+        bootstrap(temp_db)
+        assert section_cache.stats()['builds'] == builds + 7, "Only the summaries are rebuilt"
+
+    def test_one_read_transaction(self, temp_db):
+        statements = []
+        conn = temp_db.get_db_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            build_bootstrap(conn, 'FY_25-26')
+            assert not conn.in_transaction, "The snapshot is released"
+        finally:
+            conn.close()
+        assert statements[0] == 'BEGIN'
+        assert statements[-1] == 'ROLLBACK'
+        assert len(statements) > 5
+
+    def test_endpoint(self, temp_db):
+        import main
+
+        response = main.get_commissioning_bootstrap('FY_25-26')
+        assert json.loads(response.body)['projects'] == []
+
+    def test_other_worker_write_through_app(self, temp_db):
+        import main
+
+        for _ in range(2):
+            status, body = asgi_get(main.app, '/api/commissioning-bootstrap', 'fiscalYear=FY_25-26')
+            assert status == 200 and json.loads(body)['projects'] == []
+
+        # Committed without touching this process's caches, as another worker would
+        def add(conn):
+            insert_project(conn, project_name='Remote')
+            bump_version(conn.cursor(), 'projects', 'FY_25-26')
+        write(temp_db, add)
+
+        status, body = asgi_get(main.app, '/api/commissioning-bootstrap', 'fiscalYear=FY_25-26')
+        result = json.loads(body)
+        assert [p['projectName'] for p in result['projects']] == ['Remote']
+        assert result['versions']['projects'] == 1
@@ -0,0 +1,55 @@
+"""
+Tests for delta sync:
+1. since=0 returns every row and a token
+2. Only rows changed after the token come back
+3. Re-imports report the replaced rows as soft-deleted
+"""
+
+from change_seq import fetch_changes, next_change_seq
+from excel_parser import import_projects_to_db
+
+
+def parsed_project(name, plan_actual='Plan', **fields):
+    project = {
+        'sno': 1, 'project_name': name, 'spv': 'SPV', 'project_type': 'PPA', 'plot_location': 'Plot',
+        'capacity': 100, 'plan_actual': plan_actual, 'category': 'Khavda Solar', 'section': 'A',
+        'included_in_total': True,
+    }
+    project.update(fields)
+    return project
+
+
+class TestDeltaSync:
+    """Rows are stamped on every write and fetched by change sequence."""
+
+    def test_only_changed_rows_after_token(self, temp_db):
+        import_projects_to_db([parsed_project('P1'), parsed_project('P2')], [], 'FY_25-26')
+        conn = temp_db.get_db_connection()
+        try:
+            changes, token = fetch_changes(conn.cursor(), 'FY_25-26', 0)
+            assert {c['projectName'] for c in changes} == {'P1', 'P2'}
+
+            unchanged, same_token = fetch_changes(conn.cursor(), 'FY_25-26', token)
+            assert unchanged == [] and same_token == token
+
+            cursor = conn.cursor()
+            cursor.execute("UPDATE commissioning_projects SET apr = 5, change_seq = ? WHERE project_name = 'P2'",
+                           (next_change_seq(cursor),))
+            conn.commit()
+            changes, next_token = fetch_changes(conn.cursor(), 'FY_25-26', token, fields='projectName,apr')
+            assert [(c['projectName'], c['apr'], c['isDeleted']) for c in changes] == [('P2', 5, False)]
+            assert next_token > token
+            assert set(changes[0]) == {'id', 'projectName', 'apr', 'isDeleted', 'changeSeq'}
+        finally:
+            conn.close()
+
+    def test_reimport_reports_soft_deletes(self, temp_db):
+        import_projects_to_db([parsed_project('P1')], [], 'FY_25-26')
+        conn = temp_db.get_db_connection()
+        try:
+            _, token = fetch_changes(conn.cursor(), 'FY_25-26', 0)
+            import_projects_to_db([parsed_project('P1', apr=3)], [], 'FY_25-26')
+            changes, _ = fetch_changes(conn.cursor(), 'FY_25-26', token, fields='projectName,apr')
+            assert sorted((c['isDeleted'], c['apr']) for c in changes) == [(False, 3), (True, None)]
+        finally:
+            conn.close()
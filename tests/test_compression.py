@@ -0,0 +1,80 @@
+"""
+Tests for response compression:
+1. Large JSON bodies are gzip-compressed when the client accepts it
+2. Small bodies, SSE streams and clients without Accept-Encoding pass through
+3. Compressed variants of ETag'd (cached) responses are reused
+"""
+
+import asyncio
+import gzip
+import json
+
+from compression import CompressedVariants, CompressionMiddleware, choose_encoding
+from response_cache import ResponseCache, ResponseCacheMiddleware
+
+
+class JsonApp:
+    """ASGI endpoint returning a JSON body of the requested size."""
+
+    def __init__(self, size=5000, content_type=b'application/json'):
+        self.body = json.dumps({'data': 'x' * size}).encode()
+        self.content_type = content_type
+
+    async def __call__(self, scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', self.content_type)]})
+        await send({'type': 'http.response.body', 'body': self.body})
+
+
+def get(app, accept_encoding=b'gzip', path='/commissioning-projects'):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    headers = [(b'accept-encoding', accept_encoding)] if accept_encoding else []
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': headers}
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    return dict(start['headers']), b''.join(m.get('body', b'') for m in messages[1:])
+
+
+class TestCompression:
+    """Negotiation, thresholds and variant reuse."""
+
+    def test_large_json_is_gzipped(self):
+        inner = JsonApp()
+        headers, body = get(CompressionMiddleware(inner, variants=CompressedVariants()))
+        assert headers[b'content-encoding'] == b'gzip'
+        assert gzip.decompress(body) == inner.body
+        assert int(headers[b'content-length']) == len(body)
+        assert b'Accept-Encoding' in headers[b'vary']
+
+    def test_small_body_and_no_accept_encoding_pass_through(self):
+        app = CompressionMiddleware(JsonApp(size=10), variants=CompressedVariants())
+        headers, _ = get(app)
+        assert b'content-encoding' not in headers, "Bodies under the threshold stay uncompressed"
+        headers, _ = get(CompressionMiddleware(JsonApp(), variants=CompressedVariants()), accept_encoding=None)
+        assert b'content-encoding' not in headers
+
+    def test_event_stream_not_compressed(self):
+        app = CompressionMiddleware(JsonApp(content_type=b'text/event-stream'), variants=CompressedVariants())
+        headers, _ = get(app)
+        assert b'content-encoding' not in headers
+
+    def test_cached_response_compressed_once(self):
+        variants = CompressedVariants()
+        app = CompressionMiddleware(ResponseCacheMiddleware(JsonApp(), ResponseCache()), variants=variants)
+        first_headers, first = get(app)
+        second_headers, second = get(app)
+        assert first == second
+        assert first_headers[b'etag'].startswith(b'W/'), "Compressed representation gets a weak validator"
+        assert variants.stats()['hits'] == 1 and variants.stats()['misses'] == 1
+
+    def test_choose_encoding(self):
+        assert choose_encoding('gzip, deflate') == 'gzip'
+        assert choose_encoding('gzip;q=0, identity') is None
+        assert choose_encoding('identity') is None
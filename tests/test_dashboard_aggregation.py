@@ -0,0 +1,217 @@
+"""
+Tests for the server-side dashboard aggregates:
+1. KPI figures respect plan_actual exclusivity
+2. Rows excluded from totals never contribute
+3. Period / series sums match the monthly values
+4. Cross-year comparison groups and per-year caching
+5. The in-memory NumPy store gives the same figures as SQL
+6. The store reloads on a data_versions bump and keeps only recent years
+"""
+
+import pytest
+
+from conftest import insert_project
+import dashboard
+from data_versions import bump_version, data_version
+from dashboard import aggregate_by_plan_actual, aggregate_from_store, build_comparison, build_dashboard
+from project_store import FiscalYearStore, ProjectStore
+
+
+@pytest.fixture
+def seeded(temp_db):
+    conn = temp_db.get_db_connection()
+    months = {'apr': 10, 'may': 20, 'jun': 30, 'oct': 40}
+    insert_project(conn, project_name='Solar 1', capacity=500, plan_actual='Plan', **months)
+    insert_project(conn, project_name='Solar 1', capacity=500, plan_actual='Rephase', apr=5)
+    insert_project(conn, project_name='Solar 1', capacity=500, plan_actual='Actual', apr=8, oct=12)
+    insert_project(conn, project_name='Wind 1', category='Khavda Wind', project_type='Merchant',
+                   capacity=200, plan_actual='Plan', jul=50)
+    insert_project(conn, project_name='Wind 1', category='Khavda Wind', project_type='Merchant',
+                   capacity=200, plan_actual='Actual', jul=25)
+    # Internal section - excluded from every total
+    insert_project(conn, project_name='Internal', category='Khavda Solar Internal 650MW', section='D2',
+                   capacity=650, plan_actual='Plan', apr=650, included_in_total=False)
+    # Soft-deleted rows never count
+    insert_project(conn, project_name='Old', capacity=999, plan_actual='Plan', is_deleted=True)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+class TestDashboardKpi:
+    """KPI cards use Capacity for Plan and sum(months) for Actual."""
+
+    def test_overall_kpi(self, seeded):
+        result = build_dashboard(seeded.cursor(), 'FY_25-26')
+        kpi = result['kpi']
+        assert kpi['plan'] == 700, f"Expected plan=700, got {kpi['plan']}"
+        assert kpi['actual'] == 45, f"Expected actual=45, got {kpi['actual']}"
+        assert kpi['rephase'] == 500
+        assert kpi['projectsCount'] == 2
+
+    def test_solar_scope(self, seeded):
+        kpi = build_dashboard(seeded.cursor(), 'FY_25-26', scope='Solar')['kpi']
+        assert kpi['plan'] == 500
+        assert kpi['actual'] == 20
+        assert kpi['achievement'] == pytest.approx(4.0)
+
+    def test_project_type_filter(self, seeded):
+        kpi = build_dashboard(seeded.cursor(), 'FY_25-26', project_type='Merchant')['kpi']
+        assert kpi['plan'] == 200
+        assert kpi['actual'] == 25
+
+    def test_invalid_scope_rejected(self, seeded):
+        with pytest.raises(ValueError):
+            build_dashboard(seeded.cursor(), 'FY_25-26', scope='Hybrid')
+
+
+class TestDashboardSeries:
+    """Series and gauge figures come from the monthly sums of a single capacity type."""
+
+    def test_quarterly_series(self, seeded):
+        quarterly = build_dashboard(seeded.cursor(), 'FY_25-26')['quarterly']
+        q1, q2, q3, q4 = quarterly
+        assert q1['plan'] == 60 and q1['actual'] == 8 and q1['rephase'] == 5
+        assert q2['plan'] == 50 and q2['actual'] == 25
+        assert q3['plan'] == 40 and q3['actual'] == 12
+        assert q4['plan'] == 0
+
+    def test_monthly_deviation(self, seeded):
+        monthly = {p['name']: p for p in build_dashboard(seeded.cursor(), 'FY_25-26')['monthly']}
+        assert monthly['apr']['deviation'] == -2
+        assert monthly['oct']['deviation'] == -28
+
+    def test_gauge_period(self, seeded):
+        gauge = build_dashboard(seeded.cursor(), 'FY_25-26', period='h2')['gauge']
+        assert gauge['plan'] == 40
+        assert gauge['actual'] == 12
+        assert gauge['remaining'] == 28
+
+    def test_options_only_included_rows(self, seeded):
+        options = build_dashboard(seeded.cursor(), 'FY_25-26')['options']
+        assert options['projects'] == ['Solar 1', 'Wind 1']
+        assert 'Khavda Solar Internal 650MW' not in options['categories']
+
+
+class TestAsOf:
+    """Cumulative-to-date figures for an arbitrary month cutoff."""
+
+    def test_as_of_block(self, seeded):
+        result = build_dashboard(seeded.cursor(), 'FY_25-26', as_of='jun')
+        as_of = result['asOf']
+        assert as_of['plan'] == 60, "Plan Apr..Jun is Solar 1 (10+20+30)"
+        assert as_of['actual'] == 8
+        assert as_of['remainingPlan'] == 40 + 50, "Oct plan (Solar) + Jul plan (Wind) still ahead"
+        assert 'asOf' not in build_dashboard(seeded.cursor(), 'FY_25-26')
+
+
+class TestComparison:
+    """Year-over-year figures from one grouped query, cached per year version."""
+
+    @pytest.fixture
+    def two_years(self, seeded):
+        insert_project(seeded, fiscal_year='FY_24-25', project_name='Solar 0', capacity=300,
+                       plan_actual='Plan', apr=100)
+        insert_project(seeded, fiscal_year='FY_24-25', project_name='Solar 0', capacity=300,
+                       plan_actual='Actual', apr=60)
+        seeded.commit()
+        dashboard.year_aggregates.clear()
+        return seeded
+
+    def test_groups_and_change(self, two_years):
+        result = build_comparison(two_years.cursor(), ['FY_24-25', 'FY_25-26'])
+        solar = next(g for g in result['groups'] if g['key'] == 'Khavda Solar')
+        assert solar['years']['FY_24-25']['plan']['total'] == 300
+        assert solar['years']['FY_25-26']['plan']['total'] == 500
+        assert solar['years']['FY_25-26']['actual']['quarters']['q3'] == 12
+        assert solar['change']['FY_25-26']['actual']['delta'] == -40
+        wind = next(g for g in result['groups'] if g['key'] == 'Khavda Wind')
+        assert wind['years']['FY_24-25']['actual']['total'] == 0, "Missing years are zero-filled"
+        assert result['totals']['FY_25-26']['plan']['total'] == 700, "Excluded and deleted rows never count"
+
+    def test_unchanged_years_served_from_cache(self, two_years):
+        versions = {'FY_24-25': 0, 'FY_25-26': 0}
+        build_comparison(two_years.cursor(), ['FY_24-25', 'FY_25-26'], version_of=versions.get)
+
+        insert_project(two_years, fiscal_year='FY_24-25', project_name='Solar 9', capacity=1,
+                       plan_actual='Plan')
+        two_years.commit()
+        cached = build_comparison(two_years.cursor(), ['FY_24-25', 'FY_25-26'], version_of=versions.get)
+        assert cached['totals']['FY_24-25']['plan']['total'] == 300, "Same version is served from cache"
+
+        versions['FY_24-25'] = 1
+        fresh = build_comparison(two_years.cursor(), ['FY_24-25', 'FY_25-26'], version_of=versions.get)
+        assert fresh['totals']['FY_24-25']['plan']['total'] == 301
+
+    def test_write_during_query_is_not_cached_as_fresh(self, two_years, monkeypatch):
+        versions = {'FY_24-25': 0, 'FY_25-26': 0}
+        query = dashboard.aggregate_years
+
+        def racing_query(cursor, *args):
+            result = query(cursor, *args)
+            # A save commits after the rows were read
+            insert_project(two_years, fiscal_year='FY_24-25', project_name='Solar 9', capacity=1,
+                           plan_actual='Plan')
+            two_years.commit()
+            versions['FY_24-25'] = 1
+            return result
+
+        monkeypatch.setattr(dashboard, 'aggregate_years', racing_query)
+        stale = build_comparison(two_years.cursor(), ['FY_24-25'], version_of=versions.get)
+        assert stale['totals']['FY_24-25']['plan']['total'] == 300
+        monkeypatch.setattr(dashboard, 'aggregate_years', query)
+
+        fresh = build_comparison(two_years.cursor(), ['FY_24-25'], version_of=versions.get)
+        assert fresh['totals']['FY_24-25']['plan']['total'] == 301, "Aggregates read before the save are not current"
+
+    def test_cache_is_bounded(self):
+        cache = dashboard.YearAggregateCache(max_entries=2)
+        for fy in ('FY_22-23', 'FY_23-24', 'FY_24-25'):
+            cache.put((fy, 'category', 'Overall'), 0, {})
+        assert len(cache) == 2
+        assert cache.get(('FY_22-23', 'category', 'Overall'), 0) is None, "Least recently used year is evicted"
+        cache.put(('FY_24-25', 'category', 'Overall'), 1, {'new': {}})
+        cache.put(('FY_24-25', 'category', 'Overall'), 0, {'old': {}})
+        assert cache.get(('FY_24-25', 'category', 'Overall'), 1) == {'new': {}}, "Older reads never replace newer"
+
+    def test_invalid_group(self, two_years):
+        with pytest.raises(ValueError):
+            build_comparison(two_years.cursor(), ['FY_25-26'], group_by='bogus')
+
+
+class TestProjectStore:
+    """Vectorized masks over the column store match the SQL aggregation."""
+
+    @pytest.mark.parametrize('filters', [
+        {},
+        {'scope': 'Solar'},
+        {'scope': 'Wind', 'project_type': 'Merchant'},
+        {'category': 'Khavda Solar', 'project_name': 'Solar 1'},
+        {'spv': 'no-such-spv'},
+    ])
+    def test_matches_sql(self, seeded, filters):
+        store = FiscalYearStore.load(seeded.cursor(), 'FY_25-26')
+        assert aggregate_from_store(store, **filters) == aggregate_by_plan_actual(seeded.cursor(), 'FY_25-26', **filters)
+
+    def test_dashboard_from_store(self, seeded):
+        store = FiscalYearStore.load(seeded.cursor(), 'FY_25-26')
+        assert build_dashboard(seeded.cursor(), 'FY_25-26', store=store) == build_dashboard(seeded.cursor(), 'FY_25-26')
+
+    def test_reloads_after_version_bump(self, seeded):
+        project_store = ProjectStore(lambda cursor, fy: data_version(cursor, 'projects', fy))
+        first = project_store.get(seeded.cursor(), 'FY_25-26')
+        assert project_store.get(seeded.cursor(), 'FY_25-26') is first, "Same version reuses the loaded arrays"
+
+        insert_project(seeded, project_name='Solar 2', capacity=100, plan_actual='Plan')
+        bump_version(seeded.cursor(), 'projects', 'FY_25-26')
+        seeded.commit()
+        reloaded = project_store.get(seeded.cursor(), 'FY_25-26')
+        assert reloaded.size == first.size + 1
+
+    def test_keeps_most_recent_years(self, seeded):
+        project_store = ProjectStore(lambda cursor, fy: 0, max_years=2)
+        for fy in ('FY_23-24', 'FY_24-25', 'FY_25-26', 'FY_24-25', 'FY_26-27'):
+            project_store.get(seeded.cursor(), fy)
+        stats = project_store.stats()
+        assert list(stats['fiscalYears']) == ['FY_24-25', 'FY_26-27']
+        assert stats['evictions'] == 2
@@ -0,0 +1,102 @@
+"""
+Tests for optimistic concurrency on the save endpoints:
+1. claim_version bumps on a matching base and raises VersionConflict on a stale one
+2. Master-table saves compare against the table_data header version
+3. Save endpoints answer a stale baseVersion with 409 and leave the data alone
+4. Adding an existing dropdown option leaves the version alone
+"""
+
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from data_versions import (
+    VERSION_HEADER, VersionConflict, bump_version, claim_table_version, claim_version, data_version
+)
+from table_rows import save_rows
+
+
+class TestClaimVersion:
+    """Compare-and-bump on the data_versions row."""
+
+    def test_matching_base_bumps(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            assert data_version(cursor, 'relationships', 'FY_25') == 0
+            assert claim_version(cursor, 'relationships', 'FY_25', 0) == 1, "First save creates the row"
+            assert claim_version(cursor, 'relationships', 'FY_25', 1) == 2
+            assert claim_version(cursor, 'relationships', 'FY_25', None) == 3, "No base: last writer wins"
+            assert data_version(cursor, 'relationships', 'FY_26') == 0, "Versions are per fiscal year"
+        finally:
+            conn.close()
+
+    def test_stale_base_conflicts(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            claim_version(cursor, 'dropdowns', '', 0)
+            bump_version(cursor, 'dropdowns')
+            with pytest.raises(VersionConflict) as conflict:
+                claim_version(cursor, 'dropdowns', '', 1)
+            assert conflict.value.current == 2
+            with pytest.raises(VersionConflict):
+                claim_version(cursor, 'dropdowns', '', 0)
+            assert data_version(cursor, 'dropdowns') == 2, "A conflicting claim changes nothing"
+        finally:
+            conn.close()
+
+    def test_table_version(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            claim_table_version(cursor, 'FY_25', 0)
+            version = save_rows(cursor, 'FY_25', [{'id': 1, 'sno': 1}])['version']
+            assert data_version(cursor, 'tableData', 'FY_25') == version
+            claim_table_version(cursor, 'FY_25', version)
+            with pytest.raises(VersionConflict):
+                claim_table_version(cursor, 'FY_25', version - 1)
+        finally:
+            conn.close()
+
+
+class TestSaveEndpoints:
+    """Stale saves are rejected with 409 and the current version."""
+
+    def test_location_relationships(self, temp_db):
+        import main
+
+        response = main.get_location_relationships('FY_25')
+        base = int(response.headers[VERSION_HEADER])
+        saved = main.save_location_relationships([{'location': 'Khavda', 'locationCode': 'Khavda'}], 'FY_25', base)
+        assert saved.headers[VERSION_HEADER] == str(base + 1)
+
+        with pytest.raises(HTTPException) as conflict:
+            main.save_location_relationships([{'location': 'Baap', 'locationCode': 'RJ'}], 'FY_25', base)
+        assert conflict.value.status_code == 409
+        assert conflict.value.headers[VERSION_HEADER] == str(base + 1)
+        assert b'Baap' not in main.get_location_relationships('FY_25').body, "The stale save was rolled back"
+
+    def test_table_data(self, temp_db):
+        import main
+
+        first = main.save_table_data({'fiscalYear': 'FY_25', 'data': [{'id': 1, 'sno': 1}], 'baseVersion': 0})
+        base = int(first.headers[VERSION_HEADER])
+        main.save_table_data({'fiscalYear': 'FY_25', 'changes': {'upsert': [{'id': 1, 'sno': 2}]}, 'baseVersion': base})
+        with pytest.raises(HTTPException) as conflict:
+            main.save_table_data({'fiscalYear': 'FY_25', 'changes': {'delete': [1]}, 'baseVersion': base})
+        assert conflict.value.status_code == 409
+        assert main.get_table_data('FY_25').headers[VERSION_HEADER] == str(base + 1)
+
+    def test_duplicate_dropdown_option(self, temp_db):
+        import main
+
+        option = {'optionType': 'groups', 'optionValue': 'AGEL', 'baseVersion': 0}
+        first = main.add_dropdown_option(option)
+        assert first.headers[VERSION_HEADER] == '1'
+
+        again = main.add_dropdown_option({**option, 'baseVersion': 1})
+        assert json.loads(again.body)['added'] is False
+        assert again.headers[VERSION_HEADER] == '1'
+        assert main.get_dropdown_options().headers[VERSION_HEADER] == '1', "No bump for a no-op add"
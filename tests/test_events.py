@@ -0,0 +1,58 @@
+"""
+Tests for change notifications over SSE:
+1. A cache bump from a worker thread reaches an open stream
+2. Streams filtered by fiscal year skip other years but keep global events
+"""
+
+import asyncio
+import json
+import threading
+
+from events import ChangeBroadcaster
+from response_cache import ResponseCache
+
+
+def parse(chunk):
+    fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n') if not line.startswith(':'))
+    return fields.get('event'), json.loads(fields['data']) if 'data' in fields else None
+
+
+async def collect(broadcaster, fiscal_year, publish, count):
+    stream = broadcaster.stream(fiscal_year)
+    event, _ = parse((await stream.__anext__()).split('\n', 1)[1])
+    assert event == 'ready'
+    publish()
+    received = []
+    while len(received) < count:
+        received.append(parse(await asyncio.wait_for(stream.__anext__(), timeout=2)))
+    await stream.aclose()
+    return received
+
+
+class TestChangeEvents:
+    """Bumps are delivered as small change events."""
+
+    def test_bump_from_thread_is_delivered(self):
+        broadcaster, cache = ChangeBroadcaster(), ResponseCache()
+        cache.add_listener(broadcaster.on_bump)
+
+        def publish():
+            worker = threading.Thread(target=cache.bump, args=('FY_25-26', 'projects'))
+            worker.start()
+            worker.join()
+
+        [(event, data)] = asyncio.run(collect(broadcaster, None, publish, 1))
+        assert event == 'change'
+        assert data == {'fiscalYear': 'FY_25-26', 'entity': 'projects', 'epoch': 0, 'version': 1}
+        assert broadcaster.subscriber_count == 0, "Closed streams unsubscribe"
+
+    def test_fiscal_year_filter(self):
+        broadcaster = ChangeBroadcaster()
+
+        def publish():
+            broadcaster.publish('FY_24-25', 'projects', (0, 1))
+            broadcaster.publish(None, 'dropdowns', (1, 0))
+            broadcaster.publish('FY_25-26', 'summaries', (1, 3))
+
+        received = asyncio.run(collect(broadcaster, 'FY_25-26', publish, 2))
+        assert [d['entity'] for _, d in received] == ['dropdowns', 'summaries']
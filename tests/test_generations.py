@@ -0,0 +1,185 @@
+"""
+Tests for commissioning project generations:
+1. Restoring an earlier generation brings back exactly its rows (individual deletes stay deleted)
+   and a delete request for a superseded row leaves it restorable
+2. Reset and monthly upload edit a new generation, so the previous values can be restored
+3. Soft-delete compaction keeps retained generations and reclaims pruned ones
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from change_seq import fetch_changes, next_change_seq
+from conftest import insert_project
+from generations import (
+    GenerationError, GenerationNotFound, adopt_legacy_rows, begin_generation, list_generations, restore_generation
+)
+from maintenance import compact_soft_deleted
+
+
+def save_generation(cursor, names, fiscal_year='FY_25-26'):
+    """What a bulk save does: supersede the live rows, insert the new generation."""
+    change_seq = next_change_seq(cursor)
+    generation = begin_generation(cursor, fiscal_year, 'save', change_seq)
+    for name in names:
+        insert_project(cursor.connection, fiscal_year, project_name=name, change_seq=change_seq, generation=generation)
+    return generation
+
+
+def live_names(cursor, fiscal_year='FY_25-26'):
+    cursor.execute(
+        'SELECT project_name FROM commissioning_projects WHERE fiscal_year = ? AND is_deleted = 0 ORDER BY project_name',
+        (fiscal_year,)
+    )
+    return [r[0] for r in cursor.fetchall()]
+
+
+class TestRestore:
+    """Restore moves the pointer and re-flags rows in place."""
+
+    def test_restore_previous_generation(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            first = save_generation(cursor, ['A', 'B', 'C'])
+            cursor.execute(
+                "UPDATE commissioning_projects SET is_deleted = 1, change_seq = ? WHERE project_name = 'C'",
+                (next_change_seq(cursor),)
+            )
+            second = save_generation(cursor, ['X', 'Y'])
+            conn.commit()
+            assert live_names(cursor) == ['X', 'Y']
+            _, token = fetch_changes(cursor, 'FY_25-26', 0)
+
+            cursor.execute('SELECT COUNT(*) FROM commissioning_projects')
+            rows_before = cursor.fetchone()[0]
+            restore_generation(cursor, 'FY_25-26', first)
+            conn.commit()
+            assert live_names(cursor) == ['A', 'B'], "Rows deleted one by one stay deleted"
+            cursor.execute('SELECT COUNT(*) FROM commissioning_projects')
+            assert cursor.fetchone()[0] == rows_before, "Nothing is copied"
+
+            changes, _ = fetch_changes(cursor, 'FY_25-26', token)
+            assert sorted((c['projectName'], c['isDeleted']) for c in changes) == [
+                ('A', False), ('B', False), ('X', True), ('Y', True)
+            ], "Delta sync sees the switch"
+
+            generations = {g['generation']: g for g in list_generations(cursor, 'FY_25-26')}
+            assert generations[first]['isCurrent'] and generations[first]['rowCount'] == 2
+            assert generations[second]['rowCount'] == 2
+
+            restore_generation(cursor, 'FY_25-26', second)
+            conn.commit()
+            assert live_names(cursor) == ['X', 'Y'], "Restores are reversible"
+        finally:
+            conn.close()
+
+    def test_deleting_superseded_row_is_a_no_op(self, temp_db):
+        import main
+
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            first = save_generation(cursor, ['A', 'B'])
+            save_generation(cursor, ['X'])
+            conn.commit()
+            cursor.execute("SELECT id, change_seq FROM commissioning_projects WHERE project_name = 'A'")
+            superseded_id, change_seq = cursor.fetchone()
+        finally:
+            conn.close()
+
+        # The superseded row's id reached the client through delta sync
+        with pytest.raises(HTTPException) as missing:
+            main.delete_commissioning_project(superseded_id)
+        assert missing.value.status_code == 404
+
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT change_seq FROM commissioning_projects WHERE id = ?', (superseded_id,))
+            assert cursor.fetchone()[0] == change_seq
+            restore_generation(cursor, 'FY_25-26', first)
+            conn.commit()
+            assert live_names(cursor) == ['A', 'B']
+        finally:
+            conn.close()
+
+    def test_reset_can_be_restored(self, temp_db):
+        import main
+
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            change_seq = next_change_seq(cursor)
+            first = begin_generation(cursor, 'FY_25-26', 'save', change_seq)
+            insert_project(conn, project_name='A', apr=10, jul=20, change_seq=change_seq, generation=first)
+            insert_project(conn, project_name='B', may=5, change_seq=change_seq, generation=first)
+            conn.commit()
+
+            assert main.reset_commissioning_data({'fiscalYear': 'FY_25-26'})['count'] == 2
+            cursor.execute('SELECT COUNT(*) FROM commissioning_projects WHERE is_deleted = 0 AND apr IS NOT NULL')
+            assert cursor.fetchone()[0] == 0
+
+            restore_generation(cursor, 'FY_25-26', first)
+            conn.commit()
+            cursor.execute(
+                'SELECT project_name, apr, may, jul FROM commissioning_projects '
+                'WHERE is_deleted = 0 ORDER BY project_name'
+            )
+            assert [tuple(r) for r in cursor.fetchall()] == [('A', 10, None, 20), ('B', None, 5, None)]
+        finally:
+            conn.close()
+
+    def test_restore_errors(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            current = save_generation(cursor, ['A'])
+            with pytest.raises(GenerationNotFound):
+                restore_generation(cursor, 'FY_25-26', 99)
+            with pytest.raises(GenerationError):
+                restore_generation(cursor, 'FY_25-26', current)
+        finally:
+            conn.close()
+
+    def test_legacy_rows_become_generation_one(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            insert_project(conn, project_name='Old')
+            assert adopt_legacy_rows(cursor) == 1
+            assert adopt_legacy_rows(cursor) == 0
+            save_generation(cursor, ['New'])
+            restore_generation(cursor, 'FY_25-26', 1)
+            assert live_names(cursor) == ['Old']
+        finally:
+            conn.close()
+
+
+class TestCompaction:
+    """Compaction honours generation retention."""
+
+    def test_keeps_retained_generations(self, temp_db, monkeypatch):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            generations = [save_generation(cursor, [f'G{g}a', f'G{g}b']) for g in range(1, 5)]
+            insert_project(conn, project_name='Stray', is_deleted=1, change_seq=next_change_seq(cursor))
+            conn.commit()
+        finally:
+            conn.close()
+
+        monkeypatch.setattr('generations.KEEP_GENERATIONS', 2)
+        report = compact_soft_deleted(temp_db.get_db_connection, mode='purge', vacuum=False)
+        assert report['generationsPruned'] == 1
+        assert report['tables']['commissioning_projects']['rowsReclaimed'] == 3, "Generation 1 and the stray row"
+
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            with pytest.raises(GenerationError):
+                restore_generation(cursor, 'FY_25-26', generations[0])
+            restore_generation(cursor, 'FY_25-26', generations[1])
+            assert live_names(cursor) == ['G2a', 'G2b'], "Retained generations survive compaction"
+        finally:
+            conn.close()
@@ -0,0 +1,85 @@
+"""
+Tests for soft-delete compaction:
+1. Archive mode moves flagged rows to <table>_history and leaves live rows alone
+2. Purging raises the sync floor so old delta-sync tokens must resync
+3. Under Postgres, startup skips the SQLite-only migrations and jobs
+"""
+
+import pytest
+
+from change_seq import SyncTokenExpired, fetch_changes, next_change_seq
+from conftest import insert_project
+from maintenance import compact_soft_deleted
+
+
+class TestSoftDeleteCompaction:
+    """Dead generations are reclaimed without touching live data."""
+
+    def test_archive_moves_deleted_rows(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            for i in range(3):
+                insert_project(conn, project_name=f'Old{i}', is_deleted=1)
+            insert_project(conn, project_name='Live')
+            conn.commit()
+        finally:
+            conn.close()
+
+        report = compact_soft_deleted(temp_db.get_db_connection, mode='archive')
+        assert report['tables']['commissioning_projects']['rowsReclaimed'] == 3
+        assert report['vacuumed']
+
+        conn = temp_db.get_db_connection()
+        try:
+            names = [r[0] for r in conn.execute('SELECT project_name FROM commissioning_projects')]
+            archived = conn.execute(
+                'SELECT project_name, archived_at FROM commissioning_projects_history ORDER BY project_name'
+            ).fetchall()
+            assert names == ['Live']
+            assert [r[0] for r in archived] == ['Old0', 'Old1', 'Old2']
+            assert all(r[1] for r in archived), "Archived rows are timestamped"
+        finally:
+            conn.close()
+
+    def test_purge_expires_older_sync_tokens(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            insert_project(conn, project_name='Kept', change_seq=next_change_seq(cursor))
+            conn.commit()
+            _, token = fetch_changes(conn.cursor(), 'FY_25-26', 0)
+            insert_project(conn, project_name='Gone', is_deleted=1, change_seq=next_change_seq(cursor))
+            conn.commit()
+        finally:
+            conn.close()
+
+        compact_soft_deleted(temp_db.get_db_connection, mode='purge', vacuum=False)
+
+        conn = temp_db.get_db_connection()
+        try:
+            assert conn.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'commissioning_projects_history'"
+            ).fetchone() is None, "Purge does not archive"
+            with pytest.raises(SyncTokenExpired):
+                fetch_changes(conn.cursor(), 'FY_25-26', token)
+            changes, latest = fetch_changes(conn.cursor(), 'FY_25-26', 0)
+            assert [c['projectName'] for c in changes] == ['Kept']
+            assert fetch_changes(conn.cursor(), 'FY_25-26', latest)[0] == [], "Fresh tokens still work"
+        finally:
+            conn.close()
+
+
+class TestStartup:
+    """Startup work that only SQLite supports."""
+
+    def test_postgres_skips_sqlite_migrations(self, temp_db, monkeypatch):
+        import main
+
+        opened = []
+        monkeypatch.setattr(temp_db, 'USE_POSTGRES', True)
+        monkeypatch.setattr(main, 'init_db', lambda: None)
+        monkeypatch.setattr(main, 'get_db_connection', lambda: opened.append(1))
+        monkeypatch.setattr(main.history_compactor, 'start', lambda connect: opened.append(2))
+        monkeypatch.setattr(main.soft_delete_compactor, 'start', lambda connect: opened.append(3))
+        main.startup_event()
+        assert opened == []
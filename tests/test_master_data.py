@@ -0,0 +1,72 @@
+"""
+Tests for incremental dropdown master-data writes:
+1. Single values are added and removed without touching other rows
+2. Full / per-type saves write only the difference
+3. The unique index rejects a second live copy of a value
+"""
+
+import sqlite3
+
+import pytest
+
+from master_data import add_option, remove_option, replace_options
+
+
+def stored(cursor):
+    cursor.execute('SELECT id, option_type, option_value, is_deleted FROM dropdown_options ORDER BY id')
+    return [tuple(r) for r in cursor.fetchall()]
+
+
+class TestSingleValues:
+    """add_option / remove_option touch one row."""
+
+    def test_add_and_remove(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            for value in ('AGEL', 'ACL'):
+                assert add_option(cursor, 'groups', value)
+            before = stored(cursor)
+            assert add_option(cursor, 'groups', 'AEL')
+            assert stored(cursor) == before + [(before[-1][0] + 1, 'groups', 'AEL', 0)], "Only the new row is written"
+            assert not add_option(cursor, 'groups', 'AEL'), "Adding an existing value is a no-op"
+
+            assert remove_option(cursor, 'groups', 'ACL')
+            assert not remove_option(cursor, 'groups', 'ACL')
+            assert [r[2] for r in stored(cursor)] == ['AGEL', 'AEL'], "Removed rows are deleted, not flagged"
+        finally:
+            conn.close()
+
+    def test_unique_live_value(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            add_option(cursor, 'types', 'Solar')
+            with pytest.raises(sqlite3.IntegrityError):
+                cursor.execute("INSERT INTO dropdown_options (option_type, option_value) VALUES ('types', 'Solar')")
+            cursor.execute(
+                "INSERT INTO dropdown_options (option_type, option_value, is_deleted) VALUES ('types', 'Solar', 1)"
+            )
+        finally:
+            conn.close()
+
+
+class TestReplaceOptions:
+    """Saves diff against the stored lists."""
+
+    def test_writes_only_changes(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            replace_options(cursor, {'groups': ['AGEL', 'ACL'], 'types': ['Solar', 'Wind']}, all_types=True)
+            kept = {r[2]: r[0] for r in stored(cursor)}
+
+            assert replace_options(cursor, {'groups': ['AGEL', 'AEL', 'AEL']}) == (1, 1)
+            rows = stored(cursor)
+            assert {r[2] for r in rows} == {'AGEL', 'AEL', 'Solar', 'Wind'}, "Other types are untouched"
+            assert {r[2]: r[0] for r in rows}['AGEL'] == kept['AGEL'], "Unchanged values keep their row"
+
+            assert replace_options(cursor, {'groups': ['AGEL', 'AEL']}, all_types=True) == (0, 2)
+            assert {r[2] for r in stored(cursor)} == {'AGEL', 'AEL'}, "A full save empties missing types"
+        finally:
+            conn.close()
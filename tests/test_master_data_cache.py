@@ -0,0 +1,98 @@
+"""
+Tests for the in-process master-data cache:
+1. Repeated reads within the check interval run no SQL
+2. A save in this process is visible on the next read
+3. A version bump by another worker is noticed once the interval passes,
+   also through the full app (no response cache in front)
+"""
+
+import json
+
+from conftest import asgi_get
+from data_versions import VERSION_HEADER, bump_version
+from master_data import add_option, load_dropdown_options
+from master_data_cache import MasterDataCache
+
+
+class CountingConnect:
+    """get_db_connection stand-in that counts opened connections."""
+
+    def __init__(self, database):
+        self.database = database
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return self.database.get_db_connection()
+
+
+def write(database, action):
+    conn = database.get_db_connection()
+    try:
+        result = action(conn.cursor())
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+
+class TestMasterDataCache:
+    """Hits, local invalidation and cross-worker revalidation."""
+
+    def test_hit_runs_no_sql(self, temp_db):
+        cache = MasterDataCache(check_seconds=60)
+        connect = CountingConnect(temp_db)
+        first = cache.get(connect, 'dropdowns', '', load_dropdown_options)
+        assert cache.get(connect, 'dropdowns', '', load_dropdown_options) == first
+        assert connect.opened == 1, "The second read is served from memory"
+        assert json.loads(first[1])['types'] == ['Solar', 'Wind', 'Hybrid'], "Defaults while nothing is stored"
+
+    def test_local_write_invalidates(self, temp_db):
+        cache = MasterDataCache(check_seconds=60)
+        connect = CountingConnect(temp_db)
+        cache.get(connect, 'dropdowns', '', load_dropdown_options)
+
+        def add(cursor):
+            add_option(cursor, 'groups', 'AEL')
+            return bump_version(cursor, 'dropdowns')
+
+        cache.note_write('dropdowns', '', write(temp_db, add))
+        version, body = cache.get(connect, 'dropdowns', '', load_dropdown_options)
+        assert version == 1
+        assert json.loads(body)['groups'] == ['AEL']
+
+    def test_other_worker_write_is_revalidated(self, temp_db):
+        cache = MasterDataCache(check_seconds=0)
+        connect = CountingConnect(temp_db)
+        cache.get(connect, 'dropdowns', '', load_dropdown_options)
+        cache.get(connect, 'dropdowns', '', load_dropdown_options)
+        assert cache.stats()['revalidations'] == 1, "An unchanged version keeps the entry"
+
+        # Written without note_write, as another worker process would
+        write(temp_db, lambda cursor: add_option(cursor, 'types', 'Storage') and bump_version(cursor, 'dropdowns'))
+        version, body = cache.get(connect, 'dropdowns', '', load_dropdown_options)
+        assert version == 1
+        assert json.loads(body)['types'] == ['Storage']
+        assert cache.stats()['loads'] == 2
+
+    def test_other_worker_write_through_app(self, temp_db, monkeypatch):
+        import main
+
+        monkeypatch.setattr(main.master_data_cache, 'check_seconds', 0)
+        for _ in range(2):
+            status, body = asgi_get(main.app, '/api/dropdown-options')
+            assert status == 200 and json.loads(body)['types'] == ['Solar', 'Wind', 'Hybrid']
+
+        write(temp_db, lambda cursor: add_option(cursor, 'types', 'Storage') and bump_version(cursor, 'dropdowns'))
+        status, body = asgi_get(main.app, '/api/dropdown-options')
+        assert json.loads(body)['types'] == ['Storage'], "The shared version row is checked on every request"
+
+    def test_endpoints(self, temp_db):
+        import main
+
+        base = int(main.get_location_relationships('FY_25').headers[VERSION_HEADER])
+        main.save_location_relationships([{'location': 'Mundra', 'locationCode': 'GJ'}], 'FY_25', base)
+        response = main.get_location_relationships('FY_25')
+        assert json.loads(response.body) == [{'location': 'Mundra', 'locationCode': 'GJ'}]
+        assert response.headers[VERSION_HEADER] == str(base + 1)
+        assert b'Mundra' not in main.get_location_relationships('FY_26').body, "Entries are per fiscal year"
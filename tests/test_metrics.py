@@ -0,0 +1,149 @@
+"""
+Tests for request metrics and the /metrics endpoint:
+1. Requests are counted by method, route template and status, with sizes
+2. Unmatched paths share one label; in-flight counts return to zero
+3. The exposition has cumulative buckets and component gauges
+4. The app's /metrics route serves the Prometheus content type
+"""
+
+import asyncio
+
+from fastapi import FastAPI, HTTPException
+
+from metrics import DYNAMIC, UNMATCHED, MetricsMiddleware, RequestMetrics
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/items")
+    def list_items():
+        return {"items": [1, 2, 3]}
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"id": item_id}
+
+    return app
+
+
+def call(app, path, method='GET'):
+    sent = []
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': b'', 'headers': [], 'scheme': 'http', 'server': ('test', 80), 'http_version': '1.1',
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def line(text, prefix):
+    return next(l for l in text.splitlines() if l.startswith(prefix))
+
+
+class TestRecording:
+    """Series per route template and status."""
+
+    def test_counts_by_route_template(self):
+        metrics = RequestMetrics()
+        app = MetricsMiddleware(make_app(), metrics=metrics)
+        call(app, '/items')
+        call(app, '/items/1')
+        call(app, '/items/2')
+        call(app, '/items/0')
+
+        text = metrics.render()
+        assert line(text, 'http_requests_total{method="GET",route="/items",status="200"}').endswith(' 1')
+        assert line(text, 'http_requests_total{method="GET",route="/items/{item_id}",status="200"}').endswith(' 2')
+        assert line(text, 'http_requests_total{method="GET",route="/items/{item_id}",status="404"}').endswith(' 1')
+        assert '/items/1"' not in text, "Concrete ids never become labels"
+
+    def test_response_size(self):
+        metrics = RequestMetrics()
+        app = MetricsMiddleware(make_app(), metrics=metrics)
+        sent = call(app, '/items')
+        body = b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+
+        text = metrics.render()
+        assert line(text, 'http_response_size_bytes_sum{method="GET",route="/items"').endswith(f' {len(body)}')
+        assert line(text, 'http_response_size_bytes_bucket{method="GET",route="/items",status="200",le="256"}') \
+            .endswith(' 1')
+
+    def test_unmatched_and_in_flight(self):
+        metrics = RequestMetrics()
+        app = MetricsMiddleware(make_app(), metrics=metrics)
+        call(app, '/nope/1')
+        call(app, '/also-nope')
+        call(app, '/items/5')
+
+        text = metrics.render()
+        assert line(text, f'http_requests_total{{method="GET",route="{UNMATCHED}",status="404"}}').endswith(' 2')
+        assert metrics.in_flight() == 0
+        assert line(text, f'http_requests_in_flight{{method="GET",route="{DYNAMIC}"}}').endswith(' 0')
+
+    def test_in_flight_while_handling(self):
+        metrics = RequestMetrics()
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(metrics.in_flight(lambda method, route: method == 'POST'))
+            await send({'type': 'http.response.start', 'status': 202, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b'ok'})
+
+        call(MetricsMiddleware(app, metrics=metrics), '/api/upload-excel', method='POST')
+        assert seen == [1]
+        assert metrics.in_flight() == 0
+
+
+class TestExposition:
+    """Text format details."""
+
+    def test_buckets_are_cumulative(self):
+        metrics = RequestMetrics()
+        metrics.started('GET', '/x')
+        metrics.finished('GET', '/x', '/x', 200, 0.003, 100)
+        metrics.started('GET', '/x')
+        metrics.finished('GET', '/x', '/x', 200, 20.0, 100)
+
+        text = metrics.render()
+        labels = 'method="GET",route="/x",status="200"'
+        assert line(text, f'http_request_duration_seconds_bucket{{{labels},le="0.001"}}').endswith(' 0')
+        assert line(text, f'http_request_duration_seconds_bucket{{{labels},le="0.005"}}').endswith(' 1')
+        assert line(text, f'http_request_duration_seconds_bucket{{{labels},le="10.0"}}').endswith(' 1')
+        assert line(text, f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}').endswith(' 2')
+        assert line(text, f'http_request_duration_seconds_count{{{labels}}}').endswith(' 2')
+        assert '# TYPE http_request_duration_seconds histogram' in text
+
+    def test_component_stats(self):
+        metrics = RequestMetrics()
+        metrics.add_collector(lambda: {'cache': {'hits': 3, 'name': 'skipped', 'inner': {'size': 7}, 'on': True}})
+        metrics.add_collector(lambda: 1 / 0)
+
+        text = metrics.render()
+        assert 'app_component_stat{component="cache",stat="hits"} 3' in text
+        assert 'app_component_stat{component="cache",stat="inner.size"} 7' in text
+        assert 'app_component_stat{component="cache",stat="on"} 1' in text
+        assert 'skipped' not in text, "Non-numeric stats are left out"
+
+
+class TestEndpoint:
+    """/metrics on the application."""
+
+    def test_metrics_route(self, temp_db):
+        import main
+
+        response = main.get_metrics()
+        assert response.media_type.startswith('text/plain; version=0.0.4')
+        text = response.body.decode('utf-8')
+        assert '# TYPE http_requests_total counter' in text
+        assert 'app_component_stat{component="database",stat="sizeBytes"}' in text
+        assert 'app_component_stat{component="uploads",stat="inFlight"} 0' in text
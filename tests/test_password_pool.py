@@ -0,0 +1,89 @@
+"""
+Tests for the bounded bcrypt pool used by login:
+1. Checks run off the event loop and return bcrypt's verdict
+2. A saturated pool rejects at once and frees slots when checks finish
+3. Login answers 503 with Retry-After while the pool is saturated
+"""
+
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+from password_pool import PasswordPool, PoolSaturated
+
+
+def fast_hash(password):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+
+
+class TestPasswordPool:
+    """Verdicts and admission control."""
+
+    def test_verify(self):
+        pool = PasswordPool(workers=2, queue_limit=2)
+        hashed = fast_hash('secret')
+
+        async def run():
+            caller = threading.get_ident()
+            seen = []
+
+            def check(password, stored):
+                seen.append(threading.get_ident())
+                return bcrypt.checkpw(password, stored)
+
+            pool._check = check
+            return await pool.verify('secret', hashed), await pool.verify('wrong', hashed), seen, caller
+
+        ok, bad, seen, caller = asyncio.run(run())
+        assert ok and not bad
+        assert caller not in seen, "bcrypt runs on a pool thread"
+        assert pool.stats()['completed'] == 2
+
+    def test_saturation(self):
+        release = threading.Event()
+        pool = PasswordPool(workers=1, queue_limit=1, check=lambda password, stored: release.wait(5))
+
+        async def run():
+            running = [asyncio.ensure_future(pool.verify('a', 'b')) for _ in range(2)]
+            await asyncio.sleep(0)
+            with pytest.raises(PoolSaturated):
+                await pool.verify('a', 'b')
+            release.set()
+            assert await asyncio.gather(*running) == [True, True]
+            return await pool.verify('a', 'b')
+
+        assert asyncio.run(run()), "Slots are freed when checks finish"
+        assert pool.stats()['rejected'] == 1
+        assert pool.stats()['inFlight'] == 0
+
+
+class TestLogin:
+    """The login endpoint uses the pool."""
+
+    def test_login(self, temp_db, monkeypatch):
+        import main
+
+        conn = temp_db.get_db_connection()
+        conn.execute(
+            "INSERT INTO users (username, email, password, role) VALUES ('ops', 'ops@example.com', ?, 'admin')",
+            (fast_hash('secret'),)
+        )
+        conn.commit()
+        conn.close()
+
+        result = asyncio.run(main.login_user(main.UserLogin(email='ops@example.com', password='secret')))
+        assert result['user']['email'] == 'ops@example.com'
+        with pytest.raises(HTTPException) as wrong:
+            asyncio.run(main.login_user(main.UserLogin(email='ops@example.com', password='nope')))
+        assert wrong.value.status_code == 401
+
+        busy_pool = PasswordPool(workers=1, queue_limit=0)
+        busy_pool._admit()  # the only slot is taken
+        monkeypatch.setattr(main, 'password_pool', busy_pool)
+        with pytest.raises(HTTPException) as busy:
+            asyncio.run(main.login_user(main.UserLogin(email='ops@example.com', password='secret')))
+        assert busy.value.status_code == 503
+        assert busy.value.headers['Retry-After'] == '1'
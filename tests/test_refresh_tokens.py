@@ -0,0 +1,151 @@
+"""
+Tests for refresh tokens:
+1. Only the SHA-256 of a token is stored
+2. Refreshing rotates the token; a replayed token revokes the session
+3. Logout revokes the session; expired tokens are refused
+4. Login hands out a refresh token that /token/refresh accepts; its DB work stays off the event loop
+5. A refresh for a deleted user stores no successor
+"""
+
+import asyncio
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+import refresh_tokens
+from refresh_tokens import (
+    InvalidRefreshToken, hash_token, issue_refresh_token, revoke_refresh_token, rotate_refresh_token
+)
+
+
+def add_user(conn, email='ops@example.com', password='secret'):
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+    cur = conn.execute(
+        "INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, 'viewer')",
+        (email.split('@')[0], email, hashed)
+    )
+    return cur.lastrowid
+
+
+class TestRotation:
+    """Hashing, rotation, reuse detection and revocation."""
+
+    def test_stored_hashed(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            token = issue_refresh_token(cursor, add_user(conn))
+            cursor.execute('SELECT token_hash FROM refresh_tokens')
+            assert [r[0] for r in cursor.fetchall()] == [hash_token(token)]
+        finally:
+            conn.close()
+
+    def test_rotate_and_replay(self, temp_db, monkeypatch):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            user_id = add_user(conn)
+            first = issue_refresh_token(cursor, user_id)
+            assert rotate_refresh_token(cursor, first)[0] == user_id
+            cursor.execute('SELECT token_hash FROM refresh_tokens WHERE used_at IS NULL')
+            second_hash = cursor.fetchone()[0]
+
+            with pytest.raises(InvalidRefreshToken, match='already rotated'):
+                rotate_refresh_token(cursor, first)
+            cursor.execute('SELECT COUNT(*) FROM refresh_tokens WHERE revoked_at IS NOT NULL')
+            assert cursor.fetchone()[0] == 0, "A concurrent refresh inside the grace window keeps the session"
+
+            monkeypatch.setattr(refresh_tokens, 'REFRESH_REUSE_GRACE_SECONDS', -1)
+            with pytest.raises(InvalidRefreshToken, match='reuse'):
+                rotate_refresh_token(cursor, first)
+            cursor.execute('SELECT revoked_at FROM refresh_tokens WHERE token_hash = ?', (second_hash,))
+            assert cursor.fetchone()[0] is not None, "Replay revokes the successor too"
+        finally:
+            conn.close()
+
+    def test_logout_and_expiry(self, temp_db, monkeypatch):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            user_id = add_user(conn)
+            token = issue_refresh_token(cursor, user_id)
+            assert revoke_refresh_token(cursor, token)
+            with pytest.raises(InvalidRefreshToken, match='revoked'):
+                rotate_refresh_token(cursor, token)
+            assert not revoke_refresh_token(cursor, 'unknown')
+
+            monkeypatch.setattr(refresh_tokens, 'REFRESH_TOKEN_EXPIRE_DAYS', -1)
+            expired = issue_refresh_token(cursor, user_id)
+            with pytest.raises(InvalidRefreshToken, match='expired'):
+                rotate_refresh_token(cursor, expired)
+            assert refresh_tokens.purge_expired_tokens(cursor, user_id) == 1
+        finally:
+            conn.close()
+
+
+class TestEndpoints:
+    """Login -> refresh -> logout."""
+
+    def test_flow(self, temp_db):
+        import main
+
+        conn = temp_db.get_db_connection()
+        add_user(conn)
+        conn.commit()
+        conn.close()
+
+        login = asyncio.run(main.login_user(main.UserLogin(email='ops@example.com', password='secret')))
+        refreshed = main.refresh_access_token(main.RefreshTokenRequest(refresh_token=login['refresh_token']))
+        assert refreshed['access_token'] and refreshed['refresh_token'] != login['refresh_token']
+
+        main.logout_user(main.RefreshTokenRequest(refresh_token=refreshed['refresh_token']))
+        with pytest.raises(HTTPException) as revoked:
+            main.refresh_access_token(main.RefreshTokenRequest(refresh_token=refreshed['refresh_token']))
+        assert revoked.value.status_code == 401
+
+    def test_deleted_user_gets_no_successor(self, temp_db):
+        import main
+
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            token = issue_refresh_token(cursor, add_user(conn))
+            cursor.execute('DELETE FROM users')
+            conn.commit()
+        finally:
+            conn.close()
+
+        with pytest.raises(HTTPException) as gone:
+            main.refresh_access_token(main.RefreshTokenRequest(refresh_token=token))
+        assert gone.value.status_code == 401
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*), MAX(used_at) FROM refresh_tokens')
+            assert tuple(cursor.fetchone()) == (1, None), "The rotation is rolled back"
+        finally:
+            conn.close()
+
+    def test_login_waits_for_a_locked_database_off_the_event_loop(self, temp_db):
+        import main
+
+        conn = temp_db.get_db_connection()
+        add_user(conn)
+        conn.commit()
+        conn.close()
+
+        async def scenario():
+            # Another writer holds the lock; only the event loop can release it
+            blocker = temp_db.get_db_connection()
+            blocker.execute('BEGIN IMMEDIATE')
+            login = asyncio.create_task(
+                main.login_user(main.UserLogin(email='ops@example.com', password='secret'))
+            )
+            await asyncio.sleep(0.2)
+            blocker.rollback()
+            blocker.close()
+            return await login
+
+        result = asyncio.run(scenario())
+        assert result['refresh_token']
@@ -0,0 +1,147 @@
+"""
+Tests for the fiscal-year response cache:
+1. Repeated GETs are served from memory
+2. If-None-Match revalidation returns 304 without calling the endpoint
+3. Writes bump the fiscal-year version and drop stale entries
+4. Entries are keyed on the shared data version, so other workers' saves are seen
+5. Notifications for uncached entities reach listeners but keep entries
+"""
+
+import asyncio
+import json
+
+from conftest import asgi_get, insert_project
+from data_versions import bump_version
+from response_cache import ResponseCache, ResponseCacheMiddleware, response_cache
+
+
+class CountingApp:
+    """Minimal ASGI endpoint returning the current payload and counting calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.payload = {'value': 1}
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        body = json.dumps(self.payload).encode()
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def get(app, path='/commissioning-projects', query=b'fiscalYear=FY_25-26', headers=()):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query, 'headers': list(headers)}
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in messages[1:])
+
+
+class TestResponseCache:
+    """Cache hits, ETag revalidation and invalidation."""
+
+    def test_second_get_is_cache_hit(self):
+        inner, cache = CountingApp(), ResponseCache()
+        app = ResponseCacheMiddleware(inner, cache)
+        first = get(app)
+        second = get(app)
+        assert inner.calls == 1
+        assert first == second
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    def test_if_none_match_returns_304(self):
+        inner, cache = CountingApp(), ResponseCache()
+        app = ResponseCacheMiddleware(inner, cache)
+        _, headers, _ = get(app)
+        status, _, body = get(app, headers=[(b'if-none-match', headers[b'etag'])])
+        assert status == 304
+        assert body == b''
+        assert inner.calls == 1
+
+    def test_bump_invalidates_only_that_fiscal_year(self):
+        inner, cache = CountingApp(), ResponseCache()
+        app = ResponseCacheMiddleware(inner, cache)
+        get(app, query=b'fiscalYear=FY_25-26')
+        get(app, query=b'fiscalYear=FY_24-25')
+        inner.payload = {'value': 2}
+        cache.bump('FY_25-26')
+
+        _, _, body = get(app, query=b'fiscalYear=FY_25-26')
+        assert json.loads(body) == {'value': 2}
+        _, _, body = get(app, query=b'fiscalYear=FY_24-25')
+        assert json.loads(body) == {'value': 1}, "Unrelated fiscal year should still be cached"
+        assert inner.calls == 3
+
+    def test_notify_keeps_entries(self):
+        inner, cache = CountingApp(), ResponseCache()
+        events = []
+        cache.add_listener(lambda fy, entity, version: events.append((fy, entity)))
+        app = ResponseCacheMiddleware(inner, cache)
+        get(app)
+        cache.notify(None, 'dropdowns')
+        cache.notify('FY_25-26', 'tableData')
+        get(app)
+        assert inner.calls == 1
+        assert cache.stats()['invalidations'] == 0
+        assert events == [(None, 'dropdowns'), ('FY_25-26', 'tableData')]
+
+    def test_lru_eviction(self):
+        inner, cache = CountingApp(), ResponseCache(max_entries=1)
+        app = ResponseCacheMiddleware(inner, cache)
+        get(app, query=b'fiscalYear=FY_25-26')
+        get(app, query=b'fiscalYear=FY_24-25')
+        assert cache.stats()['evictions'] == 1
+
+    def test_uncached_paths_pass_through(self):
+        inner, cache = CountingApp(), ResponseCache()
+        app = ResponseCacheMiddleware(inner, cache)
+        get(app, path='/table-data')
+        get(app, path='/table-data')
+        assert inner.calls == 2
+
+
+class TestSharedVersion:
+    """The key follows the data_versions rows, not just this process's counter."""
+
+    def test_version_source_change_misses(self):
+        inner, cache = CountingApp(), ResponseCache()
+        shared = {'FY_25-26': 1}
+        cache.set_version_source(lambda fy: shared[fy])
+        app = ResponseCacheMiddleware(inner, cache)
+        get(app)
+        get(app)
+        assert inner.calls == 1
+
+        inner.payload = {'value': 2}
+        shared['FY_25-26'] = 2
+        _, _, body = get(app)
+        assert json.loads(body) == {'value': 2}
+        assert inner.calls == 2
+
+    def test_other_worker_write_through_app(self, temp_db):
+        import main
+
+        response_cache.clear()
+        for _ in range(2):
+            status, body = asgi_get(main.app, '/api/commissioning-projects', 'fiscalYear=FY_25-26')
+            assert status == 200 and json.loads(body) == []
+
+        # Committed without touching this process's caches, as another worker would
+        conn = temp_db.get_db_connection()
+        try:
+            insert_project(conn, project_name='Remote')
+            bump_version(conn.cursor(), 'projects', 'FY_25-26')
+            conn.commit()
+        finally:
+            conn.close()
+
+        status, body = asgi_get(main.app, '/api/commissioning-projects', 'fiscalYear=FY_25-26')
+        assert [p['projectName'] for p in json.loads(body)] == ['Remote']
@@ -0,0 +1,124 @@
+"""
+Tests for the materialized rollups in commissioning_summaries:
+1. Rebuild produces Section -> Category -> Solar/Wind -> Overall rows
+2. Excluded sections stop at their own section/category rows
+3. Incremental deltas match a full rebuild
+4. Adding a project refreshes derived columns of the new rows only
+"""
+
+import asyncio
+
+import pytest
+
+from conftest import insert_project
+from rollups import apply_project_change, fetch_project_row, rebuild_rollups
+
+
+def _rollups(conn, fiscal_year='FY_25-26'):
+    rows = conn.execute('''
+        SELECT level, summary_type, section, category, apr, jul, total, q1
+        FROM commissioning_summaries
+        WHERE fiscal_year = ? AND level IS NOT NULL
+    ''', (fiscal_year,)).fetchall()
+    return {(r[0], r[1], r[2], r[3]): tuple(round(v or 0, 6) for v in r[4:]) for r in rows}
+
+
+@pytest.fixture
+def conn(temp_db):
+    conn = temp_db.get_db_connection()
+    insert_project(conn, project_name='KS 1', capacity=300, plan_actual='Plan', apr=100, jul=200)
+    insert_project(conn, project_name='KS 1', capacity=300, plan_actual='Actual', apr=50)
+    insert_project(conn, project_name='RJ 1', category='Rajasthan Solar', section='B', project_type='Merchant',
+                   capacity=100, plan_actual='Plan', apr=100)
+    insert_project(conn, project_name='KW 1', category='Khavda Wind', capacity=80, plan_actual='Plan', jul=80)
+    insert_project(conn, project_name='Internal', category='Khavda Solar Internal 650MW', section='D2',
+                   capacity=650, plan_actual='Plan', apr=650, included_in_total=False)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+class TestRollupRebuild:
+    """Full rebuild of a fiscal year."""
+
+    def test_overall_plan(self, conn):
+        rebuild_rollups(conn.cursor(), 'FY_25-26')
+        rollups = _rollups(conn)
+        # apr, jul, total (= capacity for Plan), q1
+        assert rollups[('overall', 'Overall', '', 'Plan')] == (200, 280, 480, 200)
+        assert rollups[('overall', 'Overall', '', 'Actual')] == (50, 0, 50, 50)
+
+    def test_technology_and_business_model(self, conn):
+        rebuild_rollups(conn.cursor(), 'FY_25-26')
+        rollups = _rollups(conn)
+        assert rollups[('technology', 'Solar', '', 'Plan')][2] == 400
+        assert rollups[('technology', 'Wind', '', 'Plan')][2] == 80
+        assert rollups[('overall', 'Overall', '', 'PPA')][2] == 380
+        assert rollups[('overall', 'Overall', '', 'Merchant')][2] == 100
+
+    def test_excluded_section_keeps_own_subtotal(self, conn):
+        rebuild_rollups(conn.cursor(), 'FY_25-26')
+        rollups = _rollups(conn)
+        assert rollups[('section', 'Khavda Solar Internal 650MW', 'D2', 'Plan')][2] == 650
+        assert rollups[('category', 'Khavda Solar Internal 650MW', '', 'Plan')][2] == 650
+        assert rollups[('technology', 'Solar', '', 'Plan')][2] == 400, "Internal section leaked into Solar total"
+
+
+class TestIncrementalRollups:
+    """Single-row deltas must agree with a full rebuild."""
+
+    def test_update_matches_rebuild(self, conn):
+        cursor = conn.cursor()
+        rebuild_rollups(cursor, 'FY_25-26')
+        project_id = cursor.execute(
+            "SELECT id FROM commissioning_projects WHERE project_name = 'KS 1' AND plan_actual = 'Actual'"
+        ).fetchone()[0]
+
+        old_row = fetch_project_row(cursor, project_id)
+        cursor.execute('UPDATE commissioning_projects SET apr = 75, jul = 40 WHERE id = ?', (project_id,))
+        apply_project_change(cursor, 'FY_25-26', old_row, fetch_project_row(cursor, project_id))
+        incremental = _rollups(conn)
+
+        rebuild_rollups(cursor, 'FY_25-26')
+        assert incremental == _rollups(conn)
+
+    def test_delete_and_insert_match_rebuild(self, conn):
+        cursor = conn.cursor()
+        rebuild_rollups(cursor, 'FY_25-26')
+
+        rj_id = cursor.execute("SELECT id FROM commissioning_projects WHERE project_name = 'RJ 1'").fetchone()[0]
+        old_row = fetch_project_row(cursor, rj_id)
+        cursor.execute('UPDATE commissioning_projects SET is_deleted = 1 WHERE id = ?', (rj_id,))
+        apply_project_change(cursor, 'FY_25-26', old_row, None)
+
+        new_id = insert_project(conn, project_name='MW 1', category='Mundra Wind 76MW', section='C',
+                                project_type='Group', capacity=76, plan_actual='Plan', jul=76)
+        apply_project_change(cursor, 'FY_25-26', None, fetch_project_row(cursor, new_id))
+        incremental = {k: v for k, v in _rollups(conn).items() if any(v)}
+
+        rebuild_rollups(cursor, 'FY_25-26')
+        assert incremental == _rollups(conn)
+
+
+class TestManualAdd:
+    """Derived columns are written for the added rows, not the whole year."""
+
+    def test_only_new_rows_are_refreshed(self, conn):
+        import main
+        from schemas import ManualProjectRequest
+
+        before = {
+            r[0]: (r[1], r[2])
+            for r in conn.execute('SELECT id, total_capacity, change_seq FROM commissioning_projects').fetchall()
+        }
+        asyncio.run(main.manual_add_project(ManualProjectRequest(
+            category='Khavda Solar', section='A', projectName='New', spv='SPV', projectType='PPA',
+            capacity=50, fiscalYear='FY_25-26'
+        )))
+
+        rows = conn.execute('SELECT id, total_capacity, change_seq, q1 FROM commissioning_projects').fetchall()
+        untouched = {r[0]: (r[1], r[2]) for r in rows if r[0] in before}
+        assert untouched == before, "Existing rows keep their derived columns and change_seq"
+        added = [r for r in rows if r[0] not in before]
+        assert len(added) == 3
+        assert all(r[1] is not None and r[3] == 0 for r in added)
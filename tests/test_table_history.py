@@ -0,0 +1,86 @@
+"""
+Tests for master-table history retention and compression:
+1. Compressed rows round-trip through the format marker
+2. The policy keeps the last N versions plus daily / monthly checkpoints
+3. Compaction prunes, compresses, and leaves kept versions readable
+"""
+
+import json
+from datetime import datetime
+
+from table_history import RetentionPolicy, decode_row, encode_cold, run_compaction
+from table_rows import list_versions, load_rows, save_rows
+
+
+class TestHistoryCodec:
+    """History rows are stored compressed behind a marker."""
+
+    def test_round_trip(self):
+        text = json.dumps({'capacity': 216, 'connectivity': 'STU', 'group': 'AGEL', 'id': 1,
+                           'location': 'Kamuthi', 'locationCode': 'Others', 'ppaMerchant': 'PPA',
+                           'pss': '', 'sno': 1, 'solar': 216, 'spv': 'AGE23L', 'type': 'Solar', 'wind': 0},
+                          sort_keys=True, separators=(',', ':'))
+        packed = encode_cold(text)
+        assert isinstance(packed, bytes) and len(packed) < len(text) * 0.7, "Preset dictionary pays off"
+        assert decode_row(packed) == text
+        assert decode_row(text) == text
+        assert encode_cold('{}') == '{}', "Rows that do not shrink stay plain"
+
+
+class TestRetentionPolicy:
+    """Checkpoints survive beyond the last-N window."""
+
+    def test_kept_versions(self):
+        versions = [
+            (1, '2025-01-10 09:00:00'), (2, '2025-01-20 09:00:00'),
+            (3, '2025-03-01 09:00:00'), (4, '2025-03-05 09:00:00'), (5, '2025-03-05 12:00:00'),
+            (6, '2025-03-06 08:00:00'), (7, '2025-03-06 09:00:00'),
+        ]
+        now = datetime(2025, 3, 6, 10)
+        policy = RetentionPolicy(keep_last=2, keep_days=3, keep_months=3)
+        assert policy.kept(versions, now) == {7, 6, 5, 2}
+        assert RetentionPolicy(keep_last=1, keep_days=0, keep_months=0).kept(versions, now) == {7}
+
+
+class TestCompaction:
+    """run_compaction applies the policy and reports the shrink."""
+
+    def test_prunes_and_compresses(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            rows = [{'id': i, 'sno': i, 'spv': f'SPV{i}', 'group': 'AGEL', 'type': 'Solar'} for i in range(20)]
+            for version in range(1, 6):
+                rows[0] = {**rows[0], 'capacity': version * 10}
+                rows[1] = {**rows[1], 'capacity': version * 10}
+                save_rows(cursor, 'FY_25', rows)
+            cursor.execute("UPDATE table_data_versions SET created_at = '2020-01-01 00:00:00'")
+            conn.commit()
+            version_two = load_rows(cursor, 'FY_25', 2)
+        finally:
+            conn.close()
+
+        report = run_compaction(temp_db.get_db_connection, RetentionPolicy(keep_last=4, keep_days=0, keep_months=0))
+        assert report['prunedVersions'] == 1
+        assert report['historyBytesSaved'] > 0
+
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            assert load_rows(cursor, 'FY_25', 2) == version_two, "Kept versions read back unchanged"
+            cursor.execute("SELECT COUNT(*) FROM table_data_rows WHERE valid_to IS NOT NULL AND typeof(data) = 'text'")
+            assert cursor.fetchone()[0] == 0, "History rows are compressed"
+        finally:
+            conn.close()
+
+        report = run_compaction(temp_db.get_db_connection, RetentionPolicy(keep_last=2, keep_days=0, keep_months=0))
+        assert (report['prunedVersions'], report['deletedRows']) == (2, 4)
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            versions, _ = list_versions(cursor, 'FY_25')
+            assert [v['version'] for v in versions] == [5, 4]
+            cursor.execute('SELECT COUNT(*) FROM table_data_rows')
+            assert cursor.fetchone()[0] == 22, "20 current rows plus the two rows version 4 needs"
+        finally:
+            conn.close()
@@ -0,0 +1,261 @@
+"""
+Tests for row-level master table storage:
+1. Saving the full table writes only rows that changed
+2. Inserting or deleting a row in the middle does not rewrite its neighbours
+3. Earlier versions are rebuilt from the row history
+4. Legacy blobs are split into rows
+5. The backup listing pages through version metadata; a version streams as JSON
+6. Deleting a backup drops only that version
+"""
+
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from table_rows import (
+    VersionRemoved, apply_changes, close_rows, delete_version, list_versions, load_rows, migrate_blobs, save_rows,
+    stream_version
+)
+
+
+def table(*names):
+    return [{'id': i + 1, 'sno': i + 1, 'spv': name} for i, name in enumerate(names)]
+
+
+def spvs(cursor, fiscal_year='FY_25', version=None):
+    return [json.loads(row)['spv'] for row in load_rows(cursor, fiscal_year, version)]
+
+
+class TestRowStorage:
+    """Saves are stored as row deltas against the current version."""
+
+    def test_only_changed_rows_are_written(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            first = save_rows(cursor, 'FY_25', table('A', 'B', 'C'))
+            assert (first['version'], first['changed']) == (1, 3)
+
+            rows = table('A', 'B', 'C')
+            rows[1]['spv'] = 'B2'
+            second = save_rows(cursor, 'FY_25', rows)
+            assert (second['version'], second['changed'], second['removed']) == (2, 1, 0)
+
+            unchanged = save_rows(cursor, 'FY_25', [dict(reversed(list(r.items()))) for r in rows])
+            assert not unchanged['saved'], "Key order alone is not a change"
+            assert unchanged['version'] == 2
+            assert spvs(cursor) == ['A', 'B2', 'C']
+        finally:
+            conn.close()
+
+    def test_middle_insert_and_delete_touch_one_row(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            rows = table('A', 'B', 'C', 'D')
+            save_rows(cursor, 'FY_25', rows)
+
+            inserted = rows[:2] + [{'id': 9, 'sno': 9, 'spv': 'X'}] + rows[2:]
+            assert save_rows(cursor, 'FY_25', inserted)['changed'] == 1
+            assert spvs(cursor) == ['A', 'B', 'X', 'C', 'D']
+
+            result = save_rows(cursor, 'FY_25', [r for r in inserted if r['spv'] != 'B'])
+            assert (result['changed'], result['removed']) == (0, 1)
+            assert spvs(cursor) == ['A', 'X', 'C', 'D']
+
+            result = apply_changes(cursor, 'FY_25', upsert=[{'id': 4, 'sno': 4, 'spv': 'D2'},
+                                                            {'id': 10, 'sno': 10, 'spv': 'E'}], delete=[1])
+            assert (result['changed'], result['removed']) == (2, 1)
+            assert spvs(cursor) == ['X', 'C', 'D2', 'E']
+        finally:
+            conn.close()
+
+    def test_history_is_rebuilt_per_version(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            save_rows(cursor, 'FY_25', table('A', 'B'))
+            save_rows(cursor, 'FY_25', table('A', 'B', 'C'))
+            apply_changes(cursor, 'FY_25', upsert=[{'id': 1, 'sno': 1, 'spv': 'A2'}])
+            cursor.execute('UPDATE table_data SET is_deleted = 1, version = version + 1 WHERE fiscal_year = ?', ('FY_25',))
+            close_rows(cursor, 'FY_25')
+
+            assert spvs(cursor, version=1) == ['A', 'B']
+            assert spvs(cursor, version=2) == ['A', 'B', 'C']
+            assert spvs(cursor, version=3) == ['A2', 'B', 'C']
+            assert spvs(cursor) == [], "Deleting the table closes every row"
+
+            cursor.execute('SELECT COUNT(*) FROM table_data_rows')
+            assert cursor.fetchone()[0] == 4, "Three versions share unchanged rows"
+        finally:
+            conn.close()
+
+    def test_legacy_blob_is_migrated(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('INSERT INTO table_data (fiscal_year, data, version) VALUES (?, ?, 7)',
+                           ('FY_24', json.dumps(table('A', 'B'))))
+            assert migrate_blobs(cursor) == 1
+            assert migrate_blobs(cursor) == 0
+            assert spvs(cursor, 'FY_24') == ['A', 'B']
+            assert spvs(cursor, 'FY_24', version=7) == ['A', 'B']
+            assert save_rows(cursor, 'FY_24', table('A', 'B'))['saved'] is False
+        finally:
+            conn.close()
+
+    def test_unreadable_blob_is_left_alone(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            for fiscal_year, data in (('FY_23', '{"not": "a list"}'), ('FY_24', '[{"spv": ')):
+                cursor.execute('INSERT INTO table_data (fiscal_year, data, version) VALUES (?, ?, 3)',
+                               (fiscal_year, data))
+            assert migrate_blobs(cursor) == 0
+            cursor.execute('SELECT fiscal_year, data, row_storage FROM table_data ORDER BY fiscal_year')
+            assert [tuple(r) for r in cursor.fetchall()] == [
+                ('FY_23', '{"not": "a list"}', 0), ('FY_24', '[{"spv": ', 0)
+            ], "Bad blobs keep their data and stay unmigrated"
+            cursor.execute('SELECT COUNT(*) FROM table_data_versions')
+            assert cursor.fetchone()[0] == 0
+        finally:
+            conn.close()
+
+
+class TestBackupListing:
+    """Backups are listed from metadata and fetched one version at a time."""
+
+    def test_listing_pages_metadata(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            for n in range(1, 6):
+                save_rows(cursor, 'FY_25', table(*'ABCDE'[:n]))
+            page, next_before = list_versions(cursor, 'FY_25', limit=2)
+            assert [(v['version'], v['row_count']) for v in page] == [(5, 5), (4, 4)]
+            assert page[0]['size_bytes'] == sum(len(r) for r in load_rows(cursor, 'FY_25'))
+            assert 'data' not in page[0]
+
+            page, next_before = list_versions(cursor, 'FY_25', limit=2, before=next_before)
+            assert [v['version'] for v in page] == [3, 2]
+            page, next_before = list_versions(cursor, 'FY_25', limit=2, before=next_before)
+            assert [v['version'] for v in page] == [1] and next_before is None
+        finally:
+            conn.close()
+
+    def test_version_streams_in_pages(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            save_rows(cursor, 'FY_25', table(*'ABCDE'))
+            save_rows(cursor, 'FY_25', table('A', 'B'))
+            conn.commit()
+        finally:
+            conn.close()
+
+        chunks = list(stream_version(temp_db.get_db_connection, 'FY_25', 1, page_size=2))
+        assert len(chunks) == 5, "Bracket, three pages, bracket"
+        assert [r['spv'] for r in json.loads(b''.join(chunks))] == list('ABCDE')
+        latest = json.loads(b''.join(stream_version(temp_db.get_db_connection, 'FY_25', 2)))
+        assert [r['spv'] for r in latest] == ['A', 'B']
+
+    def test_version_removed_mid_stream_fails(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            save_rows(cursor, 'FY_25', table(*'ABCDE'))
+            save_rows(cursor, 'FY_25', table('A', 'B'))
+            conn.commit()
+        finally:
+            conn.close()
+
+        stream = stream_version(temp_db.get_db_connection, 'FY_25', 1, page_size=2)
+        assert next(stream) == b'['
+        next(stream)
+
+        # Retention compaction prunes version 1 between two pages
+        conn = temp_db.get_db_connection()
+        try:
+            delete_version(conn.cursor(), 'FY_25', 1)
+            conn.commit()
+        finally:
+            conn.close()
+        with pytest.raises(VersionRemoved):
+            list(stream)
+
+
+class TestBackupDelete:
+    """DELETE /backup-data removes a single version."""
+
+    @pytest.fixture
+    def three_versions(self, temp_db):
+        conn = temp_db.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            save_rows(cursor, 'FY_25', table('A', 'B'))
+            save_rows(cursor, 'FY_25', table('A', 'B', 'C'))
+            apply_changes(cursor, 'FY_25', upsert=[{'id': 1, 'sno': 1, 'spv': 'A2'}])
+            conn.commit()
+        finally:
+            conn.close()
+        return temp_db
+
+    def versions(self, database):
+        conn = database.get_db_connection()
+        try:
+            return [v['version'] for v in list_versions(conn.cursor(), 'FY_25')[0]]
+        finally:
+            conn.close()
+
+    def test_other_versions_survive(self, three_versions):
+        import main
+
+        main.delete_backup('FY_25', 2)
+        assert self.versions(three_versions) == [3, 1]
+        conn = three_versions.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            assert spvs(cursor, version=1) == ['A', 'B']
+            assert spvs(cursor) == ['A2', 'B', 'C']
+            cursor.execute('SELECT COUNT(*) FROM table_data_rows')
+            assert cursor.fetchone()[0] == 4, "Every row is still needed by version 1 or 3"
+        finally:
+            conn.close()
+
+        main.delete_backup('FY_25', 1)
+        conn = three_versions.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM table_data_rows')
+            assert cursor.fetchone()[0] == 3, "Only the replaced 'A' row was unique to the deleted versions"
+            assert spvs(cursor) == ['A2', 'B', 'C']
+        finally:
+            conn.close()
+
+    def test_current_and_unknown_versions(self, three_versions):
+        import main
+
+        with pytest.raises(HTTPException) as current:
+            main.delete_backup('FY_25', 3)
+        assert current.value.status_code == 400
+        with pytest.raises(HTTPException) as unknown:
+            main.delete_backup('FY_25', 9)
+        assert unknown.value.status_code == 404
+        assert self.versions(three_versions) == [3, 2, 1]
+
+    def test_deleted_table_is_removed_with_its_last_backup(self, three_versions):
+        import main
+
+        main.delete_table_data('FY_25')
+        for version in self.versions(three_versions):
+            main.delete_backup('FY_25', version)
+        conn = three_versions.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM table_data WHERE fiscal_year = ?', ('FY_25',))
+            assert cursor.fetchone()[0] == 0
+            cursor.execute('SELECT COUNT(*) FROM table_data_rows')
+            assert cursor.fetchone()[0] == 0
+        finally:
+            conn.close()